@@ -1,18 +1,107 @@
+import threading
+
 from app.services.sentinel import SovereignSentinel
 from app.services.vector_engine import VectorFilterService
+from app.services.verdict_cache import VerdictCache
+from app.services.llm_analyzer import LLMAnalysisService
+from app.services.intent_pool import IntentAnalysisPool
+from app.services.ingest_queue import DurableIngestQueue
+from app.services.bulk_learn import BulkLearnManager
+from app.core.config import settings
 
-# Global singletons
+# Global singletons. Built lazily (warmed concurrently by the lifespan hook), never at import time.
 _sentinel_instance = None
 _vector_service_instance = None
+_verdict_cache_instance = None
+_llm_service_instance = None
+_intent_pool_instance = None
+_ingest_queue_instance = None
+_bulk_learn_instance = None
+
+# Warm-up threads and request threads may race for the same singleton; only one may build it.
+# One lock per component so the heavy builds still run concurrently.
+_sentinel_lock = threading.Lock()
+_vector_service_lock = threading.Lock()
+_verdict_cache_lock = threading.Lock()
+_llm_service_lock = threading.Lock()
+_intent_pool_lock = threading.Lock()
+_ingest_queue_lock = threading.Lock()
+_bulk_learn_lock = threading.Lock()
 
 def get_sentinel() -> SovereignSentinel:
     global _sentinel_instance
     if not _sentinel_instance:
-        _sentinel_instance = SovereignSentinel()
+        with _sentinel_lock:
+            if not _sentinel_instance:
+                _sentinel_instance = SovereignSentinel()
     return _sentinel_instance
 
 def get_vector_service() -> VectorFilterService:
     global _vector_service_instance
     if not _vector_service_instance:
-        _vector_service_instance = VectorFilterService()
-    return _vector_service_instance
\ No newline at end of file
+        with _vector_service_lock:
+            if not _vector_service_instance:
+                _vector_service_instance = VectorFilterService()
+    return _vector_service_instance
+
+def get_verdict_cache() -> VerdictCache:
+    global _verdict_cache_instance
+    if not _verdict_cache_instance:
+        with _verdict_cache_lock:
+            if not _verdict_cache_instance:
+                _verdict_cache_instance = VerdictCache(
+                    max_entries=settings.VERDICT_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.VERDICT_CACHE_TTL_SECONDS
+                )
+    return _verdict_cache_instance
+
+def get_llm_service() -> LLMAnalysisService:
+    global _llm_service_instance
+    if not _llm_service_instance:
+        with _llm_service_lock:
+            if not _llm_service_instance:
+                _llm_service_instance = LLMAnalysisService()
+    return _llm_service_instance
+
+def get_intent_pool() -> IntentAnalysisPool:
+    global _intent_pool_instance
+    if not _intent_pool_instance:
+        with _intent_pool_lock:
+            if not _intent_pool_instance:
+                _intent_pool_instance = IntentAnalysisPool(
+                    analyze=get_llm_service().analyze_alert,
+                    findings_path=settings.INTENT_FINDINGS_PATH,
+                    workers=settings.INTENT_WORKERS,
+                    max_queue=settings.INTENT_MAX_QUEUE,
+                    dedup_ttl_s=settings.INTENT_DEDUP_TTL_SECONDS,
+                    overload_sample_rate=settings.INTENT_OVERLOAD_SAMPLE_RATE
+                )
+    return _intent_pool_instance
+
+def get_ingest_queue() -> DurableIngestQueue:
+    global _ingest_queue_instance
+    if not _ingest_queue_instance:
+        with _ingest_queue_lock:
+            if not _ingest_queue_instance:
+                _ingest_queue_instance = DurableIngestQueue(
+                    path=settings.INGEST_QUEUE_PATH,
+                    workers=settings.INGEST_QUEUE_WORKERS,
+                    max_pending=settings.INGEST_QUEUE_MAX_PENDING,
+                    max_attempts=settings.INGEST_QUEUE_MAX_ATTEMPTS,
+                    result_ttl_s=settings.INGEST_RESULT_TTL_SECONDS,
+                    callback_url=settings.INGEST_CALLBACK_URL,
+                    callback_timeout_s=settings.INGEST_CALLBACK_TIMEOUT_SECONDS,
+                    synchronous=settings.INGEST_QUEUE_SYNCHRONOUS
+                )
+    return _ingest_queue_instance
+
+def get_bulk_learn_manager() -> BulkLearnManager:
+    global _bulk_learn_instance
+    if not _bulk_learn_instance:
+        with _bulk_learn_lock:
+            if not _bulk_learn_instance:
+                _bulk_learn_instance = BulkLearnManager(
+                    max_alerts=settings.LEARN_BULK_MAX_ALERTS,
+                    max_concurrent_jobs=settings.LEARN_BULK_MAX_CONCURRENT_JOBS
+                )
+    return _bulk_learn_instance
@@ -1,81 +1,527 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from typing import Dict, Any
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+from typing import AsyncIterator, Dict, Any, List, Optional
 from app.models.schemas import SOCAlert
+from app.models.codec import AlertDecodeError, decode_alert, encode_verdict
 from app.services.sentinel import SovereignSentinel
 from app.services.vector_engine import VectorFilterService
 from app.services.llm_analyzer import LLMAnalysisService
+from app.services.llm_scheduler import SchedulerSaturated
+from app.services.intent_pool import IntentAnalysisPool
+from app.services.alert_stream import AlertStream, StreamLineTooLong
+from app.services.ingest_queue import QueueSaturated, RetryableTriageError
+from app.services.bulk_learn import BulkLearnManager
 from app.services.integrity import integrity_service
-from app.api.dependencies import get_sentinel, get_vector_service
+from app.services.verdict_cache import VerdictCache
+from app.api.hmac_gate import HMAC_VERIFIED_SCOPE_KEY
+from app.api.dependencies import get_sentinel, get_vector_service, get_verdict_cache, get_llm_service, get_intent_pool, get_ingest_queue, get_bulk_learn_manager
+from app.core.config import settings
 from app.core.logger import logger
+from app.core.metrics import INGEST_ERRORS, TRIAGE_LATENCY, VERDICTS, StageTimer
 
 router = APIRouter(tags=["SOC Triage Engine"])
 
-# Initialize the LLM Analyst (Stage 3)
-llm_service = LLMAnalysisService()
+def _reject_poisoned_alert(alert: SOCAlert, intent_pool: IntentAnalysisPool) -> Dict[str, Any]:
+    """Stage 0 failure path: flags the alert and routes intent analysis to the background."""
+    logger.warning(
+        f"INTEGRITY COMPROMISED: {alert.alert_id}. Merkle proof failed.",
+        extra={"alert_id": alert.alert_id, "stage": "hmac", "action": "CRITICAL_ESCALATION"}
+    )
+
+    # Mandate: Intent Invalidation triggers immediate signal to LLM
+    alert.threat_indicators.append("CRYPTOGRAPHIC_PROVENANCE_FAILURE: ADVERSARIAL POISONING INTENT")
+    alert.severity = "Critical"
+
+    # Fire-and-forget into the bounded worker pool. Floods are deduplicated, sampled or dropped
+    # rather than becoming unbounded concurrent LLM calls.
+    if intent_pool.submit(alert):
+        logger.info("SIGNALING LLM: Analyzing poisoned payload intent in background.", extra={"alert_id": alert.alert_id, "stage": "hmac"})
+        reason = "HMAC Invalid. Poisoning Detected. Payload dropped at cryptographic gate. Intent analysis routed to background."
+    else:
+        reason = "HMAC Invalid. Poisoning Detected. Payload dropped at cryptographic gate. Intent analysis skipped (duplicate or overload)."
+
+    # Immediate physical drop. Sub-5ms latency restored.
+    return {
+        "alert_id": alert.alert_id,
+        "action": "CRITICAL_ESCALATION",
+        "reason": reason
+    }
+
+def _preverified(request: Request) -> bool:
+    """True when the raw-body HMAC gate authenticated this request before it was parsed."""
+    return request.scope.get(HMAC_VERIFIED_SCOPE_KEY, False)
+
+def _backpressure(e: SchedulerSaturated) -> HTTPException:
+    """Maps Stage 3 saturation onto HTTP 429 so the SIEM backs off instead of timing out."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Stage 3 analyst is saturated. Retry later.",
+        headers={"Retry-After": str(int(e.retry_after_s))}
+    )
+
+def _sentinel_block_verdict(alert: SOCAlert) -> Dict[str, Any]:
+    logger.warning(
+        f"CRITICAL: Attack detected in payload for {alert.alert_id}",
+        extra={"alert_id": alert.alert_id, "stage": "sentinel", "action": "CRITICAL_ESCALATION"}
+    )
+    return {"alert_id": alert.alert_id, "action": "CRITICAL_ESCALATION", "reason": "DPI Sentinel detected malicious payload"}
+
+def _suppress_verdict(alert: SOCAlert) -> Dict[str, Any]:
+    logger.info(
+        f"SUPPRESSING: {alert.alert_id} matches known false positive.",
+        extra={"alert_id": alert.alert_id, "stage": "vector", "action": "SUPPRESS"}
+    )
+    return {
+        "alert_id": alert.alert_id,
+        "action": "SUPPRESS",
+        "reason": "Matches >95% confidence with historical false positive in Vector DB"
+    }
+
+async def _llm_verdict(
+    alert: SOCAlert,
+    llm_service: LLMAnalysisService,
+    verdict_cache: Optional[VerdictCache] = None,
+    cache_key: Optional[str] = None,
+    embedding: Optional[List[float]] = None
+) -> Dict[str, Any]:
+    logger.info(f"ROUTING: {alert.alert_id} requires Gemini 2.5 Flash analysis.", extra={"alert_id": alert.alert_id, "stage": "llm"})
+    llm_decision = await llm_service.analyze_alert(alert, embedding)
+
+    verdict = {
+        "alert_id": alert.alert_id,
+        "action": getattr(llm_decision, "recommended_action", "MANUAL_REVIEW"),
+        "reason": getattr(llm_decision, "reasoning", "No analysis provided.")
+    }
+    logger.info(
+        f"VERDICT: {alert.alert_id} resolved to {verdict['action']} by Stage 3.",
+        extra={"alert_id": alert.alert_id, "stage": "llm", "action": verdict["action"]}
+    )
+
+    # Fail-closed fallbacks are never memoized: the next re-fire must retry OpenRouter
+    if cache_key is not None and not getattr(llm_decision, "degraded", False):
+        verdict_cache.put(cache_key, verdict)
+    return verdict
+
+def _cache_key(alert: SOCAlert) -> Optional[str]:
+    if not settings.VERDICT_CACHE_ENABLED:
+        return None
+    return VerdictCache.make_key(alert.raw_payload, alert.severity)
+
+def _cached_verdict(alert: SOCAlert, verdict_cache: VerdictCache, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    if cache_key is None:
+        return None
+    cached = verdict_cache.get(cache_key)
+    if cached is None:
+        return None
+    logger.info(
+        f"CACHE HIT: {alert.alert_id} re-fired payload resolved to {cached['action']}.",
+        extra={"alert_id": alert.alert_id, "stage": "verdict_cache", "action": cached["action"]}
+    )
+    return {**cached, "alert_id": alert.alert_id}
+
+def _remember(verdict_cache: VerdictCache, cache_key: Optional[str], verdict: Dict[str, Any]) -> Dict[str, Any]:
+    if cache_key is not None:
+        verdict_cache.put(cache_key, verdict)
+    return verdict
+
+def _finish(timer: StageTimer, stage: str, verdict: Dict[str, Any]) -> Dict[str, Any]:
+    """Records the outcome and returns a copy carrying the measured latency. Cached verdicts stay latency-free."""
+    elapsed_ms = timer.elapsed_ms()
+    TRIAGE_LATENCY.observe(elapsed_ms / 1000.0, stage=stage)
+    VERDICTS.inc(action=verdict["action"], stage=stage)
+    return {**verdict, "latency_ms": round(elapsed_ms, 3)}
+
+async def _triage(
+    alert: SOCAlert,
+    sentinel: SovereignSentinel,
+    vector_db: VectorFilterService,
+    verdict_cache: VerdictCache,
+    llm_service: LLMAnalysisService,
+    intent_pool: IntentAnalysisPool,
+    preverified: bool = False
+) -> Dict[str, Any]:
+    """The single-alert pipeline shared by the request/response and streaming routes."""
+    timer = StageTimer()
+
+    # STAGE 0: Mission A - Cryptographic Provenance Gate (skipped when the raw-body gate already authenticated the request)
+    with timer.stage("hmac"):
+        authentic = preverified or integrity_service.verify_siem_payload(alert.raw_payload, alert.hmac_signature)
+    if not authentic:
+        return _finish(timer, "hmac", _reject_poisoned_alert(alert, intent_pool))
+
+    # STAGE 0.5: Content-hash verdict cache. Authenticated re-fires return in microseconds.
+    with timer.stage("verdict_cache"):
+        cache_key = _cache_key(alert)
+        cached = _cached_verdict(alert, verdict_cache, cache_key)
+    if cached is not None:
+        return _finish(timer, "verdict_cache", cached)
+
+    # STAGE 1.5: DPI Sentinel (Instant CPU-bound execution)
+    with timer.stage("sentinel"):
+        is_malicious = await sentinel.scan_payload_async(alert.raw_payload)
+    if is_malicious:
+        return _finish(timer, "sentinel", _remember(verdict_cache, cache_key, _sentinel_block_verdict(alert)))
+
+    # STAGE 2: Vector Search (AWAITED to yield the event loop during network I/O)
+    # Encode and query are timed separately inside the vector engine.
+    try:
+        with timer.stage("vector"):
+            is_fp, embedding = await vector_db.check_false_positive(alert.raw_payload, alert.severity)
+        if is_fp:
+            return _finish(timer, "vector", _remember(verdict_cache, cache_key, _suppress_verdict(alert)))
+    except Exception as e:
+        logger.error(f"Vector DB integration failed: {str(e)}")
+        INGEST_ERRORS.inc(reason="vector_error")
+        raise HTTPException(status_code=500, detail="Internal Vector Database Error")
+
+    # STAGE 3: Gemini 2.5 Flash Analyst (AWAITED to yield the event loop)
+    try:
+        with timer.stage("llm"):
+            verdict = await _llm_verdict(alert, llm_service, verdict_cache, cache_key, embedding)
+    except SchedulerSaturated as e:
+        INGEST_ERRORS.inc(reason="stage3_saturated")
+        raise _backpressure(e)
+    return _finish(timer, "llm", verdict)
 
 @router.post(
-    "/alerts/ingest", 
+    "/alerts/ingest",
     status_code=status.HTTP_200_OK,
     summary="Ingest & Triage SIEM Alert",
     description="Enterprise pipeline: Stage 0 KMS HMAC, Stage 1.5 DPI Sentinel, Stage 2 Pinecone Vector Brain, Stage 3 Gemini 2.5 Flash."
 )
 async def ingest_alert(
-    alert: SOCAlert, 
-    background_tasks: BackgroundTasks,
+    alert: SOCAlert,
+    request: Request,
     sentinel: SovereignSentinel = Depends(get_sentinel),
-    vector_db: VectorFilterService = Depends(get_vector_service)
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service),
+    intent_pool: IntentAnalysisPool = Depends(get_intent_pool)
 ) -> Dict[str, Any]:
-    logger.info(f"Ingesting alert: {alert.alert_id}")
-
-    # STAGE 0: Mission A - Cryptographic Provenance Gate
-    if not integrity_service.verify_siem_payload(alert.raw_payload, alert.hmac_signature):
-        logger.warning(f"INTEGRITY COMPROMISED: {alert.alert_id}. Merkle proof failed.")
-        
-        # Mandate: Intent Invalidation triggers immediate signal to LLM
-        alert.threat_indicators.append("CRYPTOGRAPHIC_PROVENANCE_FAILURE: ADVERSARIAL POISONING INTENT")
-        alert.severity = "Critical"
-        
-        logger.info("SIGNALING LLM: Analyzing poisoned payload intent in background.")
-        
-        # Fire-and-forget: Pass the LLM signaling to a detached background thread.
-        # This consumes ZERO cycles in the primary response loop.
-        background_tasks.add_task(llm_service.analyze_alert, alert)
-        
-        # Immediate physical drop. Sub-5ms latency restored.
-        return {
+    logger.info(f"Ingesting alert: {alert.alert_id}", extra={"alert_id": alert.alert_id, "stage": "ingest"})
+    preverified = _preverified(request)
+    if settings.INGEST_MODE == "queued":
+        return await _accept_alert(alert, intent_pool, preverified)
+    return await _triage(alert, sentinel, vector_db, verdict_cache, llm_service, intent_pool, preverified)
+
+async def _accept_alert(alert: SOCAlert, intent_pool: IntentAnalysisPool, preverified: bool = False) -> Any:
+    """Accept-then-process: journal the alert and acknowledge before any downstream stage runs."""
+    timer = StageTimer()
+
+    # Forgeries are still dropped inline so a poisoning flood cannot fill the journal
+    with timer.stage("hmac"):
+        authentic = preverified or integrity_service.verify_siem_payload(alert.raw_payload, alert.hmac_signature)
+    if not authentic:
+        return _finish(timer, "hmac", _reject_poisoned_alert(alert, intent_pool))
+
+    try:
+        with timer.stage("enqueue"):
+            seq = await get_ingest_queue().enqueue(alert)
+    except QueueSaturated as e:
+        INGEST_ERRORS.inc(reason="ingest_queue_full")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Ingest queue backlog is full. Retry later.",
+            headers={"Retry-After": str(int(e.retry_after_s))}
+        )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
             "alert_id": alert.alert_id,
-            "action": "CRITICAL_ESCALATION",
-            "reason": "HMAC Invalid. Poisoning Detected. Payload dropped at cryptographic gate. Intent analysis routed to background."
+            "status": "queued",
+            "seq": seq,
+            "result_url": f"{settings.API_V1_STR}/alerts/results/{alert.alert_id}"
         }
-    
-    # STAGE 1.5: DPI Sentinel (Instant CPU-bound execution)
-    if sentinel.scan_payload(alert.raw_payload):
-        logger.warning(f"CRITICAL: Attack detected in payload for {alert.alert_id}")
-        return {"alert_id": alert.alert_id, "action": "CRITICAL_ESCALATION", "reason": "DPI Sentinel detected malicious payload"}
+    )
 
-    # STAGE 2: Vector Search (AWAITED to yield the event loop during network I/O)
+async def triage_queued_alert(alert: SOCAlert) -> Dict[str, Any]:
+    """Ingest queue processor. Downstream slowdowns are retried from the journal instead of failing the alert."""
+    # Only authenticated alerts are journaled, so Stage 0 is not repeated
     try:
-        if await vector_db.is_known_false_positive(alert.raw_payload, alert.severity):
-            logger.info(f"SUPPRESSING: {alert.alert_id} matches known false positive.")
-            return {
-                "alert_id": alert.alert_id, 
-                "action": "SUPPRESS", 
-                "reason": "Matches >95% confidence with historical false positive in Vector DB"
-            }
+        return await _triage(
+            alert, get_sentinel(), get_vector_service(), get_verdict_cache(), get_llm_service(), get_intent_pool(), preverified=True
+        )
+    except HTTPException as e:
+        retry_after = float(e.headers["Retry-After"]) if e.headers and "Retry-After" in e.headers else 1.0
+        raise RetryableTriageError(str(e.detail), retry_after_s=retry_after)
+
+@router.get(
+    "/alerts/results/{alert_id}",
+    summary="Queued Alert Result",
+    description="State of the latest queued submission for an alert_id (pending, processing, done) and its verdict once triaged."
+)
+async def queued_alert_result(alert_id: str) -> Dict[str, Any]:
+    if settings.INGEST_MODE != "queued":
+        raise HTTPException(status_code=404, detail="Queued ingest is disabled (INGEST_MODE=sync).")
+    result = await get_ingest_queue().result(alert_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No queued submission for {alert_id}.")
+    return result
+
+@router.post(
+    "/alerts/ingest/fast",
+    status_code=status.HTTP_200_OK,
+    summary="Ingest & Triage SIEM Alert (fast codec)",
+    description="Same pipeline and schema as /alerts/ingest. The body is decoded straight from bytes by pydantic-core (msgspec structs when FAST_CODEC_MSGSPEC is set) and the verdict rendered with orjson, skipping FastAPI's generic validation and response encoding.",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/SOCAlert"}}}
+        }
+    }
+)
+async def ingest_alert_fast(
+    request: Request,
+    sentinel: SovereignSentinel = Depends(get_sentinel),
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service),
+    intent_pool: IntentAnalysisPool = Depends(get_intent_pool)
+) -> Response:
+    try:
+        alert = decode_alert(await request.body())
+    except AlertDecodeError as e:
+        return Response(
+            content=encode_verdict({"detail": e.errors}),
+            status_code=422,
+            media_type="application/json"
+        )
+
+    logger.info(f"Ingesting alert: {alert.alert_id}", extra={"alert_id": alert.alert_id, "stage": "ingest"})
+    preverified = _preverified(request)
+    if settings.INGEST_MODE == "queued":
+        return await _accept_alert(alert, intent_pool, preverified)
+    verdict = await _triage(alert, sentinel, vector_db, verdict_cache, llm_service, intent_pool, preverified)
+    return Response(content=encode_verdict(verdict), media_type="application/json")
+
+def _open_stream(
+    sentinel: SovereignSentinel,
+    vector_db: VectorFilterService,
+    verdict_cache: VerdictCache,
+    llm_service: LLMAnalysisService,
+    intent_pool: IntentAnalysisPool
+) -> AlertStream:
+    async def triage(alert: SOCAlert) -> Dict[str, Any]:
+        # Per-alert failures become error lines; they must never tear down the whole connection
+        try:
+            return await _triage(alert, sentinel, vector_db, verdict_cache, llm_service, intent_pool)
+        except HTTPException as e:
+            error = {"alert_id": alert.alert_id, "error": e.detail, "status_code": e.status_code}
+            if e.headers and "Retry-After" in e.headers:
+                error["retry_after_s"] = int(e.headers["Retry-After"])
+            return error
+
+    return AlertStream(
+        triage,
+        max_in_flight=settings.STREAM_MAX_IN_FLIGHT,
+        max_pending=settings.STREAM_MAX_PENDING_VERDICTS,
+        max_line_bytes=settings.STREAM_MAX_LINE_BYTES
+    )
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    Streams verdicts while the request body is still being read.
+    Starlette's stock disconnect listener would consume (and discard) the remaining body chunks,
+    so disconnects surface through request.stream() instead.
+    """
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+@router.post(
+    "/alerts/ingest/stream",
+    status_code=status.HTTP_200_OK,
+    summary="Streaming Ingest & Triage (NDJSON)",
+    description="Full-duplex NDJSON: one alert per request line, one verdict per response line tagged with alert_id, emitted as soon as each alert resolves (out of order)."
+)
+async def ingest_alert_stream(
+    request: Request,
+    sentinel: SovereignSentinel = Depends(get_sentinel),
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service),
+    intent_pool: IntentAnalysisPool = Depends(get_intent_pool)
+) -> StreamingResponse:
+    stream = _open_stream(sentinel, vector_db, verdict_cache, llm_service, intent_pool)
+    logger.info("STREAM OPENED: NDJSON ingest.")
+
+    async def pump() -> None:
+        try:
+            await stream.feed_ndjson(request.stream())
+        except StreamLineTooLong as e:
+            await stream.fail(str(e), status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except ClientDisconnect:
+            stream.abort()
+        finally:
+            await stream.close()
+
+    async def body() -> AsyncIterator[bytes]:
+        reader = asyncio.create_task(pump())
+        try:
+            async for verdict in stream.verdicts():
+                yield (json.dumps(verdict) + "\n").encode("utf-8")
+        finally:
+            reader.cancel()
+            stream.abort()
+            logger.info(f"STREAM CLOSED: {stream.stats()}")
+
+    return _DuplexStreamingResponse(body(), media_type="application/x-ndjson")
+
+@router.websocket("/alerts/stream")
+async def ingest_alert_websocket(
+    websocket: WebSocket,
+    sentinel: SovereignSentinel = Depends(get_sentinel),
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service),
+    intent_pool: IntentAnalysisPool = Depends(get_intent_pool)
+) -> None:
+    """One alert per text or binary frame in, one verdict frame out per alert as soon as it resolves."""
+    await websocket.accept()
+    stream = _open_stream(sentinel, vector_db, verdict_cache, llm_service, intent_pool)
+    logger.info("STREAM OPENED: WebSocket ingest.")
+
+    async def pump() -> None:
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    stream.abort()
+                    return
+                frame = message.get("text") if message.get("text") is not None else message.get("bytes")
+                if frame:
+                    await stream.submit(frame)
+        finally:
+            await stream.close()
+
+    reader = asyncio.create_task(pump())
+    try:
+        async for verdict in stream.verdicts():
+            await websocket.send_json(verdict)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        stream.abort()
+        logger.info(f"STREAM CLOSED: {stream.stats()}")
+
+@router.post(
+    "/alerts/ingest/batch",
+    status_code=status.HTTP_200_OK,
+    summary="Batch Ingest & Triage SIEM Alerts",
+    description="Runs the full pipeline across a list of alerts in one round trip: bulk HMAC and Sentinel gates, one vectorized encode, concurrent Pinecone queries. Verdicts are returned in input order, each with its own latency_ms. Alerts Stage 3 could not admit come back as per-alert 429 entries carrying retry_after_s."
+)
+async def ingest_alert_batch(
+    alerts: List[SOCAlert],
+    request: Request,
+    sentinel: SovereignSentinel = Depends(get_sentinel),
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service),
+    intent_pool: IntentAnalysisPool = Depends(get_intent_pool)
+) -> List[Dict[str, Any]]:
+    if len(alerts) > settings.BATCH_MAX_ALERTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.BATCH_MAX_ALERTS} alerts."
+        )
+
+    logger.info(f"Ingesting alert batch: {len(alerts)} alerts")
+    # Every alert is timed from batch arrival to the moment its own verdict is known
+    timer = StageTimer()
+    verdicts: List[Optional[Dict[str, Any]]] = [None] * len(alerts)
+
+    # STAGE 0 + 0.5 + 1.5: Cheap CPU gates across the whole batch. Survivors keep their original index.
+    cache_keys: List[Optional[str]] = [None] * len(alerts)
+    survivors: List[int] = []
+    preverified = _preverified(request)
+    for i, alert in enumerate(alerts):
+        if not preverified and not integrity_service.verify_siem_payload(alert.raw_payload, alert.hmac_signature):
+            verdicts[i] = _finish(timer, "hmac", _reject_poisoned_alert(alert, intent_pool))
+            continue
+
+        cache_keys[i] = _cache_key(alert)
+        cached = _cached_verdict(alert, verdict_cache, cache_keys[i])
+        if cached is not None:
+            verdicts[i] = _finish(timer, "verdict_cache", cached)
+        elif await sentinel.scan_payload_async(alert.raw_payload):
+            verdicts[i] = _finish(timer, "sentinel", _remember(verdict_cache, cache_keys[i], _sentinel_block_verdict(alert)))
+        else:
+            survivors.append(i)
+
+    # STAGE 2: One batched encode + concurrent vector queries
+    try:
+        suppressed, embeddings = await vector_db.batch_check_false_positive(
+            [alerts[i].raw_payload for i in survivors],
+            [alerts[i].severity for i in survivors]
+        )
     except Exception as e:
         logger.error(f"Vector DB integration failed: {str(e)}")
+        INGEST_ERRORS.inc(reason="vector_error")
         raise HTTPException(status_code=500, detail="Internal Vector Database Error")
 
-    # STAGE 3: Gemini 2.5 Flash Analyst (AWAITED to yield the event loop)
-    logger.info(f"ROUTING: {alert.alert_id} requires Gemini 2.5 Flash analysis.")
-    llm_decision = await llm_service.analyze_alert(alert)
-    
+    novel: List[int] = []
+    novel_embeddings: List[Optional[List[float]]] = []
+    for position, (i, is_fp) in enumerate(zip(survivors, suppressed)):
+        if is_fp:
+            verdicts[i] = _finish(timer, "vector", _remember(verdict_cache, cache_keys[i], _suppress_verdict(alerts[i])))
+        else:
+            novel.append(i)
+            novel_embeddings.append(embeddings[position] if embeddings is not None else None)
+
+    # STAGE 3: Novel alerts are analyzed concurrently. Duplicates inside the batch coalesce on one call.
+    # Saturation is reported per alert, like the streaming routes: the rest of the batch keeps its verdicts,
+    # and anything resolved before saturation is already cached, so the SIEM only re-sends the rejected alerts.
+    async def analyze(i: int, embedding: Optional[List[float]]) -> None:
+        try:
+            verdict = await _llm_verdict(alerts[i], llm_service, verdict_cache, cache_keys[i], embedding)
+        except SchedulerSaturated as e:
+            INGEST_ERRORS.inc(reason="stage3_saturated")
+            rejected = _backpressure(e)
+            verdicts[i] = {
+                "alert_id": alerts[i].alert_id,
+                "error": rejected.detail,
+                "status_code": rejected.status_code,
+                "retry_after_s": int(rejected.headers["Retry-After"])
+            }
+            return
+        verdicts[i] = _finish(timer, "llm", verdict)
+
+    await asyncio.gather(*(analyze(i, embedding) for i, embedding in zip(novel, novel_embeddings)))
+    return verdicts
+
+@router.get(
+    "/engine/stats",
+    tags=["System"],
+    summary="Engine Runtime Statistics",
+    description="Exposes internal queue depths, batch sizes and wait times of the triage pipeline."
+)
+async def engine_stats(
+    sentinel: SovereignSentinel = Depends(get_sentinel),
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service),
+    intent_pool: IntentAnalysisPool = Depends(get_intent_pool)
+) -> Dict[str, Any]:
     return {
-        "alert_id": alert.alert_id,
-        "action": getattr(llm_decision, "recommended_action", "MANUAL_REVIEW"),
-        "reason": getattr(llm_decision, "reasoning", "No analysis provided.")
+        "sentinel": sentinel.stats(),
+        "vector_engine": vector_db.stats(),
+        "verdict_cache": verdict_cache.stats(),
+        "llm_cache": llm_service.cache.stats() if llm_service.cache is not None else None,
+        "llm_scheduler": llm_service.scheduler.stats(),
+        "llm_prompts": llm_service.prompts.stats(),
+        "intent_pool": intent_pool.stats(),
+        "ingest_queue": get_ingest_queue().stats() if settings.INGEST_MODE == "queued" else None
     }
 
+def _forget_verdicts(verdict_cache: VerdictCache, llm_service: LLMAnalysisService) -> None:
+    """Previously cached escalations, and Stage 3 decisions, may now be suppressible."""
+    verdict_cache.invalidate()
+    if llm_service.cache is not None:
+        llm_service.cache.invalidate()
+
 @router.post(
     "/alerts/learn",
     status_code=status.HTTP_201_CREATED,
@@ -84,18 +530,79 @@ async def ingest_alert(
 )
 async def teach_vector_brain(
     alert: SOCAlert,
-    vector_db: VectorFilterService = Depends(get_vector_service)
+    request: Request,
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service)
 ) -> Dict[str, str]:
     logger.info(f"Teaching Vector Brain safe behavior for alert: {alert.alert_id}")
-    
+
     # Strictly enforce provenance before polluting our vector memory
-    if not integrity_service.verify_siem_payload(alert.raw_payload, alert.hmac_signature):
+    if not _preverified(request) and not integrity_service.verify_siem_payload(alert.raw_payload, alert.hmac_signature):
         raise HTTPException(status_code=403, detail="Cannot memorize unverified payloads. HMAC invalid.")
 
     try:
-        success = await vector_db.memorize_safe_behavior(alert.alert_id, alert.raw_payload)
+        success = await vector_db.memorize_safe_behavior(alert.alert_id, alert.raw_payload, alert.severity)
         if success:
+            _forget_verdicts(verdict_cache, llm_service)
             return {"status": "success", "message": f"Vector Brain successfully memorized {alert.alert_id} as a False Positive."}
     except Exception as e:
         logger.error(f"Learning endpoint failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to write to Pinecone Database")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to write to Vector Database")
+
+@router.post(
+    "/alerts/learn/bulk",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Bulk Memorize False Positives",
+    description="Accepts a JSON array or NDJSON (Content-Type: application/x-ndjson) of closed false-positive alerts. HMACs are verified in bulk, payloads are embedded in large batches, near-duplicates are skipped and the rest upserted in chunks. Returns a job to poll for progress."
+)
+async def teach_vector_brain_bulk(
+    request: Request,
+    vector_db: VectorFilterService = Depends(get_vector_service),
+    verdict_cache: VerdictCache = Depends(get_verdict_cache),
+    llm_service: LLMAnalysisService = Depends(get_llm_service),
+    bulk_learn: BulkLearnManager = Depends(get_bulk_learn_manager)
+) -> Dict[str, Any]:
+    # Size is enforced while reading, before anything is parsed
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds {settings.LEARN_BULK_MAX_BYTES} bytes. Split it into several jobs."
+    )
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.LEARN_BULK_MAX_BYTES:
+        raise too_large
+    chunks: List[bytes] = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > settings.LEARN_BULK_MAX_BYTES:
+            raise too_large
+        chunks.append(chunk)
+    body = b"".join(chunks)
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+
+    job = bulk_learn.submit(
+        body, ndjson, vector_db,
+        preverified=_preverified(request),
+        on_complete=lambda _: _forget_verdicts(verdict_cache, llm_service)
+    )
+    logger.info(f"Bulk learn job {job.job_id} accepted ({len(body)} bytes, {'ndjson' if ndjson else 'json'}).")
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"{settings.API_V1_STR}/alerts/learn/bulk/{job.job_id}"
+    }
+
+@router.get(
+    "/alerts/learn/bulk/{job_id}",
+    summary="Bulk Learn Progress",
+    description="Per-job counters (stored, skipped, rejected), progress fraction and throughput."
+)
+async def bulk_learn_progress(
+    job_id: str,
+    bulk_learn: BulkLearnManager = Depends(get_bulk_learn_manager)
+) -> Dict[str, Any]:
+    job = bulk_learn.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown bulk learn job {job_id}.")
+    return job.stats()
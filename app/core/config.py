@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     # Core Application Settings
@@ -8,18 +8,169 @@ class Settings(BaseSettings):
     VERSION: str = "1.0.0" 
     API_V1_STR: str = "/api/v1"
     
-    # Cloud API Keys
-    PINECONE_API_KEY: str
-    PINECONE_INDEX_NAME: str
+    # Logging: a background listener formats and writes; callers only sample and enqueue
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" (one structured object per line) or "text"
+    LOG_QUEUE_MAX_RECORDS: int = 10000
+    LOG_INFO_RATE_PER_SECOND: float = 50.0  # Per (logger, stage); 0 disables rate limiting
+    LOG_SUPPRESS_SAMPLE_RATE: float = 0.05  # Escalations and integrity failures are never sampled
+
+    # Deployment label reported by /health (e.g. "production" on Render)
+    ENVIRONMENT: str = "development"
+
+    # Cloud API Keys (Pinecone is optional when the local vector store backend is selected)
+    PINECONE_API_KEY: Optional[str] = None
+    PINECONE_INDEX_NAME: Optional[str] = None
     
     # New mandatory key for OpenRouter
     OPENROUTER_API_KEY: str
+    # Overridable so benchmarks and air-gapped gateways can point Stage 3 at an OpenAI-compatible endpoint
+    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     
     # Deprecated Gemini key (Marked optional to allow boot without it)
     GEMINI_API_KEY: Optional[str] = None
     
     # Mission A: Local HMAC Secret for Render Deployment
     HMAC_SECRET_KEY: str = "super_secret_local_dev_key_override_in_render"
+    # Stage 0 placement: "body" verifies each alert's hmac_signature field after parsing (legacy),
+    # "header" requires HMAC_HEADER_NAME over the raw request body and drops forgeries before parsing,
+    # "either" verifies the header when present and falls back to the body field otherwise
+    # Validated at boot: an unknown mode refuses to start instead of silently falling back to "body"
+    HMAC_MODE: Literal["body", "header", "either"] = "body"
+    HMAC_HEADER_NAME: str = "X-Axon-Signature"
+    # The header gate buffers the body to replay it after verification; larger requests get 413
+    HMAC_GATE_MAX_BODY_BYTES: int = 67108864
+
+    # Batch Ingestion: Upper bound on alerts per request and Stage 2 fan-out
+    BATCH_MAX_ALERTS: int = 1000
+    EMBEDDING_BATCH_SIZE: int = 64
+    VECTOR_QUERY_CONCURRENCY: int = 32
+
+    # Streaming Ingestion (NDJSON / WebSocket): per-connection flow control
+    STREAM_MAX_IN_FLIGHT: int = 64
+    STREAM_MAX_PENDING_VERDICTS: int = 256
+    STREAM_MAX_LINE_BYTES: int = 1048576
+
+    # Fast Ingest Codec (/alerts/ingest/fast): pydantic-core decodes by default. msgspec structs are opt-in:
+    # on Pydantic 2.x wrapping the struct into a SOCAlert costs more than the decode saves (see benchmarks.bench_codec)
+    FAST_CODEC_MSGSPEC: bool = False
+
+    # Bulk Learning: replaying closed false-positive tickets into the Vector Brain
+    LEARN_BULK_MAX_ALERTS: int = 100000
+    # Checked while the upload is read, before parsing: 100k alerts at ~2 KB each
+    LEARN_BULK_MAX_BYTES: int = 256 * 1024 * 1024
+    LEARN_BULK_MAX_CONCURRENT_JOBS: int = 1
+    LEARN_ENCODE_CHUNK_SIZE: int = 1024
+    LEARN_UPSERT_BATCH_SIZE: int = 100
+    LEARN_UPSERT_CONCURRENCY: int = 4
+    # Skip vectors this close to one already stored. Matches the strictest (Critical) suppression threshold.
+    LEARN_COMPACTION_THRESHOLD: float = 0.99
+
+    # Ingest Mode: "sync" triages inside the request; "queued" journals the alert, answers 202 and triages in the background
+    INGEST_MODE: str = "sync"
+    INGEST_QUEUE_PATH: str = "data/ingest_queue.sqlite3"
+    INGEST_QUEUE_SYNCHRONOUS: str = "NORMAL"  # FULL also survives power loss, at an fsync per group commit
+    INGEST_QUEUE_WORKERS: int = 16
+    INGEST_QUEUE_MAX_PENDING: int = 100000
+    INGEST_QUEUE_MAX_ATTEMPTS: int = 5
+    INGEST_RESULT_TTL_SECONDS: float = 86400.0
+    INGEST_CALLBACK_URL: Optional[str] = None
+    INGEST_CALLBACK_TIMEOUT_SECONDS: float = 5.0
+
+    # Stage 2 Micro-Batching: Coalesce concurrent single-alert encodes
+    EMBED_MICROBATCH_ENABLED: bool = True
+    EMBED_BATCH_WINDOW_MS: float = 3.0
+    EMBED_MAX_BATCH_SIZE: int = 32
+    EMBED_MAX_CONCURRENT_BATCHES: int = 1
+
+    # Verdict Cache: Byte-identical re-fires short-circuit Stages 1.5 - 3
+    VERDICT_CACHE_ENABLED: bool = True
+    VERDICT_CACHE_MAX_ENTRIES: int = 50000
+    VERDICT_CACHE_TTL_SECONDS: float = 300.0
+
+    # Stage 2 Encoder: "torch" (SentenceTransformer), "onnx" (exported, int8-quantized, loaded from a local directory)
+    # or "ipc" (shared embedding worker processes, see app.services.embedding_ipc)
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    EMBEDDING_MAX_SEQ_LENGTH: int = 256
+    ONNX_MODEL_DIR: str = "models/all-MiniLM-L6-v2-onnx"
+    ONNX_MODEL_FILE: str = "model_int8.onnx"
+    ONNX_INTRA_OP_THREADS: int = 0
+
+    # Stage 2 Embedding Tier ("ipc" backend): dedicated model processes shared by every API worker
+    EMBEDDING_IPC_SOCKET_DIR: str = "/tmp/axon-embed"
+    EMBEDDING_IPC_WORKERS: int = 1
+    EMBEDDING_IPC_CORES_PER_WORKER: int = 0
+    EMBEDDING_IPC_WORKER_BACKEND: str = "torch"
+    EMBEDDING_IPC_BUFFER_ROWS: int = 256
+    EMBEDDING_IPC_CONNECT_TIMEOUT_S: float = 60.0
+
+    # Stage 2 Template Mining: Drain-style masking of IPs, timestamps, GUIDs, hostnames and long numbers before embedding.
+    # Off by default: it changes what Stage 2 embeds from raw to masked text, and an index built from raw text
+    # scores differently against masked queries. Migration: point PINECONE_INDEX_NAME (or LOCAL_VECTOR_STORE_PATH)
+    # at an empty index, enable mining, and replay the known false positives through POST /alerts/learn/bulk.
+    TEMPLATE_MINING_ENABLED: bool = False
+    TEMPLATE_SIMILARITY_THRESHOLD: float = 0.5
+    TEMPLATE_PREFIX_TOKENS: int = 2
+    TEMPLATE_MAX_TEMPLATES: int = 20000
+    # Learned-template shortcut applies up to this severity; High and Critical always take the vector threshold
+    TEMPLATE_SHORTCUT_MAX_SEVERITY: str = "Medium"
+    # Learned lines ledger, replayed on startup. Reset it together with the index it mirrors.
+    TEMPLATE_LEARNED_PATH: Optional[str] = "data/learned_templates.jsonl"
+
+    # Stage 2 Storage Backend: "pinecone" (managed) or "local" (air-gapped, memory-mapped)
+    VECTOR_STORE_BACKEND: str = "pinecone"
+    LOCAL_VECTOR_STORE_PATH: str = "data/vector_store"
+    LOCAL_VECTOR_STORE_DTYPE: str = "float32"
+
+    # Stage 2 Resilience (pinecone backend): per-query deadline, p95 hedging, circuit breaker, local fallback
+    VECTOR_RESILIENCE_ENABLED: bool = True
+    VECTOR_QUERY_DEADLINE_MS: float = 250.0
+    VECTOR_HEDGE_ENABLED: bool = True
+    VECTOR_HEDGE_MIN_DELAY_MS: float = 20.0
+    VECTOR_BREAKER_FAILURE_THRESHOLD: int = 5
+    VECTOR_BREAKER_COOLDOWN_SECONDS: float = 30.0
+    VECTOR_SNAPSHOT_MAX_VECTORS: int = 50000
+    VECTOR_SNAPSHOT_PATH: Optional[str] = "data/vector_snapshot.npz"
+    VECTOR_SNAPSHOT_SAVE_INTERVAL_SECONDS: float = 300.0
+    # Once the snapshot is full, share of false-positive lookups that also fetch vector values to refresh it
+    VECTOR_SNAPSHOT_FETCH_SAMPLE_RATE: float = 0.05
+
+    # Stage 1.5 Streaming DPI: Oversized payloads are scanned in overlapping windows
+    SENTINEL_INLINE_SCAN_BYTES: int = 50000
+    SENTINEL_STREAM_WINDOW_BYTES: int = 65536
+    SENTINEL_STREAM_OVERLAP_BYTES: int = 1024
+    SENTINEL_STREAM_MAX_BYTES: int = 32 * 1024 * 1024
+    SENTINEL_PROCESS_POOL_WORKERS: int = 0
+    SENTINEL_PROCESS_POOL_MIN_BYTES: int = 1024 * 1024
+
+    # Stage 1.5 Signature Packs: JSON file or directory, hot-reloaded in the background
+    SENTINEL_SIGNATURE_PATH: Optional[str] = None
+    SENTINEL_RELOAD_INTERVAL_S: float = 5.0
+
+    # Stage 3 Decision Cache: Fingerprint + embedding similarity, with single-flight coalescing
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_TTL_SECONDS: float = 300.0
+    LLM_CACHE_SIMILARITY_THRESHOLD: float = 0.98
+
+    # Stage 3 Admission Control: Global OpenRouter concurrency with severity-priority queueing
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_QUEUE_DEPTH: int = 256
+    LLM_QUEUE_BUDGET_S: float = 5.0
+
+    # Stage 3 Prompt Budget: Fixed cacheable system prefix, compacted per-alert user message
+    LLM_PROMPT_MAX_TOKENS: int = 2048
+    LLM_PROMPT_MAX_INDICATORS: int = 32
+    LLM_PROMPT_CHARS_PER_TOKEN: float = 4.0
+    LLM_PROMPT_SPAN_CONTEXT_CHARS: int = 160
+
+    # Stage 0 Intent Analysis: Bounded workers for HMAC failures, findings kept in a JSONL ledger
+    INTENT_WORKERS: int = 2
+    INTENT_MAX_QUEUE: int = 100
+    INTENT_DEDUP_TTL_SECONDS: float = 600.0
+    INTENT_OVERLOAD_SAMPLE_RATE: float = 0.1
+    INTENT_FINDINGS_PATH: str = "data/intent_findings.jsonl"
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,12 +1,129 @@
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Structured context attached through `extra=`; rendered as top-level JSON keys when present
+STRUCTURED_FIELDS = ("alert_id", "stage", "action", "latency_ms", "prompt_tokens", "sampled_out")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line. Runs on the listener thread, never on the event loop."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode("utf-8")
+        return json.dumps(entry, default=str)
+
+class LogSampler(logging.Filter):
+    """
+    Caller-side volume control, so dropped records never reach the queue.
+    Warnings and above, and records whose action is an escalation, always pass.
+    SUPPRESS records are sampled, and other INFO records are rate-limited per (logger, stage)
+    with a token bucket. The next record that passes for a key reports how many were dropped.
+    """
+    def __init__(self, info_rate_per_s: float, suppress_sample_rate: float, always_actions: Iterable[str]):
+        super().__init__()
+        self.info_rate_per_s = info_rate_per_s
+        self.suppress_sample_rate = suppress_sample_rate
+        self.always_actions = frozenset(always_actions)
+        self._buckets: Dict[Tuple[str, Optional[str]], Tuple[float, float]] = {}
+        self._dropped: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        action = getattr(record, "action", None)
+        if action in self.always_actions:
+            return True
+
+        key = (record.name, getattr(record, "stage", None))
+        with self._lock:
+            if action == "SUPPRESS" and random.random() >= self.suppress_sample_rate:
+                self._dropped[key] += 1
+                return False
+
+            if self.info_rate_per_s > 0:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(key, (self.info_rate_per_s, now))
+                tokens = min(self.info_rate_per_s, tokens + (now - last) * self.info_rate_per_s)
+                if tokens < 1.0:
+                    self._buckets[key] = (tokens, now)
+                    self._dropped[key] += 1
+                    return False
+                self._buckets[key] = (tokens - 1.0, now)
+
+            dropped = self._dropped.pop(key, 0)
+        if dropped:
+            record.sampled_out = dropped
+        return True
+
+class _DroppingQueueHandler(QueueHandler):
+    """A full queue means stdout is not keeping up: drop the record instead of blocking the caller."""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.overflowed = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.overflowed += 1
 
 def setup_logger():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
+    """
+    Non-blocking logging pipeline: callers only sample and enqueue; a background listener thread
+    formats records (JSON or text) and writes them to stdout, so stdout backpressure never stalls the event loop.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+
+    queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_MAX_RECORDS))
+    queue_handler.addFilter(LogSampler(
+        info_rate_per_s=settings.LOG_INFO_RATE_PER_SECOND,
+        suppress_sample_rate=settings.LOG_SUPPRESS_SAMPLE_RATE,
+        always_actions=("CRITICAL_ESCALATION", "ESCALATE", "MANUAL_REVIEW")
+    ))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    # Flushes whatever is still queued on interpreter exit
+    atexit.register(listener.stop)
     return logging.getLogger("axon_triage")
 
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
@@ -0,0 +1,42 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.logger import logger
+
+class ReadinessTracker:
+    """
+    Per-component warm-up state for the /ready probe.
+    Liveness (/health) never touches these components; readiness flips only once every one is warm.
+    """
+    def __init__(self):
+        self._components: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, *names: str) -> None:
+        for name in names:
+            self._components[name] = {"status": "pending"}
+
+    async def warm(self, name: str, build: Callable[[], Any]) -> Optional[Any]:
+        """Runs a blocking build off the event loop and records how it went. Returns None on failure."""
+        self._components[name] = {"status": "warming"}
+        started = time.perf_counter()
+        try:
+            component = await asyncio.to_thread(build)
+        except Exception as e:
+            logger.error(f"WARM-UP FAILED: {name}: {str(e)}")
+            self._components[name] = {"status": "failed", "error": str(e)}
+            return None
+
+        warmup_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        self._components[name] = {"status": "ready", "warmup_ms": warmup_ms}
+        logger.info(f"WARM: {name} ready in {warmup_ms} ms")
+        return component
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._components) and all(state["status"] == "ready" for state in self._components.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(state) for name, state in self._components.items()}
+
+readiness = ReadinessTracker()
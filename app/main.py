@@ -1,30 +1,112 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 # 1. Local application imports (Pydantic handles the .env implicitly)
-from app.api.routes import router
+from app.api.routes import router, triage_queued_alert
+from app.api.hmac_gate import RawBodyHMACGate
 from app.core.config import settings
 from app.core.logger import logger
-from app.api.dependencies import get_sentinel, get_vector_service
+from app.core.metrics import metrics
+from app.core.readiness import readiness
+from app.api.dependencies import get_sentinel, get_vector_service, get_verdict_cache, get_llm_service, get_intent_pool, get_ingest_queue
+
+def _warm_vector_engine():
+    """Loads the encoder and runs one dummy encode so the first real alert does not pay for lazy kernel init."""
+    vector_service = get_vector_service()
+    vector_service.encoder.encode(["axon warm-up probe"])
+    return vector_service
+
+def _register_gauges(vector_service, llm_service, intent_pool) -> None:
+    """Scrape-time gauges over live executor and queue depths."""
+    metrics.gauge("axon_embedding_executor_backlog", "Encode jobs submitted to the embedding executor and not yet finished.",
+                  lambda: vector_service.executor.pending)
+    metrics.gauge("axon_embedding_microbatch_queue_depth", "Single-alert encodes waiting to join a micro-batch.",
+                  lambda: vector_service.batcher.stats()["queue_depth"] if vector_service.batcher is not None else 0)
+    metrics.gauge("axon_llm_active_calls", "OpenRouter calls currently holding a Stage 3 slot.",
+                  lambda: llm_service.scheduler.stats()["active"])
+    metrics.gauge("axon_llm_queue_depth", "Alerts waiting for a Stage 3 slot.",
+                  lambda: llm_service.scheduler.stats()["queue_depth"])
+    metrics.gauge("axon_intent_queue_depth", "HMAC failures waiting for intent analysis.",
+                  lambda: intent_pool.stats()["queue_depth"])
+    breaker = getattr(vector_service.store, "breaker", None)
+    if breaker is not None:
+        metrics.gauge("axon_vector_breaker_open", "1 while Stage 2 is served from the local false-positive snapshot.",
+                      lambda: 0 if breaker.state == "closed" else 1)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Enterprise Boot Sequence.
-    Pre-allocates continuous memory for ML models to eliminate Cold Start latency.
+    The event loop starts serving /health immediately. Heavy components warm concurrently in
+    worker threads and /ready flips to 200 once all of them are loaded.
     """
     logger.info(f"BOOT SEQUENCE INITIATED: {settings.PROJECT_NAME} v{settings.VERSION}")
-    
-    # Force heavy dependencies into RAM
-    logger.info("Pre-loading Vector Engine and Sovereign Sentinel...")
-    get_sentinel()
-    get_vector_service()
+    readiness.register("sentinel", "vector_engine", "llm_analyst", "verdict_cache", "intent_pool")
+    if settings.INGEST_MODE == "queued":
+        readiness.register("ingest_queue")
+    warmed = {}
+    background = []
+
+    async def warm_up() -> None:
+        logger.info("Warming Vector Engine, Sovereign Sentinel and Stage 3 Analyst concurrently...")
+        sentinel, vector_service, llm_service, _ = await asyncio.gather(
+            readiness.warm("sentinel", get_sentinel),
+            readiness.warm("vector_engine", _warm_vector_engine),
+            readiness.warm("llm_analyst", get_llm_service),
+            readiness.warm("verdict_cache", get_verdict_cache)
+        )
+        intent_pool = await readiness.warm("intent_pool", get_intent_pool) if llm_service is not None else None
+        warmed.update(sentinel=sentinel, vector_service=vector_service, intent_pool=intent_pool)
+
+        # Workers only start draining (including rows recovered from a crash) once the pipeline is warm
+        if settings.INGEST_MODE == "queued" and None not in (sentinel, vector_service, llm_service, intent_pool):
+            ingest_queue = await readiness.warm("ingest_queue", get_ingest_queue)
+            if ingest_queue is not None:
+                ingest_queue.start(triage_queued_alert)
+                warmed["ingest_queue"] = ingest_queue
+                metrics.gauge("axon_ingest_queue_pending", "Journaled alerts not yet triaged.",
+                              lambda: ingest_queue.pending)
+
+        # Hot-reload Sentinel signature packs without a redeploy
+        if sentinel is not None and sentinel.signature_path:
+            background.append(asyncio.create_task(sentinel.watch_signature_packs()))
+
+        # Checkpoint the Stage 2 fallback snapshot so a crash does not lose everything since boot
+        checkpoint = getattr(vector_service.store, "checkpoint_periodically", None) if vector_service is not None else None
+        if checkpoint is not None and settings.VECTOR_SNAPSHOT_PATH:
+            background.append(asyncio.create_task(checkpoint(settings.VECTOR_SNAPSHOT_SAVE_INTERVAL_SECONDS)))
+
+        if None not in (vector_service, llm_service, intent_pool):
+            _register_gauges(vector_service, llm_service, intent_pool)
+            logger.info("SYSTEM READY: all components warm.")
+
+    warm_task = asyncio.create_task(warm_up())
     
     logger.info("SYSTEM ONLINE: ASGI event loop accepting traffic.")
     yield 
     
     logger.info("SHUTDOWN SEQUENCE: Draining active connections.")
+    warm_task.cancel()
+    for task in background:
+        task.cancel()
+    # Only tear down what was actually built; shutdown must never trigger a model load
+    if warmed.get("ingest_queue") is not None:
+        await warmed["ingest_queue"].stop()
+    if warmed.get("intent_pool") is not None:
+        await warmed["intent_pool"].stop()
+    if warmed.get("sentinel") is not None:
+        warmed["sentinel"].shutdown()
+    vector_service = warmed.get("vector_service")
+    if vector_service is not None:
+        if vector_service.batcher is not None:
+            await vector_service.batcher.close()
+        # Releases IPC sockets and shared-memory buffers; a no-op for in-process encoders
+        vector_service.encoder.close()
+        # Persists the false-positive fallback snapshot when the store is wrapped for resilience
+        await vector_service.store.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME, 
@@ -43,18 +125,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 2b. Raw-body HMAC gate: forged traffic is dropped before any JSON or Pydantic work
+if settings.HMAC_MODE in ("header", "either"):
+    app.add_middleware(
+        RawBodyHMACGate,
+        secret_key=settings.HMAC_SECRET_KEY.encode("utf-8"),
+        header_name=settings.HMAC_HEADER_NAME,
+        paths=[f"{settings.API_V1_STR}{path}" for path in ("/alerts/ingest", "/alerts/ingest/fast", "/alerts/ingest/batch", "/alerts/learn", "/alerts/learn/bulk")],
+        required=settings.HMAC_MODE == "header",
+        max_body_bytes=settings.HMAC_GATE_MAX_BODY_BYTES
+    )
+
 # 3. Dynamic Versioning Routing
 app.include_router(router, prefix=settings.API_V1_STR)
 
-# 4. Kubernetes / Load Balancer Probe
+# 4. Kubernetes / Load Balancer Probes
 @app.get("/health", tags=["System"])
 async def health_check():
+    """Liveness: the event loop is responsive. Never touches the heavy components."""
     return {
         "status": "operational", 
-        "environment": "production" if "production" in settings.PINECONE_ENVIRONMENT.lower() else "development",
+        "environment": settings.ENVIRONMENT,
         "version": settings.VERSION
     }
 
+@app.get("/ready", tags=["System"])
+async def readiness_check():
+    """Readiness: 200 once every component is warm, 503 with per-component state until then."""
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503,
+        content={"ready": readiness.ready, "components": readiness.snapshot()}
+    )
+
+# 5. Prometheus Scrape Target
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
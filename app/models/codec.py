@@ -0,0 +1,108 @@
+# High-throughput wire codec for the ingest fast path.
+# Decode path: pydantic-core parses and validates the body in one pass, skipping the intermediate dict.
+# With FAST_CODEC_MSGSPEC (and msgspec installed), msgspec Structs mirror SOCAlert/AssetData/IdentityData field
+# for field and the result is wrapped with model_construct. The timestamp is handed to Pydantic's own datetime
+# validator, and any body msgspec rejects is re-decoded by Pydantic, so both decoders accept the same inputs
+# and return the same 422 errors.
+# Encode path: verdicts are flat dicts of str/float, rendered straight to bytes with orjson.
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.config import settings
+from app.models.schemas import AssetData, IdentityData, SOCAlert
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class AlertDecodeError(ValueError):
+    """The body is not a valid SOCAlert. Carries FastAPI-style error entries for the 422 response."""
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(errors[0]["msg"] if errors else "Invalid alert")
+        self.errors = errors
+
+if msgspec is not None:
+    class _AssetStruct(msgspec.Struct):
+        hostname: Optional[str] = None
+        ip_address: Optional[str] = None
+
+    class _IdentityStruct(msgspec.Struct):
+        username: Optional[str] = None
+
+    class _AlertStruct(msgspec.Struct):
+        alert_id: str
+        provider: str
+        event_class: str
+        severity: str
+        asset: _AssetStruct
+        identity: _IdentityStruct
+        threat_indicators: List[str]
+        raw_payload: str
+        # Left raw: Pydantic also accepts epoch numbers, date-only strings and its own ISO variants
+        timestamp: msgspec.Raw = msgspec.field(default_factory=msgspec.Raw)
+        hmac_signature: Optional[str] = None
+
+    _decoder = msgspec.json.Decoder(_AlertStruct)
+    _timestamp = TypeAdapter(datetime)
+
+def _decode_pydantic(body: bytes) -> SOCAlert:
+    try:
+        return SOCAlert.model_validate_json(body)
+    except ValidationError as e:
+        raise AlertDecodeError(
+            [{"loc": ["body", *error["loc"]], "msg": error["msg"], "type": error["type"]} for error in e.errors()]
+        )
+
+def _decode_msgspec(body: bytes) -> SOCAlert:
+    try:
+        decoded = _decoder.decode(body)
+        timestamp = _timestamp.validate_json(bytes(decoded.timestamp)) if len(decoded.timestamp) else None
+    except (msgspec.ValidationError, msgspec.DecodeError, ValidationError):
+        # Rejections are rare: let Pydantic decide, so acceptance and error shape match the default decoder
+        return _decode_pydantic(body)
+
+    fields = dict(
+        alert_id=decoded.alert_id,
+        provider=decoded.provider,
+        event_class=decoded.event_class,
+        severity=decoded.severity,
+        asset=AssetData.model_construct(hostname=decoded.asset.hostname, ip_address=decoded.asset.ip_address),
+        identity=IdentityData.model_construct(username=decoded.identity.username),
+        threat_indicators=decoded.threat_indicators,
+        raw_payload=decoded.raw_payload,
+        hmac_signature=decoded.hmac_signature
+    )
+    if timestamp is not None:
+        fields["timestamp"] = timestamp
+    # Already type-checked by msgspec: construct without re-validating (model_construct fills the timestamp default)
+    return SOCAlert.model_construct(**fields)
+
+def msgspec_enabled() -> bool:
+    return msgspec is not None and settings.FAST_CODEC_MSGSPEC
+
+def decode_alert(body: bytes) -> SOCAlert:
+    """Decodes one ingest body into a SOCAlert with the same schema rules as the Pydantic route."""
+    if msgspec_enabled():
+        return _decode_msgspec(body)
+    return _decode_pydantic(body)
+
+def encode_verdict(verdict: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(verdict)
+    if msgspec is not None:
+        return msgspec.json.encode(verdict)
+    return json.dumps(verdict, separators=(",", ":")).encode("utf-8")
+
+def active_codec() -> str:
+    decoder = "msgspec" if msgspec_enabled() else "pydantic-core"
+    encoder = "orjson" if orjson is not None else ("msgspec" if msgspec is not None else "json")
+    return f"{decoder}/{encoder}"
@@ -53,4 +53,5 @@ class TriageDecision(BaseModel):
     confidence_score: int = Field(..., ge=0, le=100, description="0-100 threat validity calculated by Stage 3 Analyst.")
     recommended_action: str = Field(..., description="SUPPRESS or ESCALATE")
     reasoning: str = Field(..., description="Machine-generated justification for the action.")
-    latency_ms: float = Field(..., description="Total execution overhead in milliseconds.")
\ No newline at end of file
+    latency_ms: float = Field(..., description="Total execution overhead in milliseconds.")
+    degraded: bool = Field(False, description="True when the verdict is a fail-closed fallback rather than a model decision.")
\ No newline at end of file
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from pydantic import ValidationError
+
+from app.models.schemas import SOCAlert
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+class StreamLineTooLong(Exception):
+    """An NDJSON line grew past the per-line cap without a newline."""
+
+class AlertStream:
+    """
+    Per-connection streaming triage.
+    Every alert is triaged in its own task and its verdict is emitted the moment it resolves,
+    so a Stage 1.5 block or a Stage 2 suppression is never held behind a slow Stage 3 call.
+    Flow control: at most `max_in_flight` alerts are triaged at once and at most `max_pending`
+    verdicts wait for the consumer. An intake slot is only released once its verdict is queued,
+    so a slow reader stalls intake (and, through TCP, the producer) instead of growing memory.
+    """
+    def __init__(
+        self,
+        triage: Callable[[SOCAlert], Awaitable[Dict[str, Any]]],
+        max_in_flight: int = 64,
+        max_pending: int = 256,
+        max_line_bytes: int = 1_048_576
+    ):
+        self._triage = triage
+        self.max_line_bytes = max_line_bytes
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._verdicts: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+        # Telemetry
+        self.received = 0
+        self.rejected = 0
+        self.emitted = 0
+
+    async def submit(self, raw: Any) -> None:
+        """Parses one alert and schedules it. Blocks while the connection is at its in-flight limit."""
+        self.received += 1
+        try:
+            alert = SOCAlert.model_validate_json(raw)
+        except ValidationError as e:
+            self.rejected += 1
+            await self._verdicts.put({
+                "alert_id": self._salvage_alert_id(raw),
+                "error": f"Invalid alert: {e.error_count()} validation error(s)",
+                "status_code": 422
+            })
+            return
+
+        await self._slots.acquire()
+        task = asyncio.create_task(self._run(alert))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, alert: SOCAlert) -> None:
+        try:
+            try:
+                verdict = await self._triage(alert)
+            except Exception as e:
+                logger.error(f"Streaming triage failed for {alert.alert_id}: {str(e)}")
+                verdict = {"alert_id": alert.alert_id, "error": "Internal triage error", "status_code": 500}
+            await self._verdicts.put(verdict)
+        finally:
+            self._slots.release()
+
+    async def feed_ndjson(self, chunks: AsyncIterator[bytes]) -> None:
+        """Splits a byte stream into NDJSON lines and submits each one. Blank lines are keep-alives."""
+        buffer = b""
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    await self.submit(line)
+            if len(buffer) > self.max_line_bytes:
+                raise StreamLineTooLong(f"NDJSON line exceeds {self.max_line_bytes} bytes")
+        if buffer.strip():
+            await self.submit(buffer)
+
+    async def close(self) -> None:
+        """End of input: waits for in-flight alerts, then ends the verdict stream."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        await self._verdicts.put(_END)
+
+    async def fail(self, message: str, status_code: int) -> None:
+        """Emits a terminal error line after the verdicts still in flight."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        await self._verdicts.put({"alert_id": None, "error": message, "status_code": status_code})
+
+    def abort(self) -> None:
+        """The consumer went away: nobody will read the remaining verdicts."""
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def verdicts(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            verdict = await self._verdicts.get()
+            if verdict is _END:
+                return
+            self.emitted += 1
+            yield verdict
+
+    @staticmethod
+    def _salvage_alert_id(raw: Any) -> Optional[str]:
+        """Best effort, so the collector can still correlate a rejected line."""
+        try:
+            alert_id = json.loads(raw).get("alert_id")
+        except Exception:
+            return None
+        return alert_id if isinstance(alert_id, str) else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "emitted": self.emitted,
+            "in_flight": len(self._tasks),
+            "pending_verdicts": self._verdicts.qsize()
+        }
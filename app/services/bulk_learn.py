@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.schemas import SOCAlert
+from app.services.integrity import integrity_service
+from app.services.vector_engine import VectorFilterService
+
+logger = logging.getLogger(__name__)
+
+_ALERT_LIST = TypeAdapter(List[SOCAlert])
+
+class BulkLearnJob:
+    """Progress of one bulk learn upload. Counters only ever grow, so a poller can compute its own rates."""
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self.total = 0
+        self.invalid = 0
+        self.rejected_hmac = 0
+        self.skipped_duplicate = 0
+        self.skipped_existing = 0
+        self.encoded = 0
+        self.upserted = 0
+        self.failed = 0
+
+    def advance(self, counter: str, count: int) -> None:
+        setattr(self, counter, getattr(self, counter) + count)
+
+    def stats(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at is not None else 0.0
+        resolved = self.invalid + self.rejected_hmac + self.skipped_duplicate + self.skipped_existing + self.upserted + self.failed
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "total": self.total,
+            "progress": round(resolved / self.total, 4) if self.total else (1.0 if self.finished_at else 0.0),
+            "invalid": self.invalid,
+            "rejected_hmac": self.rejected_hmac,
+            "skipped_duplicate": self.skipped_duplicate,
+            "skipped_existing": self.skipped_existing,
+            "encoded": self.encoded,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 3),
+            "alerts_per_s": round(resolved / elapsed, 1) if elapsed > 0 else None,
+            "encoded_per_s": round(self.encoded / elapsed, 1) if elapsed > 0 else None
+        }
+
+class BulkLearnManager:
+    """
+    Runs bulk learn uploads as background jobs.
+    Parsing and HMAC checks run off the event loop. Jobs are serialized through a small semaphore so
+    onboarding a customer cannot starve live triage of encoder threads. Finished jobs are kept for polling.
+    """
+    def __init__(self, max_alerts: int = 100000, max_concurrent_jobs: int = 1, max_retained_jobs: int = 100):
+        self.max_alerts = max_alerts
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_retained_jobs = max_retained_jobs
+        self._jobs: "OrderedDict[str, BulkLearnJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(
+        self,
+        body: bytes,
+        ndjson: bool,
+        vector_db: VectorFilterService,
+        preverified: bool = False,
+        on_complete: Optional[Callable[[BulkLearnJob], None]] = None
+    ) -> BulkLearnJob:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent_jobs)
+
+        job = BulkLearnJob(uuid.uuid4().hex)
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_retained_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.finished_at is None:
+                break
+            del self._jobs[oldest_id]
+
+        task = asyncio.create_task(self._run(job, body, ndjson, vector_db, preverified, on_complete))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[BulkLearnJob]:
+        return self._jobs.get(job_id)
+
+    @staticmethod
+    def _parse(body: bytes, ndjson: bool) -> Tuple[List[SOCAlert], int]:
+        """Returns the valid alerts and the number of unparseable entries."""
+        if not ndjson:
+            try:
+                return _ALERT_LIST.validate_json(body), 0
+            except ValidationError:
+                # One bad element should not discard the whole upload: fall back to per-element validation
+                raw_items = TypeAdapter(List[Any]).validate_json(body)
+                alerts, invalid = [], 0
+                for item in raw_items:
+                    try:
+                        alerts.append(SOCAlert.model_validate(item))
+                    except ValidationError:
+                        invalid += 1
+                return alerts, invalid
+
+        alerts, invalid = [], 0
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                alerts.append(SOCAlert.model_validate_json(line))
+            except ValidationError:
+                invalid += 1
+        return alerts, invalid
+
+    @staticmethod
+    def _count_lines(body: bytes) -> int:
+        return sum(1 for line in body.splitlines() if line.strip())
+
+    def _check_total(self, total: int) -> None:
+        if total > self.max_alerts:
+            raise ValueError(f"Upload of {total} alerts exceeds {self.max_alerts}. Split it into several jobs.")
+
+    @staticmethod
+    def _verify(alerts: List[SOCAlert]) -> List[Tuple[str, str, str]]:
+        verdicts = integrity_service.verify_siem_payloads([(a.raw_payload, a.hmac_signature) for a in alerts])
+        return [(a.alert_id, a.raw_payload, a.severity) for a, ok in zip(alerts, verdicts) if ok]
+
+    async def _run(
+        self,
+        job: BulkLearnJob,
+        body: bytes,
+        ndjson: bool,
+        vector_db: VectorFilterService,
+        preverified: bool,
+        on_complete: Optional[Callable[[BulkLearnJob], None]]
+    ) -> None:
+        async with self._slots:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                # NDJSON can be counted without parsing, so an oversized upload is refused before any validation
+                if ndjson:
+                    job.total = await asyncio.to_thread(self._count_lines, body)
+                    self._check_total(job.total)
+                alerts, job.invalid = await asyncio.to_thread(self._parse, body, ndjson)
+                del body
+                job.total = len(alerts) + job.invalid
+                self._check_total(job.total)
+
+                # Strictly enforce provenance before polluting our vector memory. A signed upload was authenticated as a whole.
+                if preverified:
+                    items = [(a.alert_id, a.raw_payload, a.severity) for a in alerts]
+                else:
+                    items = await asyncio.to_thread(self._verify, alerts)
+                job.rejected_hmac = len(alerts) - len(items)
+                del alerts
+
+                await vector_db.memorize_bulk(items, job.advance)
+                job.status = "completed" if job.failed == 0 else "completed_with_errors"
+            except Exception as e:
+                logger.error(f"Bulk learn job {job.job_id} failed: {str(e)}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+
+        stats = job.stats()
+        logger.info(
+            f"BULK LEARN {job.job_id}: {stats['status']} - {job.upserted}/{job.total} stored, "
+            f"{job.skipped_duplicate + job.skipped_existing} near-duplicates skipped, {stats['alerts_per_s']} alerts/s"
+        )
+        if on_complete is not None:
+            on_complete(job)
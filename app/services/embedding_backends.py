@@ -0,0 +1,106 @@
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+class EmbeddingBackend(ABC):
+    """
+    Stage 2 encoder contract.
+    Backends return L2-normalized float32 rows so cosine scores, and with them threshold_map, stay comparable.
+    """
+    dim: int
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        ...
+
+    def close(self) -> None:
+        """Releases sockets or shared memory. In-process backends hold nothing that needs it."""
+
+class TorchEmbeddingBackend(EmbeddingBackend):
+    """Full-precision PyTorch SentenceTransformer. torch is only imported when this backend is selected."""
+    def __init__(self, model_name: str, threads: Optional[int] = None):
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True).astype(np.float32, copy=False)
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    CPU backend: an exported (optionally int8-quantized) transformer under onnxruntime.
+    Loads tokenizer.json and the model file from a local directory, so it needs neither network nor torch.
+    Mean pooling over the attention mask + L2 normalization reproduces the SentenceTransformer head.
+    """
+    def __init__(self, model_dir: str, model_file: str, max_seq_length: int = 256, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, model_file)
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        for path in (model_path, tokenizer_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"ONNX embedding backend is missing {path}. Run `python -m benchmarks.onnx_embedding export` first.")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+        hidden = self.session.get_outputs()[0].shape[-1]
+        # A symbolic hidden axis means the exporter left it dynamic: probe once instead
+        self.dim = hidden if isinstance(hidden, int) else self._encode_chunk(["probe"]).shape[1]
+
+    def _encode_chunk(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        chunks = [self._encode_chunk(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        return np.vstack(chunks).astype(np.float32, copy=False)
+
+def build_embedding_backend(backend: str, threads: Optional[int] = None) -> EmbeddingBackend:
+    """Resolves the configured Stage 2 encoder. `threads` pins the intra-op pool (used by embedding workers)."""
+    if backend == "torch":
+        return TorchEmbeddingBackend(settings.EMBEDDING_MODEL_NAME, threads=threads)
+    if backend == "onnx":
+        return OnnxEmbeddingBackend(
+            model_dir=settings.ONNX_MODEL_DIR,
+            model_file=settings.ONNX_MODEL_FILE,
+            max_seq_length=settings.EMBEDDING_MAX_SEQ_LENGTH,
+            intra_op_threads=threads or settings.ONNX_INTRA_OP_THREADS
+        )
+    if backend == "ipc":
+        from app.services.embedding_ipc import RemoteEmbeddingBackend
+        return RemoteEmbeddingBackend(
+            socket_dir=settings.EMBEDDING_IPC_SOCKET_DIR,
+            capacity_rows=settings.EMBEDDING_IPC_BUFFER_ROWS,
+            connect_timeout_s=settings.EMBEDDING_IPC_CONNECT_TIMEOUT_S
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingMicroBatcher:
+    """
+    Stage 2 Micro-Batching Scheduler.
+    Coalesces concurrent single-payload embedding requests into one batched encode.
+    A batch is dispatched when max_batch_size requests are pending or the window elapses.
+    """
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], List[List[float]]],
+        executor: Executor,
+        window_ms: float = 3.0,
+        max_batch_size: int = 32,
+        max_concurrent_batches: int = 1
+    ):
+        self._encode_batch = encode_batch
+        self._executor = executor
+        self.window_s = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_concurrent_batches = max_concurrent_batches
+
+        # Bound to the serving event loop lazily on first use
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # Telemetry
+        self.batches_dispatched = 0
+        self.payloads_encoded = 0
+        self.last_batch_size = 0
+        self.max_observed_batch_size = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.total_encode_s = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._dispatcher is not None and not self._dispatcher.done():
+            return
+        self._queue = asyncio.Queue()
+        self._batch_full = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def embed(self, payload: str) -> List[float]:
+        """Enqueues a payload and awaits its vector from the next batched encode."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((payload, future, time.perf_counter()))
+
+        # The dispatcher holds one item while waiting, so max_batch_size - 1 queued fills the batch
+        if self._queue.qsize() >= self.max_batch_size - 1:
+            self._batch_full.set()
+
+        return await future
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            # Only form a batch once an encode slot is free, so requests that arrive
+            # during a running encode join the next batch instead of contending for torch threads.
+            await self._slots.acquire()
+            try:
+                first = await self._queue.get()
+
+                # Honour the window measured from the oldest request, not from dispatcher wake-up
+                remaining = self.window_s - (time.perf_counter() - first[2])
+                if remaining > 0 and self._queue.qsize() < self.max_batch_size - 1:
+                    self._batch_full.clear()
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+
+                batch = [first]
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+            except BaseException:
+                self._slots.release()
+                raise
+
+            asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        try:
+            # Callers that gave up before dispatch are not worth encoding
+            live = [item for item in batch if not item[1].done()]
+            if not live:
+                return
+
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at in live:
+                wait_s = dispatched_at - enqueued_at
+                self.total_wait_s += wait_s
+                self.max_wait_s = max(self.max_wait_s, wait_s)
+
+            loop = asyncio.get_running_loop()
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor,
+                    self._encode_batch,
+                    [payload for payload, _, _ in live]
+                )
+            except Exception as e:
+                logger.error(f"Micro-batch encode failed for {len(live)} payloads: {str(e)}")
+                for _, future, _ in live:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self.total_encode_s += time.perf_counter() - dispatched_at
+            self.batches_dispatched += 1
+            self.payloads_encoded += len(live)
+            self.last_batch_size = len(live)
+            self.max_observed_batch_size = max(self.max_observed_batch_size, len(live))
+
+            for (_, future, _), vector in zip(live, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        """Stops the dispatcher. Pending callers are cancelled."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        batches = max(1, self.batches_dispatched)
+        payloads = max(1, self.payloads_encoded)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "window_ms": self.window_s * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "batches_dispatched": self.batches_dispatched,
+            "payloads_encoded": self.payloads_encoded,
+            "last_batch_size": self.last_batch_size,
+            "max_observed_batch_size": self.max_observed_batch_size,
+            "avg_batch_size": self.payloads_encoded / batches,
+            "avg_wait_ms": (self.total_wait_s / payloads) * 1000.0,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "avg_encode_ms": (self.total_encode_s / batches) * 1000.0
+        }
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import glob
+import itertools
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context, resource_tracker, shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_backends import EmbeddingBackend, build_embedding_backend
+from app.services.embedding_batcher import EmbeddingMicroBatcher
+
+logger = logging.getLogger(__name__)
+
+# Wire format over the Unix socket. Vectors never cross it: they are written into client-owned shared memory.
+#   worker -> client on accept:  <I dim
+#   client -> worker handshake:  <I name_len, name, <I capacity_rows
+#   client -> worker request:    <II count, blob_len, count x <u4 lengths, utf-8 blob
+#   worker -> client reply:      <iI status, rows   (status != 0: error message of `rows` bytes follows)
+_U32 = struct.Struct("<I")
+_REQUEST = struct.Struct("<II")
+_REPLY = struct.Struct("<iI")
+
+SOCKET_PATTERN = "embed-*.sock"
+
+def socket_paths(socket_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(socket_dir, SOCKET_PATTERN)))
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("Embedding worker closed the connection")
+        received += count
+    return bytes(buffer)
+
+class _Channel:
+    """One socket plus one shared-memory result buffer. Owned by a single executor thread."""
+    def __init__(self, path: str, capacity_rows: int):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.dim = _U32.unpack(_recv_exact(self.sock, _U32.size))[0]
+        self.capacity_rows = capacity_rows
+
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity_rows * self.dim * 4)
+        self.matrix = np.ndarray((capacity_rows, self.dim), dtype=np.float32, buffer=self.shm.buf)
+        name = self.shm.name.encode("utf-8")
+        self.sock.sendall(_U32.pack(len(name)) + name + _U32.pack(capacity_rows))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.fromiter((len(item) for item in encoded), dtype="<u4", count=len(encoded))
+        self.sock.sendall(_REQUEST.pack(len(encoded), int(lengths.sum())) + lengths.tobytes() + b"".join(encoded))
+
+        status, value = _REPLY.unpack(_recv_exact(self.sock, _REPLY.size))
+        if status != 0:
+            raise RuntimeError(f"Embedding worker error: {_recv_exact(self.sock, value).decode('utf-8', 'replace')}")
+        return self.matrix[:value]
+
+    def close(self) -> None:
+        self.matrix = None
+        try:
+            self.sock.close()
+        finally:
+            self.shm.close()
+            self.shm.unlink()
+
+class RemoteEmbeddingBackend(EmbeddingBackend):
+    """
+    API-worker side of the IPC backend. No model is loaded in this process.
+    Each executor thread keeps its own connection and result buffer, assigned round-robin across
+    the embedding workers. A broken connection is dropped, so the next call fails over to another worker.
+    """
+    def __init__(self, socket_dir: str, capacity_rows: int = 256, connect_timeout_s: float = 60.0):
+        self.socket_dir = socket_dir
+        self.capacity_rows = capacity_rows
+        self._local = threading.local()
+        self._next = itertools.count()
+        self._channels: List[_Channel] = []
+        self._lock = threading.Lock()
+
+        # Workers may still be loading their model when the API boots
+        deadline = time.monotonic() + connect_timeout_s
+        while True:
+            try:
+                self.dim = self._channel().dim
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"No embedding worker reachable in {socket_dir} after {connect_timeout_s}s")
+                time.sleep(0.25)
+
+    def _channel(self) -> _Channel:
+        channel = getattr(self._local, "channel", None)
+        if channel is None:
+            paths = socket_paths(self.socket_dir)
+            if not paths:
+                raise FileNotFoundError(f"No embedding worker sockets in {self.socket_dir}")
+            channel = _Channel(paths[next(self._next) % len(paths)], self.capacity_rows)
+            self._local.channel = channel
+            with self._lock:
+                self._channels.append(channel)
+        return channel
+
+    def _drop(self, channel: _Channel) -> None:
+        self._local.channel = None
+        with self._lock:
+            if channel in self._channels:
+                self._channels.remove(channel)
+        try:
+            channel.close()
+        except Exception:
+            pass
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Rows up to the buffer capacity are a zero-copy view into this thread's shared memory,
+        valid until the thread's next encode. Callers convert or copy them immediately.
+        """
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        channel = self._channel()
+        try:
+            if len(texts) <= channel.capacity_rows:
+                return channel.encode(texts)
+            # Oversized batches (e.g. /alerts/ingest/batch) are copied out chunk by chunk
+            return np.vstack([
+                channel.encode(texts[i:i + channel.capacity_rows]).copy()
+                for i in range(0, len(texts), channel.capacity_rows)
+            ])
+        except OSError:
+            self._drop(channel)
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            channels, self._channels = self._channels, []
+        for channel in channels:
+            channel.close()
+
+class EmbeddingWorker:
+    """
+    Stage 2 Embedding Worker.
+    The only process that holds the model. Requests from every API worker land in one micro-batcher,
+    so concurrent alerts across processes share a forward pass. Vectors are written straight into
+    the requesting client's shared-memory buffer.
+    """
+    def __init__(self, socket_path: str, backend: EmbeddingBackend, window_ms: float = 3.0, max_batch_size: int = 32):
+        self.socket_path = socket_path
+        self.backend = backend
+        # One encode thread: the model's own intra-op threads are what get pinned to this worker's cores
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batcher = EmbeddingMicroBatcher(
+            encode_batch=lambda texts: backend.encode(texts, batch_size=max_batch_size),
+            executor=self.executor,
+            window_ms=window_ms,
+            max_batch_size=max_batch_size,
+            max_concurrent_batches=1
+        )
+
+    async def serve(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # Bind under a temporary name so clients never see a socket that is not yet accepting
+        staging_path = self.socket_path + ".staging"
+        server = await asyncio.start_unix_server(self._handle, path=staging_path)
+        os.replace(staging_path, self.socket_path)
+        logger.info(f"Embedding worker {os.getpid()} serving {self.backend.dim}-dim vectors on {self.socket_path}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        shm: Optional[shared_memory.SharedMemory] = None
+        out: Optional[np.ndarray] = None
+        try:
+            writer.write(_U32.pack(self.backend.dim))
+            await writer.drain()
+
+            name_length = _U32.unpack(await reader.readexactly(_U32.size))[0]
+            name = (await reader.readexactly(name_length)).decode("utf-8")
+            capacity = _U32.unpack(await reader.readexactly(_U32.size))[0]
+            shm = shared_memory.SharedMemory(name=name)
+            # The client owns the segment: keep this process's resource tracker from unlinking it on exit
+            resource_tracker.unregister(shm._name, "shared_memory")
+            out = np.ndarray((capacity, self.backend.dim), dtype=np.float32, buffer=shm.buf)
+
+            while True:
+                try:
+                    count, blob_length = _REQUEST.unpack(await reader.readexactly(_REQUEST.size))
+                except asyncio.IncompleteReadError:
+                    break
+                lengths = np.frombuffer(await reader.readexactly(4 * count), dtype="<u4").tolist()
+                blob = await reader.readexactly(blob_length)
+
+                try:
+                    if count > capacity:
+                        raise ValueError(f"Request of {count} texts exceeds the {capacity}-row buffer")
+                    texts, offset = [], 0
+                    for length in lengths:
+                        texts.append(blob[offset:offset + length].decode("utf-8"))
+                        offset += length
+                    rows = await asyncio.gather(*(self.batcher.embed(text) for text in texts))
+                    for i, row in enumerate(rows):
+                        out[i] = row
+                    writer.write(_REPLY.pack(0, count))
+                except Exception as e:
+                    message = str(e).encode("utf-8")
+                    writer.write(_REPLY.pack(1, len(message)) + message)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            # Views into the segment must be released before it can be closed
+            out = None
+            if shm is not None:
+                shm.close()
+            writer.close()
+
+def _worker_main(socket_path: str, cores: List[int], threads: int) -> None:
+    # Thread pools size themselves on import, so the pinning has to happen first
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    backend_name = settings.EMBEDDING_IPC_WORKER_BACKEND
+    if backend_name == "ipc":
+        raise ValueError("EMBEDDING_IPC_WORKER_BACKEND must name a local backend (torch or onnx)")
+    backend = build_embedding_backend(backend_name, threads=threads)
+    backend.encode(["axon warm-up probe"])
+
+    worker = EmbeddingWorker(
+        socket_path,
+        backend,
+        window_ms=settings.EMBED_BATCH_WINDOW_MS,
+        max_batch_size=settings.EMBED_MAX_BATCH_SIZE
+    )
+    asyncio.run(worker.serve())
+
+def run_workers(workers: int, cores_per_worker: int, socket_dir: str) -> None:
+    """Spawns the embedding workers, each pinned to its own slice of cores, and supervises them."""
+    os.makedirs(socket_dir, exist_ok=True)
+    for stale in socket_paths(socket_dir):
+        os.unlink(stale)
+
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    if cores_per_worker <= 0:
+        cores_per_worker = max(1, len(available) // workers)
+
+    context = get_context("spawn")
+    processes = []
+    for i in range(workers):
+        cores = [available[(i * cores_per_worker + j) % len(available)] for j in range(cores_per_worker)]
+        process = context.Process(
+            target=_worker_main,
+            args=(os.path.join(socket_dir, f"embed-{i}.sock"), cores, cores_per_worker),
+            name=f"axon-embed-{i}"
+        )
+        process.start()
+        logger.info(f"Embedding worker {i} (pid {process.pid}) pinned to cores {cores}")
+        processes.append(process)
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+def main() -> None:
+    """
+    Dedicated embedding tier for multi-process serving:
+
+        python -m app.services.embedding_ipc --workers 2 --cores-per-worker 2 &
+        EMBEDDING_BACKEND=ipc uvicorn app.main:app --workers 4
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.EMBEDDING_IPC_WORKERS)
+    parser.add_argument("--cores-per-worker", type=int, default=settings.EMBEDDING_IPC_CORES_PER_WORKER)
+    parser.add_argument("--socket-dir", default=settings.EMBEDDING_IPC_SOCKET_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    run_workers(args.workers, args.cores_per_worker, args.socket_dir)
+
+if __name__ == "__main__":
+    main()
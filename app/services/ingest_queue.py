@@ -0,0 +1,366 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.metrics import INGEST_ERRORS
+from app.models.schemas import SOCAlert
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_queue (
+    seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id     TEXT    NOT NULL,
+    body         TEXT    NOT NULL,
+    status       TEXT    NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    not_before   REAL    NOT NULL DEFAULT 0,
+    enqueued_at  REAL    NOT NULL,
+    completed_at REAL,
+    verdict      TEXT
+);
+CREATE INDEX IF NOT EXISTS ingest_queue_pending ON ingest_queue (status, seq);
+CREATE INDEX IF NOT EXISTS ingest_queue_alert ON ingest_queue (alert_id, seq);
+"""
+
+class RetryableTriageError(Exception):
+    """Raised by the processor when an alert should be retried later (e.g. Stage 3 saturation)."""
+    def __init__(self, message: str, retry_after_s: float = 1.0):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+class QueueSaturated(Exception):
+    def __init__(self, retry_after_s: float):
+        super().__init__("Ingest queue backlog is full")
+        self.retry_after_s = retry_after_s
+
+class DurableIngestQueue:
+    """
+    Accept-then-process ingest.
+    Alerts are appended to a SQLite WAL journal and acknowledged before any stage runs, so SIEM
+    webhook latency no longer tracks Pinecone or OpenRouter latency. Concurrent appends are group
+    committed in one transaction. A fixed pool of async workers drains the journal in sequence order.
+    Rows claimed but not committed as done when the process died are reclaimed on start, so
+    recovery resumes from the last committed offset.
+    """
+    # Backoff for a row whose bookkeeping failed, or a failing dispatcher: doubles per attempt, capped
+    RELEASE_DELAY_S = 1.0
+    MAX_RELEASE_DELAY_S = 300.0
+
+    def __init__(
+        self,
+        path: str,
+        workers: int = 8,
+        max_pending: int = 100000,
+        max_attempts: int = 5,
+        result_ttl_s: float = 86400.0,
+        callback_url: Optional[str] = None,
+        callback_timeout_s: float = 5.0,
+        synchronous: str = "NORMAL"
+    ):
+        self.path = path
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.result_ttl_s = result_ttl_s
+        self.callback_url = callback_url
+        self.callback_timeout_s = callback_timeout_s
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Every statement runs on this one thread, so a single connection is never shared concurrently
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="axon-ingest-db")
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.executescript(_SCHEMA)
+        self.recovered = self._conn.execute(
+            "UPDATE ingest_queue SET status = 'pending' WHERE status = 'processing'"
+        ).rowcount
+        self.pending = self._conn.execute("SELECT COUNT(*) FROM ingest_queue WHERE status = 'pending'").fetchone()[0]
+        if self.recovered or self.pending:
+            logger.info(f"Ingest queue resuming: {self.pending} pending ({self.recovered} reclaimed from a crash)")
+
+        self._process: Optional[Callable[[SOCAlert], Awaitable[Dict[str, Any]]]] = None
+        self._appends: List[Tuple[str, str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._claimed: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+
+        # Telemetry
+        self.accepted = 0
+        self.rejected_full = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.callbacks_failed = 0
+        self.bookkeeping_errors = 0
+        self.dispatcher_errors = 0
+        self.group_commits = 0
+
+    async def _db(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, fn, *args)
+
+    def start(self, process: Callable[[SOCAlert], Awaitable[Dict[str, Any]]]) -> None:
+        if self._tasks:
+            return
+        self._process = process
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._claimed = asyncio.Queue(maxsize=self.workers)
+        if self.callback_url:
+            self._http = httpx.AsyncClient(timeout=self.callback_timeout_s)
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._dispatcher())]
+        self._tasks += [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+        # In-flight rows stay 'processing' and are reclaimed by the next start
+        await self._db(self._conn.close)
+        self._db_executor.shutdown(wait=True)
+
+    # --- Append path ---
+
+    async def enqueue(self, alert: SOCAlert) -> int:
+        """Durably appends an alert and returns its sequence number once committed."""
+        if self.pending >= self.max_pending:
+            self.rejected_full += 1
+            raise QueueSaturated(retry_after_s=5.0)
+
+        future = asyncio.get_running_loop().create_future()
+        self._appends.append((alert.alert_id, alert.model_dump_json(), future))
+        self.pending += 1
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush())
+        return await future
+
+    async def _flush(self) -> None:
+        # Appends that arrive while a commit is on disk join the next one
+        while self._appends:
+            batch, self._appends = self._appends, []
+            now = time.time()
+            try:
+                seqs = await self._db(self._insert, [(alert_id, body, now) for alert_id, body, _ in batch])
+            except Exception as e:
+                self.pending -= len(batch)
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.group_commits += 1
+            self.accepted += len(batch)
+            for seq, (_, _, future) in zip(seqs, batch):
+                if not future.done():
+                    future.set_result(seq)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def _insert(self, rows: List[Tuple[str, str, float]]) -> List[int]:
+        cursor = self._conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            seqs = []
+            for row in rows:
+                cursor.execute("INSERT INTO ingest_queue (alert_id, body, enqueued_at) VALUES (?, ?, ?)", row)
+                seqs.append(cursor.lastrowid)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return seqs
+
+    # --- Drain path ---
+
+    def _claim(self, limit: int) -> List[Tuple[int, str, int]]:
+        cursor = self._conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            rows = cursor.execute(
+                "SELECT seq, body, attempts FROM ingest_queue WHERE status = 'pending' AND not_before <= ? ORDER BY seq LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+            cursor.executemany("UPDATE ingest_queue SET status = 'processing' WHERE seq = ?", [(row[0],) for row in rows])
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _next_due_in(self) -> Optional[float]:
+        row = self._conn.execute("SELECT MIN(not_before) FROM ingest_queue WHERE status = 'pending'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    async def _dispatcher(self) -> None:
+        last_prune = 0.0
+        retry_timer: Optional[asyncio.TimerHandle] = None
+        failures = 0
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if retry_timer is not None:
+                retry_timer.cancel()
+                retry_timer = None
+
+            try:
+                # Claim only as much as the workers can start on, so a crash strands at most a handful of rows
+                while True:
+                    rows = await self._db(self._claim, self.workers)
+                    if not rows:
+                        break
+                    for row in rows:
+                        await self._claimed.put(row)
+
+                if time.monotonic() - last_prune > 60.0:
+                    last_prune = time.monotonic()
+                    await self._db(self._prune)
+
+                # Retries with a future not_before wake the dispatcher themselves
+                due_in = await self._db(self._next_due_in)
+                failures = 0
+            except Exception as e:
+                # SQLite busy or disk full: a dead dispatcher would keep answering 202 and never drain
+                failures += 1
+                self.dispatcher_errors += 1
+                INGEST_ERRORS.inc(reason="queue_dispatch_error")
+                due_in = min(self.RELEASE_DELAY_S * (2 ** (failures - 1)), self.MAX_RELEASE_DELAY_S)
+                logger.error(f"Ingest queue dispatcher failed ({failures} in a row), retrying in {min(due_in, 5.0):.1f}s: {str(e)}")
+
+            if due_in is not None and not self._wakeup.is_set():
+                retry_timer = asyncio.get_running_loop().call_later(min(due_in, 5.0) + 0.01, self._wakeup.set)
+
+    async def _worker(self) -> None:
+        while True:
+            seq, body, attempts = await self._claimed.get()
+            try:
+                await self._handle(seq, body, attempts)
+            except Exception as e:
+                # SQLite busy, disk full, a corrupt row: one alert's bookkeeping must never take a worker down
+                self.bookkeeping_errors += 1
+                logger.error(f"Ingest queue bookkeeping failed for seq {seq}: {str(e)}")
+                await self._release(seq, min(self.RELEASE_DELAY_S * (2 ** attempts), self.MAX_RELEASE_DELAY_S))
+
+    async def _release(self, seq: int, delay_s: float) -> None:
+        """Hands a claimed row back for a later attempt. If even that fails, startup recovery reclaims it."""
+        try:
+            await self._db(self._requeue, seq, delay_s)
+            self._wakeup.set()
+        except Exception as e:
+            logger.error(f"Ingest queue could not release seq {seq}, it will be reclaimed on restart: {str(e)}")
+
+    async def _handle(self, seq: int, body: str, attempts: int) -> None:
+        alert = SOCAlert.model_validate_json(body)
+        try:
+            verdict = await self._process(alert)
+        except RetryableTriageError as e:
+            if attempts + 1 < self.max_attempts:
+                self.retried += 1
+                # Jittered so a saturated Stage 3 is not hit by the whole backlog at once
+                delay = e.retry_after_s * (2 ** attempts) * random.uniform(0.5, 1.5)
+                await self._db(self._requeue, seq, delay)
+                # Lets the dispatcher arm its timer for the new due time
+                self._wakeup.set()
+                return
+            verdict = self._failure_verdict(alert, str(e))
+        except Exception as e:
+            logger.error(f"Queued triage failed for {alert.alert_id}: {str(e)}")
+            verdict = self._failure_verdict(alert, "Internal triage error")
+
+        await self._db(self._complete, seq, verdict)
+        self.pending -= 1
+        if "error" in verdict:
+            self.failed += 1
+        else:
+            self.completed += 1
+        if self._http is not None:
+            await self._deliver({**verdict, "seq": seq})
+
+    def _failure_verdict(self, alert: SOCAlert, message: str) -> Dict[str, Any]:
+        # Fail-closed: an alert we could not triage goes to a human rather than disappearing
+        return {"alert_id": alert.alert_id, "action": "MANUAL_REVIEW", "error": message}
+
+    def _requeue(self, seq: int, delay_s: float) -> None:
+        self._conn.execute(
+            "UPDATE ingest_queue SET status = 'pending', attempts = attempts + 1, not_before = ? WHERE seq = ?",
+            (time.time() + delay_s, seq)
+        )
+
+    def _complete(self, seq: int, verdict: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "UPDATE ingest_queue SET status = 'done', completed_at = ?, verdict = ? WHERE seq = ?",
+            (time.time(), json.dumps(verdict), seq)
+        )
+
+    def _prune(self) -> None:
+        self._conn.execute(
+            "DELETE FROM ingest_queue WHERE status = 'done' AND completed_at < ?",
+            (time.time() - self.result_ttl_s,)
+        )
+
+    async def _deliver(self, verdict: Dict[str, Any]) -> None:
+        """At-least-once callback. The verdict is already committed, so a dead receiver only loses the push."""
+        for attempt in range(3):
+            try:
+                response = await self._http.post(self.callback_url, json=verdict)
+                if response.status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5 * (2 ** attempt))
+        self.callbacks_failed += 1
+        logger.warning(f"Verdict callback failed for {verdict['alert_id']} after 3 attempts.")
+
+    # --- Results ---
+
+    def _lookup(self, alert_id: str) -> Optional[Tuple[int, str, int, Optional[str]]]:
+        return self._conn.execute(
+            "SELECT seq, status, attempts, verdict FROM ingest_queue WHERE alert_id = ? ORDER BY seq DESC LIMIT 1",
+            (alert_id,)
+        ).fetchone()
+
+    async def result(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        """Latest queued submission for an alert_id: its state, and the verdict once done."""
+        row = await self._db(self._lookup, alert_id)
+        if row is None:
+            return None
+        seq, state, attempts, verdict = row
+        return {
+            "alert_id": alert_id,
+            "seq": seq,
+            "status": state,
+            "attempts": attempts,
+            "verdict": json.loads(verdict) if verdict is not None else None
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "claimed": self._claimed.qsize() if self._claimed is not None else 0,
+            "accepted": self.accepted,
+            "group_commits": self.group_commits,
+            "rejected_full": self.rejected_full,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "callbacks_failed": self.callbacks_failed,
+            "bookkeeping_errors": self.bookkeeping_errors,
+            "dispatcher_errors": self.dispatcher_errors
+        }
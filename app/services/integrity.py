@@ -1,7 +1,9 @@
 import hmac
 import hashlib
 import base64
+import binascii
 import logging
+from typing import List, Optional, Tuple
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -15,11 +17,22 @@ class SovereignIntegrityService:
         try:
             # Load the symmetric key into local memory
             self.secret_key = settings.HMAC_SECRET_KEY.encode('utf-8')
+            self._keyed = hmac.new(self.secret_key, digestmod=hashlib.sha256)
             logger.info("Sovereign Integrity Service initialized. Local HMAC mode active.")
         except Exception as e:
             logger.error(f"CRITICAL: Failed to load HMAC_SECRET_KEY: {str(e)}")
             raise
 
+    def _signature_matches(self, raw_payload: str, provided_signature_b64: str) -> bool:
+        # Keyed state is copied rather than re-derived, and the digests are compared as raw bytes
+        mac = self._keyed.copy()
+        mac.update(raw_payload.encode('utf-8'))
+        try:
+            provided = base64.b64decode(provided_signature_b64, validate=True)
+        except (binascii.Error, ValueError):
+            return False
+        return hmac.compare_digest(mac.digest(), provided)
+
     def verify_siem_payload(self, raw_payload: str, provided_signature_b64: str) -> bool:
         """
         Computes local HMAC and securely compares it against the SIEM's signature.
@@ -29,21 +42,32 @@ class SovereignIntegrityService:
             return False
 
         try:
-            # 1. Compute the expected HMAC using our secret key and the raw payload
-            payload_bytes = raw_payload.encode('utf-8')
-            expected_hmac = hmac.new(self.secret_key, payload_bytes, hashlib.sha256).digest()
-            expected_signature_b64 = base64.b64encode(expected_hmac).decode('utf-8')
-
-            # 2. Secure comparison to prevent timing side-channel attacks
-            is_valid = hmac.compare_digest(expected_signature_b64, provided_signature_b64)
-            
+            # Secure comparison to prevent timing side-channel attacks
+            is_valid = self._signature_matches(raw_payload, provided_signature_b64)
+
             if not is_valid:
                 logger.warning("CRITICAL: HMAC verification failed. Payload Poisoned.")
-                
+
             return is_valid
 
         except Exception as e:
             logger.error(f"Integrity check failed: {str(e)}")
             return False
 
+    def verify_siem_payloads(self, items: List[Tuple[str, Optional[str]]]) -> List[bool]:
+        """
+        Bulk variant for replaying large exports. Failures are logged as one summary line instead of one line each.
+        """
+        results = []
+        for raw_payload, provided_signature_b64 in items:
+            try:
+                results.append(bool(provided_signature_b64) and self._signature_matches(raw_payload, provided_signature_b64))
+            except Exception:
+                results.append(False)
+
+        failures = results.count(False)
+        if failures:
+            logger.warning(f"CRITICAL: HMAC verification failed for {failures}/{len(items)} bulk payloads.")
+        return results
+
 integrity_service = SovereignIntegrityService()
\ No newline at end of file
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.models.schemas import SOCAlert, TriageDecision
+from app.services.llm_scheduler import SchedulerSaturated
+
+logger = logging.getLogger(__name__)
+
+class IntentAnalysisPool:
+    """
+    Stage 0 Intent Analysis Workers.
+    HMAC failures are analyzed by a fixed number of workers draining a bounded queue.
+    A poisoning flood is deduplicated on payload hash, sampled once the queue is half full,
+    and dropped when full, so it can never turn into unbounded LLM calls inside the API process.
+    Every finding is appended to a JSONL ledger instead of being discarded.
+    """
+    def __init__(
+        self,
+        analyze: Callable[[SOCAlert], Awaitable[TriageDecision]],
+        findings_path: str,
+        workers: int = 2,
+        max_queue: int = 100,
+        dedup_ttl_s: float = 600.0,
+        dedup_max_entries: int = 10000,
+        overload_sample_rate: float = 0.1
+    ):
+        self._analyze = analyze
+        self.findings_path = findings_path
+        self.workers = workers
+        self.max_queue = max_queue
+        self.dedup_ttl_s = dedup_ttl_s
+        self.dedup_max_entries = dedup_max_entries
+        self.overload_sample_rate = overload_sample_rate
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._write_lock: Optional[asyncio.Lock] = None
+
+        # Telemetry
+        self.accepted = 0
+        self.deduplicated = 0
+        self.sampled_out = 0
+        self.dropped_full = 0
+        self.completed = 0
+        self.shed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        directory = os.path.dirname(self.findings_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._write_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _seen_recently(self, payload_hash: str) -> bool:
+        now = time.monotonic()
+        while self._recent:
+            oldest_hash, seen_at = next(iter(self._recent.items()))
+            if now - seen_at < self.dedup_ttl_s and len(self._recent) < self.dedup_max_entries:
+                break
+            del self._recent[oldest_hash]
+
+        if payload_hash in self._recent:
+            return True
+        self._recent[payload_hash] = now
+        return False
+
+    def submit(self, alert: SOCAlert) -> bool:
+        """Non-blocking. Returns True if the alert was queued for intent analysis."""
+        self.start()
+
+        payload_hash = hashlib.sha256(alert.raw_payload.encode("utf-8")).hexdigest()
+        if self._seen_recently(payload_hash):
+            self.deduplicated += 1
+            return False
+
+        # Past half capacity only a sample of new forgeries is analyzed
+        if self._queue.qsize() >= self.max_queue // 2 and random.random() >= self.overload_sample_rate:
+            self.sampled_out += 1
+            return False
+
+        try:
+            self._queue.put_nowait((payload_hash, alert))
+        except asyncio.QueueFull:
+            self.dropped_full += 1
+            return False
+
+        self.accepted += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            payload_hash, alert = await self._queue.get()
+            try:
+                decision = await self._analyze(alert)
+                await self._record(payload_hash, alert, "analyzed", decision.model_dump())
+                self.completed += 1
+            except SchedulerSaturated:
+                self.shed += 1
+                await self._record(payload_hash, alert, "shed", None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Intent analysis failed for {alert.alert_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _record(self, payload_hash: str, alert: SOCAlert, status: str, decision: Optional[Dict[str, Any]]) -> None:
+        line = json.dumps({
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "alert_id": alert.alert_id,
+            "provider": alert.provider,
+            "hostname": alert.asset.hostname,
+            "payload_sha256": payload_hash,
+            "status": status,
+            "decision": decision
+        })
+        async with self._write_lock:
+            await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str) -> None:
+        with open(self.findings_path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "accepted": self.accepted,
+            "deduplicated": self.deduplicated,
+            "sampled_out": self.sampled_out,
+            "dropped_full": self.dropped_full,
+            "completed": self.completed,
+            "shed": self.shed,
+            "failed": self.failed,
+            "findings_path": self.findings_path
+        }
@@ -1,8 +1,14 @@
 import json
+import time
+import asyncio
+from typing import Dict, List, Optional
 from openai import AsyncOpenAI
 from app.models.schemas import SOCAlert, TriageDecision
 from app.core.config import settings # Use the validated settings object
 from app.core.logger import logger
+from app.services.llm_cache import LLMDecisionCache
+from app.services.llm_scheduler import LLMScheduler, QueueBudgetExceeded
+from app.services.prompt_builder import CompactPrompt, PromptBuilder
 
 class LLMAnalysisService:
     """
@@ -13,70 +19,129 @@ class LLMAnalysisService:
         try:
             # OpenRouter uses the standard OpenAI client architecture
             self.client = AsyncOpenAI(
-                base_url="https://openrouter.ai/api/v1",
+                base_url=settings.OPENROUTER_BASE_URL,
                 api_key=settings.OPENROUTER_API_KEY,
             )
             self.model_name = "google/gemini-3.1-flash-lite-preview"
+
+            # Semantic decision cache + single-flight registry of in-progress OpenRouter calls
+            self.cache = LLMDecisionCache(
+                max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                similarity_threshold=settings.LLM_CACHE_SIMILARITY_THRESHOLD
+            ) if settings.LLM_CACHE_ENABLED else None
+            self._inflight: Dict[str, asyncio.Task] = {}
+
+            # Global concurrency cap with severity-priority admission
+            self.scheduler = LLMScheduler(
+                max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                max_queue_depth=settings.LLM_MAX_QUEUE_DEPTH,
+                queue_budget_s=settings.LLM_QUEUE_BUDGET_S
+            )
+
+            # Token-budgeted prompts behind a fixed system prefix the provider can cache
+            self.prompts = PromptBuilder(
+                max_tokens=settings.LLM_PROMPT_MAX_TOKENS,
+                max_indicators=settings.LLM_PROMPT_MAX_INDICATORS,
+                chars_per_token=settings.LLM_PROMPT_CHARS_PER_TOKEN,
+                span_context_chars=settings.LLM_PROMPT_SPAN_CONTEXT_CHARS
+            )
             logger.info(f"Stage 3: {self.model_name} (OpenRouter SDK) initialized.")
         except Exception as e:
             logger.error(f"CRITICAL: Failed to initialize OpenRouter client: {str(e)}")
             raise
 
-    async def analyze_alert(self, alert: SOCAlert) -> TriageDecision:
+    async def analyze_alert(self, alert: SOCAlert, embedding: Optional[List[float]] = None) -> TriageDecision:
+        """
+        Cache-fronted Stage 3 entry point.
+        Near-identical alerts reuse a recent decision; identical alerts arriving while a call is
+        in flight wait on that single OpenRouter request instead of issuing their own.
+        """
+        if self.cache is None:
+            return await self._analyze_uncached(alert)
+
+        key = self.cache.fingerprint(alert)
+        cached = self.cache.get(key, self.cache.scope(alert), embedding)
+        if cached is not None:
+            logger.info(f"LLM CACHE HIT: {alert.alert_id} reused {cached.recommended_action} verdict.")
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._analyze_and_cache(key, alert, embedding))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+        else:
+            self.cache.coalesced += 1
+            logger.info(f"LLM SINGLE-FLIGHT: {alert.alert_id} joined an in-flight analysis.")
+
+        # Shielded so a disconnecting caller never cancels the call other requests are waiting on
+        return await asyncio.shield(task)
+
+    async def _analyze_and_cache(self, key: str, alert: SOCAlert, embedding: Optional[List[float]]) -> TriageDecision:
+        decision = await self._analyze_uncached(alert)
+        # Fail-closed fallbacks are never memoized: the next alert must retry OpenRouter
+        if not decision.degraded:
+            self.cache.put(key, decision, self.cache.scope(alert), embedding)
+        return decision
+
+    async def _analyze_uncached(self, alert: SOCAlert) -> TriageDecision:
+        """
+        Admits the alert through the severity-priority scheduler, then calls OpenRouter.
+        Raises SchedulerSaturated when the queue is full so the route can apply backpressure.
+        """
+        prompt = self.prompts.build(alert)
+        if prompt.truncated:
+            logger.info(
+                f"PROMPT COMPACTED: {alert.alert_id} payload {prompt.payload_chars} -> {prompt.compacted_chars} chars "
+                f"(~{prompt.estimated_tokens} tokens).",
+                extra={"alert_id": alert.alert_id, "stage": "llm", "prompt_tokens": prompt.estimated_tokens}
+            )
+
+        try:
+            async with self.scheduler.slot(alert.severity):
+                return await self._complete(alert, prompt)
+        except QueueBudgetExceeded as e:
+            logger.warning(f"LLM admission budget exceeded for {alert.alert_id} ({alert.severity}): {str(e)}")
+            return self._fail_closed(f"Stage 3 overload. {str(e)} Mandatory manual review.")
+
+    async def _complete(self, alert: SOCAlert, prompt: CompactPrompt) -> TriageDecision:
         """
         Asynchronously evaluates a SOC alert and forces deterministic JSON via OpenRouter.
         """
-        prompt = self._build_prompt(alert)
-        
+        started = time.perf_counter()
         try:
             # Use the Async client for strictly non-blocking execution
             response = await self.client.chat.completions.create(
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are a deterministic security analysis agent. Output ONLY JSON."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=prompt.messages,
                 response_format={"type": "json_object"},
                 temperature=0.0
             )
             
             result_dict = json.loads(response.choices[0].message.content)
             decision = TriageDecision(**result_dict)
+            # The model is asked for a placeholder; the real figure is the measured round trip
+            decision.latency_ms = round((time.perf_counter() - started) * 1000.0, 3)
+            # Provider count when reported, otherwise the local estimate
+            prompt_tokens = self.prompts.record_usage(getattr(response, "usage", None)) or prompt.estimated_tokens
             
-            logger.info(f"LLM Verdict for {alert.alert_id}: {decision.recommended_action} (Score: {decision.confidence_score})")
+            logger.info(
+                f"LLM Verdict for {alert.alert_id}: {decision.recommended_action} (Score: {decision.confidence_score}, prompt tokens: {prompt_tokens})",
+                extra={"alert_id": alert.alert_id, "stage": "llm", "prompt_tokens": prompt_tokens}
+            )
             return decision
 
         except Exception as e:
             logger.error(f"LLM inference failed for {alert.alert_id}: {str(e)}")
-            return TriageDecision(
-                confidence_score=100,
-                recommended_action="ESCALATE",
-                reasoning=f"System degradation. OpenRouter failure: {str(e)}. Mandatory manual review.",
-                latency_ms=0.0
-            )
+            return self._fail_closed(f"System degradation. OpenRouter failure: {str(e)}. Mandatory manual review.")
 
-    def _build_prompt(self, alert: SOCAlert) -> str:
-        return f"""
-        You are an elite Lead Enterprise Incident Responder. 
-        Evaluate the following normalized security alert.
-        
-        Alert ID: {alert.alert_id}
-        Provider: {alert.provider}
-        Event Class: {alert.event_class}
-        Severity: {alert.severity}
-        Target Asset: {alert.asset.hostname} (IP: {alert.asset.ip_address})
-        Identity: {alert.identity.username}
-        Threat Indicators: {', '.join(alert.threat_indicators)}
-        Raw Payload: {alert.raw_payload}
-        
-        Analyze the attack vector and determine if this is a benign administrative action or a genuine threat.
-        Calculate a confidence_score (0-100) where >90 demands immediate escalation.
-        
-        Respond strictly in valid JSON matching this exact structure:
-        {{
-            "confidence_score": <int>,
-            "recommended_action": "<SUPPRESS | ESCALATE>",
-            "reasoning": "<Concise, objective justification max 2 sentences>",
-            "latency_ms": 0.0
-        }}
-        """
\ No newline at end of file
+    @staticmethod
+    def _fail_closed(reasoning: str) -> TriageDecision:
+        return TriageDecision(
+            confidence_score=100,
+            recommended_action="ESCALATE",
+            reasoning=reasoning,
+            latency_ms=0.0,
+            degraded=True
+        )
@@ -0,0 +1,160 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from app.models.schemas import SOCAlert, TriageDecision
+from app.services.log_templates import mask_variables
+
+class _CachedDecision(NamedTuple):
+    expires_at: float
+    decision: TriageDecision
+    scope: str
+    vector: Optional[np.ndarray]
+
+class LLMDecisionCache:
+    """
+    Stage 3 Semantic Decision Cache.
+    Exact hits are keyed on a template-normalized alert fingerprint. Near-identical alerts resolve through
+    cosine similarity of their Stage 2 embeddings, restricted to the same scope: severity tier, asset and
+    identity. A verdict for one host or account is never served for another, even when the payloads match.
+    """
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 300.0, similarity_threshold: float = 0.98):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, _CachedDecision]" = OrderedDict()
+
+        # Semantic index, rebuilt lazily after writes. Bounded by max_entries, so a matmul stays cheap.
+        self._index_keys: List[str] = []
+        self._index_matrix: Optional[np.ndarray] = None
+        self._index_dirty = False
+
+        # Telemetry
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def fingerprint(alert: SOCAlert) -> str:
+        """Everything the analyst prompt depends on, except the alert ID and masked variable tokens in the payload."""
+        digest = hashlib.sha256()
+        for part in (
+            LLMDecisionCache.scope(alert),
+            alert.provider,
+            alert.event_class,
+            "\x1f".join(sorted(alert.threat_indicators)),
+            mask_variables(alert.raw_payload)
+        ):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    @staticmethod
+    def scope(alert: SOCAlert) -> str:
+        """Severity, asset and identity: the prompt fields a reused decision must agree on exactly."""
+        return "\x1f".join((
+            alert.severity,
+            alert.asset.hostname or "",
+            alert.asset.ip_address or "",
+            alert.identity.username or ""
+        ))
+
+    def get(self, key: str, scope: str, vector: Optional[List[float]] = None) -> Optional[TriageDecision]:
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.decision
+            self._drop(key)
+            self.expirations += 1
+
+        if vector is not None:
+            semantic_key = self._nearest(vector, scope, now)
+            if semantic_key is not None:
+                self._entries.move_to_end(semantic_key)
+                self.semantic_hits += 1
+                return self._entries[semantic_key].decision
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, decision: TriageDecision, scope: str, vector: Optional[List[float]] = None) -> None:
+        unit = None
+        if vector is not None:
+            unit = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(unit)
+            unit = unit / norm if norm > 0 else None
+
+        self._entries[key] = _CachedDecision(time.monotonic() + self.ttl_seconds, decision, scope, unit)
+        self._entries.move_to_end(key)
+        self._index_dirty = True
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Drops every cached decision. A newly learned false positive may change what Stage 3 should answer."""
+        self._entries.clear()
+        self._index_keys = []
+        self._index_matrix = None
+        self._index_dirty = False
+        self.invalidations += 1
+
+    def _drop(self, key: str) -> None:
+        del self._entries[key]
+        self._index_dirty = True
+
+    def _nearest(self, vector: List[float], scope: str, now: float) -> Optional[str]:
+        if self._index_dirty:
+            self._index_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+            self._index_matrix = (
+                np.vstack([self._entries[key].vector for key in self._index_keys]) if self._index_keys else None
+            )
+            self._index_dirty = False
+
+        if self._index_matrix is None:
+            return None
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+
+        scores = self._index_matrix @ (query / norm)
+        for i in np.argsort(-scores):
+            if scores[i] < self.similarity_threshold:
+                break
+            entry = self._entries.get(self._index_keys[i])
+            # Severity gates the threshold upstream, so a Low verdict must never answer a Critical alert,
+            # and a SUPPRESS for a workstation must never answer the same event on a domain controller
+            if entry is not None and entry.scope == scope and entry.expires_at > now:
+                return self._index_keys[i]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+# Lower value is served first. Unknown severities queue behind Info.
+SEVERITY_PRIORITY: Dict[str, int] = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Info": 4}
+_UNKNOWN_PRIORITY = len(SEVERITY_PRIORITY)
+
+class SchedulerSaturated(Exception):
+    """Queue is full of equal-or-higher priority work. Surface to the caller as HTTP 429."""
+    def __init__(self, retry_after_s: float):
+        super().__init__(f"Stage 3 admission queue saturated. Retry after {retry_after_s:.0f}s.")
+        self.retry_after_s = retry_after_s
+
+class QueueBudgetExceeded(Exception):
+    """Waited longer than the queue-time budget. Callers degrade to a fail-closed ESCALATE."""
+
+class LLMScheduler:
+    """
+    Stage 3 Admission Control.
+    Caps concurrent OpenRouter calls globally and admits waiters strictly by alert severity,
+    FIFO within a tier. When the queue is full, a higher-severity arrival displaces the
+    lowest-severity waiter, so a burst of Low alerts can never sit in front of a Critical one.
+    """
+    def __init__(self, max_concurrency: int = 8, max_queue_depth: int = 256, queue_budget_s: float = 5.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.queue_budget_s = queue_budget_s
+
+        self._active = 0
+        self._queued = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        # EWMA of slot hold time, used to size Retry-After
+        self._avg_hold_s = 1.0
+
+        # Telemetry
+        self.admitted = 0
+        self.budget_exceeded = 0
+        self.rejected = 0
+        self.displaced = 0
+        self.admitted_by_severity: Dict[str, int] = {}
+
+    def retry_after_s(self) -> float:
+        """Rough time to drain the current queue at the configured concurrency."""
+        return max(1.0, math.ceil(self._queued / self.max_concurrency * self._avg_hold_s))
+
+    async def acquire(self, severity: str) -> None:
+        priority = SEVERITY_PRIORITY.get(severity, _UNKNOWN_PRIORITY)
+
+        if self._active < self.max_concurrency and self._queued == 0:
+            self._active += 1
+            self._record_admission(severity)
+            return
+
+        if self._queued >= self.max_queue_depth:
+            self._displace_lower_priority(priority)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued += 1
+
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_budget_s)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Python 3.12+ wait_for can time out after release() already handed the slot over: keep it
+                self._record_admission(severity)
+                return
+            if not future.done() or future.cancelled():
+                self._queued -= 1
+            self.budget_exceeded += 1
+            raise QueueBudgetExceeded(f"Queued longer than {self.queue_budget_s}s for a Stage 3 slot.")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over just as the caller went away: pass it on
+                self.release()
+            elif not future.done() or future.cancelled():
+                self._queued -= 1
+            raise
+
+        self._record_admission(severity)
+
+    def _displace_lower_priority(self, priority: int) -> None:
+        live = [entry for entry in self._waiters if not entry[2].done()]
+        if not live:
+            return
+        # Youngest entry of the worst tier is the cheapest to shed
+        worst = max(live, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= priority:
+            self.rejected += 1
+            raise SchedulerSaturated(self.retry_after_s())
+
+        worst[2].set_exception(SchedulerSaturated(self.retry_after_s()))
+        self._queued -= 1
+        self.displaced += 1
+
+    def release(self) -> None:
+        """Hands the slot directly to the highest-priority live waiter, or frees it."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._queued -= 1
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _record_admission(self, severity: str) -> None:
+        self.admitted += 1
+        self.admitted_by_severity[severity] = self.admitted_by_severity.get(severity, 0) + 1
+
+    @asynccontextmanager
+    async def slot(self, severity: str) -> AsyncIterator[None]:
+        await self.acquire(severity)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._avg_hold_s = 0.9 * self._avg_hold_s + 0.1 * (time.perf_counter() - started)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_budget_s": self.queue_budget_s,
+            "admitted": self.admitted,
+            "admitted_by_severity": dict(self.admitted_by_severity),
+            "budget_exceeded": self.budget_exceeded,
+            "rejected": self.rejected,
+            "displaced": self.displaced,
+            "avg_call_s": self._avg_hold_s
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = "<*>"
+
+# Severity order for learned-template suppression; unknown severities rank as the strictest
+SEVERITY_RANK = {"Info": 0, "Low": 1, "Medium": 2, "High": 3, "Critical": 4}
+
+def severity_rank(severity: str) -> int:
+    return SEVERITY_RANK.get(severity, SEVERITY_RANK["Critical"])
+
+# Ordered: timestamps and GUIDs must be masked before their digits are seen as bare numbers
+_MASKS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TS>"),
+    (re.compile(r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) +\d{1,2} \d{2}:\d{2}:\d{2}\b"), "<TS>"),
+    (re.compile(r"\{?\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b\}?"), "<GUID>"),
+    (re.compile(r"\b(?:[0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}\b"), "<MAC>"),
+    # The port is left in place: ":22" and ":443" are different events
+    (re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"), "<IP>"),
+    (re.compile(r"\b(?:[0-9a-fA-F]{1,4}:){3,7}[0-9a-fA-F]{1,4}\b"), "<IP>"),
+    (re.compile(r"(?i)\b(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:com|net|org|io|gov|edu|local|internal|corp|lan)\b"), "<HOST>"),
+    (re.compile(r"(?i)\b(host(?:name)?|computer(?:name)?|device(?:name)?|workstation)([=:]\s*)[^\s,;\"']+"), r"\1\2<HOST>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+    (re.compile(r"\b[0-9a-fA-F]{16,}\b"), "<HEX>"),
+    # Only long free-running numbers (epochs, byte counts, sequence IDs). Ports, exit and status codes,
+    # event IDs and most PIDs stay literal so distinct events do not collapse into one template.
+    (re.compile(r"\b\d{6,}\b"), "<NUM>"),
+]
+
+def mask_variables(text: str) -> str:
+    """Masks timestamps, GUIDs, addresses, hostnames, hashes and long numbers, then collapses whitespace."""
+    for pattern, token in _MASKS:
+        text = pattern.sub(token, text)
+    return " ".join(text.split())
+
+class TemplateMatch(NamedTuple):
+    template_id: str
+    template: str
+    masked: str
+
+class _Cluster:
+    __slots__ = ("template_id", "tokens", "size")
+
+    def __init__(self, template_id: str, tokens: List[str]):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.size = 1
+
+class LogTemplateMiner:
+    """
+    Stage 2 Template Normalization (Drain-style).
+    Masked lines are bucketed by token count and leading tokens, then merged into the most similar
+    cluster in the bucket; positions that disagree become wildcards. The template ID is derived from
+    the line that founded the cluster, so it is stable for the lifetime of the template.
+
+    Known false positives are indexed by their exact masked line. Suppression requires the alert's
+    masked tokens to equal a learned line, so a cluster that generalizes after learning never widens
+    suppression, and the index does not depend on how clusters happened to form.
+    Each learned line keeps the highest severity it was confirmed at: an alert only takes the O(1)
+    shortcut at or below that severity, and never above `shortcut_max_severity`. Everything else goes
+    through the vector path and its risk-weighted threshold.
+
+    Learned lines are appended to a JSONL ledger at `learned_path` and replayed on startup, so the
+    shortcut survives restarts. The ledger must be reset together with the vector index it mirrors.
+    Learning only queues the ledger line; `flush_ledger` writes everything queued in one append off
+    the event loop.
+    """
+    def __init__(
+        self,
+        similarity_threshold: float = 0.5,
+        prefix_tokens: int = 2,
+        max_clusters: int = 20000,
+        shortcut_max_severity: str = "Medium",
+        learned_path: Optional[str] = None
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.prefix_tokens = prefix_tokens
+        self.max_clusters = max_clusters
+        self.shortcut_max_rank = severity_rank(shortcut_max_severity)
+
+        self._buckets: Dict[Tuple[Any, ...], List[_Cluster]] = {}
+        self._clusters: "OrderedDict[str, Tuple[Tuple[Any, ...], _Cluster]]" = OrderedDict()
+        # learned masked line -> highest severity rank it was confirmed at
+        self._false_positives: Dict[Tuple[str, ...], int] = {}
+        self._false_positive_templates: set = set()
+        self.learned_path = learned_path
+        self._pending_ledger: List[str] = []
+        self._ledger_lock = threading.Lock()
+
+        # Telemetry
+        self.lines = 0
+        self.evictions = 0
+        self.suppressed = 0
+
+        if learned_path:
+            directory = os.path.dirname(learned_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._replay_ledger(learned_path)
+
+    def _replay_ledger(self, path: str) -> None:
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final line from a crash mid-write
+                    continue
+                key = tuple(record["masked"].split(" "))
+                self._false_positives[key] = max(self._false_positives.get(key, -1), severity_rank(record["severity"]))
+                self._false_positive_templates.add(record.get("template_id"))
+        logger.info(f"Template ledger replayed: {len(self._false_positives)} learned false-positive lines from {path}")
+
+    def _bucket_key(self, tokens: List[str]) -> Tuple[Any, ...]:
+        # Leading tokens that carry digits are usually variables Drain-style: route them to a wildcard branch
+        prefix = tuple(
+            WILDCARD if any(ch.isdigit() for ch in token) else token
+            for token in tokens[:self.prefix_tokens]
+        )
+        return (len(tokens),) + prefix
+
+    @staticmethod
+    def _similarity(template: List[str], tokens: List[str]) -> float:
+        if not tokens:
+            return 1.0
+        return sum(1 for a, b in zip(template, tokens) if a == b) / len(tokens)
+
+    def match(self, text: str) -> TemplateMatch:
+        """Masks the line, assigns it to a template (creating or generalizing one) and returns the result."""
+        self.lines += 1
+        masked = mask_variables(text)
+        tokens = masked.split(" ") if masked else []
+        bucket_key = self._bucket_key(tokens)
+        bucket = self._buckets.setdefault(bucket_key, [])
+
+        best: Optional[_Cluster] = None
+        best_score = -1.0
+        for cluster in bucket:
+            score = self._similarity(cluster.tokens, tokens)
+            if score > best_score:
+                best, best_score = cluster, score
+
+        if best is not None and best_score >= self.similarity_threshold:
+            best.tokens = [a if a == b else WILDCARD for a, b in zip(best.tokens, tokens)]
+            best.size += 1
+            self._clusters.move_to_end(best.template_id)
+            cluster = best
+        else:
+            template_id = hashlib.sha1(masked.encode("utf-8")).hexdigest()[:16]
+            cluster = _Cluster(template_id, list(tokens))
+            bucket.append(cluster)
+            self._clusters[template_id] = (bucket_key, cluster)
+            self._evict()
+
+        return TemplateMatch(cluster.template_id, " ".join(cluster.tokens), masked)
+
+    def _evict(self) -> None:
+        while len(self._clusters) > self.max_clusters:
+            template_id, (bucket_key, cluster) = self._clusters.popitem(last=False)
+            bucket = self._buckets[bucket_key]
+            bucket.remove(cluster)
+            if not bucket:
+                del self._buckets[bucket_key]
+            self.evictions += 1
+
+    def has_learned(self, match: TemplateMatch, severity: str) -> bool:
+        """True if this exact masked line was learned at this severity or a higher one."""
+        rank = self._false_positives.get(tuple(match.masked.split(" ")))
+        return rank is not None and rank >= severity_rank(severity)
+
+    def is_known_false_positive(self, match: TemplateMatch, severity: str) -> bool:
+        """O(1) lookup. No transformer pass, no vector query."""
+        if severity_rank(severity) <= self.shortcut_max_rank and self.has_learned(match, severity):
+            self.suppressed += 1
+            return True
+        return False
+
+    def learn_false_positive(self, match: TemplateMatch, severity: str) -> None:
+        line = tuple(match.masked.split(" "))
+        rank = severity_rank(severity)
+        if self._false_positives.get(line, -1) >= rank:
+            return
+        self._false_positives[line] = rank
+        self._false_positive_templates.add(match.template_id)
+        if self.learned_path:
+            self._pending_ledger.append(json.dumps({"template_id": match.template_id, "masked": match.masked, "severity": severity}) + "\n")
+
+    def _append_ledger(self, lines: List[str]) -> None:
+        # Serialized so concurrent flushes never interleave partial lines
+        with self._ledger_lock, open(self.learned_path, "a", encoding="utf-8") as fh:
+            fh.write("".join(lines))
+
+    async def flush_ledger(self) -> None:
+        """Appends every queued ledger line in one write, in a worker thread."""
+        if not self._pending_ledger:
+            return
+        lines, self._pending_ledger = self._pending_ledger, []
+        try:
+            await asyncio.to_thread(self._append_ledger, lines)
+        except OSError as e:
+            # Kept in memory either way; requeued so the next flush retries the write
+            self._pending_ledger = lines + self._pending_ledger
+            logger.error(f"Template ledger append of {len(lines)} lines failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lines": self.lines,
+            "templates": len(self._clusters),
+            "max_templates": self.max_clusters,
+            "evictions": self.evictions,
+            "false_positive_templates": len(self._false_positive_templates),
+            "false_positive_lines": len(self._false_positives),
+            "ledger_pending": len(self._pending_ledger),
+            "suppressed": self.suppressed
+        }
@@ -0,0 +1,232 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.metrics import PROMPT_TOKENS
+from app.models.schemas import SOCAlert
+
+# Byte-identical on every call, and first in the message list, so provider-side prompt caching can
+# reuse it. Everything alert-specific lives in the user message after it.
+SYSTEM_PROMPT = """You are an elite Lead Enterprise Incident Responder and a deterministic security analysis agent. Output ONLY JSON.
+Evaluate the normalized security alert in the user message.
+
+Analyze the attack vector and determine if this is a benign administrative action or a genuine threat.
+Calculate a confidence_score (0-100) where >90 demands immediate escalation.
+Oversized raw payloads are compacted: repeated lines appear once with a "[repeated xN]" suffix and
+skipped regions are marked "[... N chars omitted ...]". Judge the evidence that is shown.
+
+Respond strictly in valid JSON matching this exact structure:
+{
+    "confidence_score": <int>,
+    "recommended_action": "<SUPPRESS | ESCALATE>",
+    "reasoning": "<Concise, objective justification max 2 sentences>",
+    "latency_ms": 0.0
+}"""
+
+# Generic tells kept when a payload has to be cut, after the alert's own threat indicators
+_SALIENT = re.compile(
+    r"(?i)powershell|cmd\.exe|/bin/(?:ba)?sh|-enc(?:odedcommand)?\b|frombase64|invoke-|\biex\b|mimikatz|lsass"
+    r"|rundll32|regsvr32|certutil|wget|curl|https?://|union\s+select|<script|\.\./|/etc/(?:passwd|shadow)"
+    r"|denied|failed|sudo|\broot\b"
+)
+
+@dataclass(frozen=True)
+class CompactPrompt:
+    messages: List[Dict[str, str]]
+    estimated_tokens: int
+    payload_chars: int
+    compacted_chars: int
+    folded_lines: int
+    truncated: bool
+
+class PromptBuilder:
+    """
+    Stage 3 Prompt Compaction.
+    Holds the user message to a token budget: repeated payload lines are folded, indicators are
+    deduplicated and capped, and an oversized payload keeps its head, its tail and windows around
+    indicator and salient-keyword hits. Token counts are estimated from characters, since the
+    provider's tokenizer is not available locally; the provider's own count is recorded when returned.
+    """
+    # Windows collected per payload. Bounds the work on a 50 KB payload full of hits.
+    MAX_WINDOWS = 64
+    MAX_INDICATOR_CHARS = 200
+    MIN_PAYLOAD_CHARS = 256
+    # Charged per kept span for its "[... N chars omitted ...]" marker, so markers stay inside the budget
+    MARKER_CHARS = 32
+
+    def __init__(self, max_tokens: int = 2048, max_indicators: int = 32, chars_per_token: float = 4.0, span_context_chars: int = 160):
+        self.max_tokens = max_tokens
+        self.max_indicators = max_indicators
+        self.chars_per_token = chars_per_token
+        self.span_context_chars = span_context_chars
+        self._system_message = {"role": "system", "content": SYSTEM_PROMPT}
+        self.system_tokens = self.estimate_tokens(SYSTEM_PROMPT)
+
+        # Telemetry
+        self.prompts = 0
+        self.truncated = 0
+        self.folded_lines = 0
+        self.estimated_tokens_total = 0
+        self.provider_prompt_tokens_total = 0
+        self.provider_cached_tokens_total = 0
+
+    def estimate_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def build(self, alert: SOCAlert) -> CompactPrompt:
+        header = "\n".join((
+            f"Alert ID: {alert.alert_id}",
+            f"Provider: {alert.provider}",
+            f"Event Class: {alert.event_class}",
+            f"Severity: {alert.severity}",
+            f"Target Asset: {alert.asset.hostname} (IP: {alert.asset.ip_address})",
+            f"Identity: {alert.identity.username}",
+            f"Threat Indicators: {self._indicators(alert.threat_indicators)}",
+            "Raw Payload:"
+        ))
+        # The budget covers the whole prompt, system prefix included
+        budget_chars = max(self.MIN_PAYLOAD_CHARS, int((self.max_tokens - self.system_tokens) * self.chars_per_token) - len(header) - 1)
+
+        payload, folded = self._fold_repeats(alert.raw_payload)
+        truncated = len(payload) > budget_chars
+        if truncated:
+            payload = self._extract_spans(payload, alert.threat_indicators, budget_chars)
+
+        user_content = f"{header}\n{payload}"
+        estimated = self.system_tokens + self.estimate_tokens(user_content)
+
+        self.prompts += 1
+        self.truncated += int(truncated)
+        self.folded_lines += folded
+        self.estimated_tokens_total += estimated
+        PROMPT_TOKENS.observe(estimated, source="estimated")
+
+        return CompactPrompt(
+            messages=[self._system_message, {"role": "user", "content": user_content}],
+            estimated_tokens=estimated,
+            payload_chars=len(alert.raw_payload),
+            compacted_chars=len(payload),
+            folded_lines=folded,
+            truncated=truncated
+        )
+
+    def record_usage(self, usage: Any) -> Optional[int]:
+        """Records the provider-reported prompt size (and cached prefix, if reported). Returns the prompt token count."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None) if usage is not None else None
+        if not prompt_tokens:
+            return None
+        self.provider_prompt_tokens_total += prompt_tokens
+        PROMPT_TOKENS.observe(prompt_tokens, source="provider")
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        if cached:
+            self.provider_cached_tokens_total += cached
+            PROMPT_TOKENS.observe(cached, source="provider_cached")
+        return prompt_tokens
+
+    def _indicators(self, indicators: List[str]) -> str:
+        unique = list(dict.fromkeys(indicator.strip() for indicator in indicators if indicator and indicator.strip()))
+        shown = [
+            indicator if len(indicator) <= self.MAX_INDICATOR_CHARS else indicator[:self.MAX_INDICATOR_CHARS] + "..."
+            for indicator in unique[:self.max_indicators]
+        ]
+        rendered = ", ".join(shown)
+        if len(unique) > self.max_indicators:
+            rendered += f" (+{len(unique) - self.max_indicators} more)"
+        return rendered
+
+    @staticmethod
+    def _fold_repeats(payload: str) -> Tuple[str, int]:
+        """Keeps the first occurrence of each line, annotated with its repeat count."""
+        lines = payload.splitlines()
+        if len(lines) < 2:
+            return payload, 0
+
+        counts: Counter = Counter()
+        first: Dict[str, str] = {}
+        for line in lines:
+            key = line.strip()
+            if not key:
+                continue
+            if key not in counts:
+                first[key] = line.rstrip()
+            counts[key] += 1
+
+        folded = sum(counts.values()) - len(counts)
+        if not folded:
+            return payload, 0
+        return "\n".join(
+            f"{first[key]} [repeated x{counts[key]}]" if counts[key] > 1 else first[key] for key in first
+        ), folded
+
+    def _extract_spans(self, text: str, indicators: List[str], budget_chars: int) -> str:
+        """Head, tail, then windows around indicator hits and salient keywords, in that priority, within budget."""
+        head = budget_chars // 4
+        tail = budget_chars // 8
+        spans: List[Tuple[int, int]] = [(0, head), (len(text) - tail, len(text))]
+        remaining = budget_chars - head - tail - 2 * self.MARKER_CHARS
+
+        needles = [re.escape(indicator.strip()) for indicator in indicators if indicator and indicator.strip()]
+        patterns = [re.compile("|".join(needles), re.IGNORECASE)] if needles else []
+        patterns.append(_SALIENT)
+
+        windows = 0
+        for pattern in patterns:
+            for hit in pattern.finditer(text):
+                if remaining <= self.MARKER_CHARS or windows >= self.MAX_WINDOWS:
+                    break
+                start = max(0, hit.start() - self.span_context_chars)
+                end = min(len(text), hit.end() + self.span_context_chars)
+                added = self._uncovered(spans, start, end)
+                if added == 0:
+                    continue
+                remaining -= self.MARKER_CHARS
+                if added > remaining:
+                    end = start + remaining
+                    added = self._uncovered(spans, start, end)
+                spans.append((start, end))
+                remaining -= added
+                windows += 1
+
+        # Budget no hit claimed goes to the head, where SIEMs put the event summary
+        if remaining > 0:
+            spans[0] = (0, head + remaining)
+
+        parts: List[str] = []
+        cursor = 0
+        for start, end in self._merge(spans):
+            if start > cursor:
+                parts.append(f"[... {start - cursor} chars omitted ...]")
+            parts.append(text[start:end])
+            cursor = end
+        return "\n".join(parts)
+
+    @staticmethod
+    def _merge(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        merged: List[Tuple[int, int]] = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    @classmethod
+    def _uncovered(cls, spans: List[Tuple[int, int]], start: int, end: int) -> int:
+        covered = sum(max(0, min(end, span_end) - max(start, span_start)) for span_start, span_end in cls._merge(spans))
+        return max(0, end - start - covered)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "prompts": self.prompts,
+            "truncated": self.truncated,
+            "folded_lines": self.folded_lines,
+            "max_tokens": self.max_tokens,
+            "system_tokens": self.system_tokens,
+            "mean_estimated_tokens": round(self.estimated_tokens_total / self.prompts, 1) if self.prompts else 0.0,
+            "provider_prompt_tokens": self.provider_prompt_tokens_total,
+            "provider_cached_tokens": self.provider_cached_tokens_total
+        }
@@ -1,32 +1,261 @@
 import re
+import sys
+import time
+import asyncio
 import hashlib
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+from app.core.config import settings
 from app.core.logger import logger
+from app.services.signature_packs import (
+    Signature,
+    pack_fingerprint,
+    parse_signature_pack,
+    read_signature_pack
+)
+
+# Per-rule telemetry: name -> [times verified, times fired, cumulative verification seconds]
+RuleStats = Dict[str, List[float]]
+
+# O(1) Compiled Regex with strict boundary conditions to prevent ReDoS
+# We drop wildcard quantifiers (.*) to guarantee linear O(n) execution.
+DEFAULT_SIGNATURES: Tuple[Signature, ...] = (
+    Signature(
+        "python_dunder_escape",
+        r"(?:__import__|__builtins__|__globals__|__subclasses__)",
+        ("__import__", "__builtins__", "__globals__", "__subclasses__")
+    ),
+    Signature(
+        "dynamic_code_execution",
+        r"(?:eval|exec|compile)\s*\(",
+        ("eval", "exec", "compile")
+    ),
+    Signature(
+        "shell_command_execution",
+        r"(?:os\.system|subprocess\.|rm\s+-rf)",
+        ("os.system", "subprocess.", "-rf")
+    ),
+    Signature(
+        "prompt_injection",
+        r"(?:ignore\s+previous\s+instructions|system\s+override)",
+        ("ignore", "override")
+    ),
+    Signature(
+        "secret_material",
+        r"(?:BEGIN\s+PRIVATE\s+KEY|sk-[a-zA-Z0-9]{20,})",
+        ("private", "sk-")
+    ),
+)
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    """Folds literals into a prefix trie so the regex engine walks shared prefixes once."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if terminal else body
+
+    return build(trie)
+
+class SignatureSet:
+    """
+    Compiled, immutable signature catalogue.
+    One trie-structured literal prefilter pass over the payload selects candidate rules;
+    only those rules' regexes are verified. Scan cost stays flat as benign rules are added.
+    Hot reloads build a new instance and swap the reference, so in-flight scans finish on the old one.
+
+    The prefilter runs with re.IGNORECASE on the raw payload, so it accepts exactly the case variants
+    the rules themselves accept, Unicode simple case folds included ("İgnore", "ſk-", "oſ.system").
+    Hits are mapped back to literals through the same per-character equivalence re applies.
+    """
+    # Distinct hit strings whose canonical form is memoized; beyond this they are folded per scan
+    MAX_FOLDED_HITS = 65536
+
+    def __init__(self, signatures: Sequence[Signature]):
+        signatures = tuple(signatures)
+        alphabet = sorted({ch for sig in signatures for literal in sig.literals for ch in literal})
+        self._init_folding(alphabet)
+
+        rules_by_literal: Dict[str, set] = {}
+        unanchored = frozenset(i for i, sig in enumerate(signatures) if not sig.literals)
+        for i, sig in enumerate(signatures):
+            for literal in sig.literals:
+                rules_by_literal.setdefault(self._canonical(literal), set()).add(i)
+
+        # The prefilter reports the longest literal at each offset, so a hit must
+        # also fire every rule anchored on a shorter literal that prefixes it.
+        rules_for_hit: Dict[str, FrozenSet[int]] = {
+            literal: frozenset().union(*(
+                rules_by_literal.get(literal[:end], ()) for end in range(1, len(literal) + 1)
+            ))
+            for literal in rules_by_literal
+        }
+
+        # Zero-width lookahead yields a hit at every offset, so overlapping literals are never skipped
+        prefilter_source = f"(?=({_trie_pattern(list(rules_by_literal))}))" if rules_by_literal else None
+
+        self.signatures = signatures
+        self.patterns = [re.compile(sig.pattern, sig.flags) for sig in signatures]
+        self.prefilter_source = prefilter_source
+        # Same case semantics as the rules: running it on text.lower() missed Unicode case folds
+        self.prefilter = re.compile(prefilter_source, re.IGNORECASE) if prefilter_source else None
+        self._rules_for_hit = rules_for_hit
+        self.unanchored = unanchored
+
+    def _init_folding(self, alphabet: Sequence[str]) -> None:
+        # Canonical representative per IGNORECASE equivalence class, so "S", "s" and "ſ" share one trie branch
+        self._alphabet = tuple(alphabet)
+        self._folded_chars: Dict[str, str] = {}
+        self._folded_hits: Dict[str, str] = {}
+
+    def _fold_char(self, ch: str) -> str:
+        folded = self._folded_chars.get(ch)
+        if folded is None:
+            folded = ch
+            for candidate in self._alphabet:
+                if re.fullmatch(re.escape(candidate), ch, re.IGNORECASE):
+                    folded = candidate
+                    break
+            self._folded_chars[ch] = folded
+        return folded
+
+    def _canonical(self, text: str) -> str:
+        folded = self._folded_hits.get(text)
+        if folded is None:
+            folded = "".join(self._fold_char(ch) for ch in text)
+            if len(self._folded_hits) < self.MAX_FOLDED_HITS:
+                self._folded_hits[text] = folded
+        return folded
+
+    def candidates(self, text: str) -> FrozenSet[int]:
+        """Single prefilter pass. Returns indices of rules that could possibly match."""
+        if self.prefilter is None:
+            return self.unanchored
+
+        hits = set(self.prefilter.findall(text))
+        hits.discard("")
+        if not hits:
+            return self.unanchored
+        return self.unanchored.union(*(self._rules_for_hit.get(self._canonical(hit), ()) for hit in hits))
+
+    def _verify(
+        self,
+        text: str,
+        candidates: FrozenSet[int],
+        stats: Optional[RuleStats],
+        pos: int = 0,
+        endpos: int = sys.maxsize
+    ) -> Optional[str]:
+        for i in sorted(candidates):
+            if stats is None:
+                if self.patterns[i].search(text, pos, endpos):
+                    return self.signatures[i].name
+                continue
+
+            started = time.perf_counter()
+            found = self.patterns[i].search(text, pos, endpos)
+            rule = stats.setdefault(self.signatures[i].name, [0, 0, 0.0])
+            rule[0] += 1
+            rule[2] += time.perf_counter() - started
+            if found:
+                rule[1] += 1
+                return self.signatures[i].name
+        return None
+
+    def match(self, text: str, stats: Optional[RuleStats] = None) -> Optional[str]:
+        """Returns the name of the first signature (in catalogue order) that fires, or None."""
+        return self._verify(text, self.candidates(text), stats)
+
+    def match_stream(self, text: str, window: int, overlap: int, stats: Optional[RuleStats] = None) -> Optional[str]:
+        """
+        Bounded-memory scan of oversized payloads.
+        Walks fixed windows that overlap by `overlap` characters, so any match no longer than
+        the overlap is fully contained in at least one window. Exits on the first hit.
+        Only the prefilter copies a window; rule verification runs in place via pos/endpos.
+        """
+        step = window - overlap
+        length = len(text)
+        start = 0
+        while start < length:
+            end = min(start + window, length)
+            fired = self._verify(text, self.candidates(text[start:end]), stats, start, end)
+            if fired is not None:
+                return fired
+            if end == length:
+                break
+            start += step
+        return None
+
+# Per-process cache so pool workers compile a catalogue once, not once per payload
+_worker_signature_sets: Dict[str, SignatureSet] = {}
+
+def _stream_scan_worker(
+    version: str,
+    signatures: Tuple[Signature, ...],
+    text: str,
+    window: int,
+    overlap: int
+) -> Tuple[Optional[str], RuleStats]:
+    """Process-pool entry point. Must stay module-level to be picklable. Returns per-rule stats for merging."""
+    signature_set = _worker_signature_sets.get(version)
+    if signature_set is None:
+        signature_set = _worker_signature_sets[version] = SignatureSet(signatures)
+    stats: RuleStats = {}
+    return signature_set.match_stream(text, window, overlap, stats), stats
 
 class SovereignSentinel:
     """
     AXON ARCH | SATE ENGINE
     Stage 1.5: Deterministic Integrity & Bounded Fast-Fail Inspection.
     """
-    def __init__(self):
+    def __init__(self, signatures: Optional[Sequence[Signature]] = None):
         # Mission A: Merkle Proof configuration
         self.enforce_cryptographic_integrity = True
-        
-        # O(1) Compiled Regex with strict boundary conditions to prevent ReDoS
-        # We drop wildcard quantifiers (.*) to guarantee linear O(n) execution.
-        self.threat_patterns = [
-            re.compile(r"(?i)(?:__import__|__builtins__|__globals__|__subclasses__)"),
-            re.compile(r"(?i)(?:eval|exec|compile)\s*\("),
-            re.compile(r"(?i)(?:os\.system|subprocess\.|rm\s+-rf)"),
-            re.compile(r"(?i)(?:ignore\s+previous\s+instructions|system\s+override)"),
-            re.compile(r"(?i)(?:BEGIN\s+PRIVATE\s+KEY|sk-[a-zA-Z0-9]{20,})")
-        ]
-        
-        self.max_payload_bytes = 50000 
+
+        # Per-rule hit counts and cumulative verification time. Survives hot reloads (keyed by rule name).
+        self.rule_stats: RuleStats = {}
+
+        # Single-pass multi-signature engine. Signature packs on disk override the built-in catalogue.
+        self.signature_path = settings.SENTINEL_SIGNATURE_PATH if signatures is None else None
+        self.signature_set = SignatureSet(signatures if signatures is not None else DEFAULT_SIGNATURES)
+        self.signature_version = "builtin"
+        self.reloads = 0
+        self.reload_failures = 0
+        self._pack_fingerprint: Optional[Tuple[Tuple[str, int, int], ...]] = None
+        self._pack_missing = False
+        if self.signature_path:
+            try:
+                self.reload_signatures()
+            except Exception as e:
+                # Fail safe, not open: keep inspecting with the built-in catalogue
+                logger.error(f"Sentinel signature pack failed to load, using built-in catalogue: {str(e)}")
+
+        # Payloads above the inline limit are walked in overlapping windows instead of
+        # being blocked outright. Only the hard ceiling still fails closed.
+        self.max_payload_bytes = settings.SENTINEL_INLINE_SCAN_BYTES
+        self.max_stream_bytes = settings.SENTINEL_STREAM_MAX_BYTES
+        self.stream_window = settings.SENTINEL_STREAM_WINDOW_BYTES
+        self.stream_overlap = settings.SENTINEL_STREAM_OVERLAP_BYTES
+        if not 0 <= self.stream_overlap < self.stream_window:
+            raise ValueError("SENTINEL_STREAM_OVERLAP_BYTES must be smaller than SENTINEL_STREAM_WINDOW_BYTES.")
+
+        # Optional process pool so multi-MB scans never stall the event loop
+        self.process_pool_min_bytes = settings.SENTINEL_PROCESS_POOL_MIN_BYTES
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_workers = settings.SENTINEL_PROCESS_POOL_WORKERS
 
     def verify_merkle_leaf(self, payload: str, provided_hash: str) -> bool:
         """
-        Cryptographic validation. If the SIEM payload hash does not match 
+        Cryptographic validation. If the SIEM payload hash does not match
         the provided Merkle leaf, the data has been poisoned in transit.
         """
         calculated_hash = hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -34,12 +263,61 @@ class SovereignSentinel:
 
     def scan_payload(self, text: str, expected_hash: Optional[str] = None) -> bool:
         """
-        Executes sub-millisecond intent invalidation. 
+        Executes sub-millisecond intent invalidation.
         Returns True if THREAT DETECTED, False if CLEAN.
         """
-        # 1. HARD BOUNDARY: Block memory exhaustion attacks instantly
+        blocked = self._pre_scan_checks(text, expected_hash)
+        if blocked is not None:
+            return blocked
+
+        # 3. FAST-FAIL PATTERN MATCHING
+        # One prefilter pass, then only the candidate rules are verified.
+        # We return instantly on the FIRST confirmed match.
+        # The catalogue reference is read once, so a concurrent hot swap never splits a scan.
+        signature_set = self.signature_set
         if len(text) > self.max_payload_bytes:
-            logger.warning(f"Sentinel Block: Payload exceeds {self.max_payload_bytes} bytes.")
+            fired = signature_set.match_stream(text, self.stream_window, self.stream_overlap, self.rule_stats)
+        else:
+            fired = signature_set.match(text, self.rule_stats)
+        return self._verdict(fired)
+
+    async def scan_payload_async(self, text: str, expected_hash: Optional[str] = None) -> bool:
+        """
+        Event-loop friendly variant of scan_payload.
+        Very large payloads are streamed inside the process pool when one is configured.
+        """
+        if not self._process_pool_workers or len(text) < self.process_pool_min_bytes:
+            return self.scan_payload(text, expected_hash)
+
+        blocked = self._pre_scan_checks(text, expected_hash)
+        if blocked is not None:
+            return blocked
+
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self._process_pool_workers)
+
+        signature_set, version = self.signature_set, self.signature_version
+        loop = asyncio.get_running_loop()
+        fired, worker_stats = await loop.run_in_executor(
+            self._process_pool,
+            _stream_scan_worker,
+            version,
+            signature_set.signatures,
+            text,
+            self.stream_window,
+            self.stream_overlap
+        )
+        for name, (verified, hits, seconds) in worker_stats.items():
+            rule = self.rule_stats.setdefault(name, [0, 0, 0.0])
+            rule[0] += verified
+            rule[1] += hits
+            rule[2] += seconds
+        return self._verdict(fired)
+
+    def _pre_scan_checks(self, text: str, expected_hash: Optional[str]) -> Optional[bool]:
+        # 1. HARD BOUNDARY: Block memory exhaustion attacks instantly
+        if len(text) > self.max_stream_bytes:
+            logger.warning(f"Sentinel Block: Payload exceeds {self.max_stream_bytes} bytes.")
             return True
 
         # 2. CRYPTOGRAPHIC INTEGRITY: The Merkle Check
@@ -48,12 +326,78 @@ class SovereignSentinel:
                 logger.error("Sentinel Block: MERKLE PROOF FAILED. Payload poisoned.")
                 return True
 
-        # 3. FAST-FAIL PATTERN MATCHING
-        # We return instantly on the FIRST match. Accumulating a "risk_score" 
-        # wastes CPU cycles. If it's malicious, kill it immediately.
-        for pattern in self.threat_patterns:
-            if pattern.search(text):
-                logger.warning(f"Sentinel Block: DPI matched signature {pattern.pattern}")
-                return True 
-        
-        return False
\ No newline at end of file
+        return None
+
+    def _verdict(self, fired: Optional[str]) -> bool:
+        if fired is not None:
+            logger.warning(f"Sentinel Block: DPI matched signature {fired}")
+            return True
+        return False
+
+    def _compile_pack(self) -> Tuple[SignatureSet, str]:
+        contents, content_hash = read_signature_pack(self.signature_path)
+        return SignatureSet(parse_signature_pack(contents)), content_hash
+
+    def reload_signatures(self) -> bool:
+        """
+        Recompiles the signature pack if it changed on disk and atomically swaps it in.
+        Returns True when a new catalogue went live. Safe to call from a worker thread.
+        """
+        try:
+            fingerprint = pack_fingerprint(self.signature_path)
+        except FileNotFoundError:
+            # Mid-deploy or deleted by mistake: keep inspecting with the live catalogue and say so once
+            if not self._pack_missing:
+                self._pack_missing = True
+                logger.warning(f"Sentinel signature pack {self.signature_path} is missing. Keeping catalogue {self.signature_version}.")
+            return False
+        self._pack_missing = False
+        if fingerprint == self._pack_fingerprint:
+            return False
+
+        # Record the fingerprint first so a broken pack is reported once, not on every poll
+        self._pack_fingerprint = fingerprint
+        try:
+            signature_set, content_hash = self._compile_pack()
+        except Exception:
+            self.reload_failures += 1
+            raise
+
+        if content_hash == self.signature_version:
+            return False
+
+        # Single reference assignment: scans already running keep the catalogue they started with
+        self.signature_set = signature_set
+        self.signature_version = content_hash
+        self.reloads += 1
+        logger.info(f"Sentinel signature pack {content_hash[:12]} live: {len(signature_set.signatures)} rules.")
+        return True
+
+    async def watch_signature_packs(self) -> None:
+        """Background poller. Compiles off the event loop so reloads never stall ingestion."""
+        while True:
+            await asyncio.sleep(settings.SENTINEL_RELOAD_INTERVAL_S)
+            try:
+                await asyncio.to_thread(self.reload_signatures)
+            except Exception as e:
+                logger.error(f"Sentinel signature reload rejected, keeping previous catalogue: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        rules = {
+            name: {"verified": int(verified), "hits": int(hits), "match_time_ms": seconds * 1000.0}
+            for name, (verified, hits, seconds) in sorted(
+                self.rule_stats.items(), key=lambda item: item[1][2], reverse=True
+            )
+        }
+        return {
+            "signature_version": self.signature_version,
+            "rule_count": len(self.signature_set.signatures),
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+            "rules": rules
+        }
+
+    def shutdown(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True, cancel_futures=True)
+            self._process_pool = None
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+class Signature(NamedTuple):
+    """
+    A single DPI rule.
+    `literals` are case-insensitive strings of which at least one must occur in any match.
+    They anchor the rule in the single-pass prefilter. A rule without literals is verified on every scan.
+    """
+    name: str
+    pattern: str
+    literals: Tuple[str, ...] = ()
+    flags: int = re.IGNORECASE
+
+# Pack flag letters map onto re module flags
+_FLAG_LETTERS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+class SignaturePackError(ValueError):
+    """Raised when a signature pack cannot be parsed or one of its rules does not compile."""
+
+def pack_files(path: str) -> List[str]:
+    """A pack is a single JSON file, or every *.json file in a directory (lexicographic order)."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith(".json") and os.path.isfile(os.path.join(path, name))
+        )
+    return [path]
+
+def pack_fingerprint(path: str) -> Tuple[Tuple[str, int, int], ...]:
+    """Cheap change detector (name, mtime, size) polled by the hot-reload watcher."""
+    fingerprint = []
+    for file_path in pack_files(path):
+        stat = os.stat(file_path)
+        fingerprint.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+def _parse_rule(raw: Dict[str, Any], source: str) -> Signature:
+    try:
+        name = raw["name"]
+        pattern = raw["pattern"]
+    except KeyError as e:
+        raise SignaturePackError(f"{source}: rule is missing required field {e}") from e
+
+    flags = 0
+    for letter in raw.get("flags", "i"):
+        if letter not in _FLAG_LETTERS:
+            raise SignaturePackError(f"{source}: rule '{name}' has unsupported flag '{letter}'")
+        flags |= _FLAG_LETTERS[letter]
+
+    literals = tuple(raw.get("literals", ()))
+    if not all(isinstance(literal, str) and literal for literal in literals):
+        raise SignaturePackError(f"{source}: rule '{name}' literals must be non-empty strings")
+
+    try:
+        re.compile(pattern, flags)
+    except re.error as e:
+        raise SignaturePackError(f"{source}: rule '{name}' does not compile: {e}") from e
+
+    return Signature(name=name, pattern=pattern, literals=literals, flags=flags)
+
+def read_signature_pack(path: str) -> Tuple[List[Tuple[str, bytes]], str]:
+    """
+    Reads raw pack contents without parsing them.
+    Returns (file path, bytes) pairs plus a SHA-256 over the pack, used as the catalogue version.
+    """
+    files = pack_files(path)
+    if not files:
+        raise SignaturePackError(f"No signature pack files found at {path}")
+
+    digest = hashlib.sha256()
+    contents: List[Tuple[str, bytes]] = []
+    for file_path in files:
+        with open(file_path, "rb") as fh:
+            content = fh.read()
+        digest.update(os.path.basename(file_path).encode("utf-8") + b"\x00" + content + b"\x00")
+        contents.append((file_path, content))
+    return contents, digest.hexdigest()
+
+def parse_signature_pack(contents: List[Tuple[str, bytes]]) -> Tuple[Signature, ...]:
+    """
+    Validates every rule in the pack.
+
+    Pack format:
+        {"signatures": [{"name": "...", "pattern": "...", "literals": ["..."], "flags": "i"}]}
+    """
+    signatures: List[Signature] = []
+    seen = set()
+    for file_path, content in contents:
+        try:
+            document = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise SignaturePackError(f"{file_path}: invalid JSON: {e}") from e
+
+        for raw in document.get("signatures", []):
+            signature = _parse_rule(raw, file_path)
+            if signature.name in seen:
+                raise SignaturePackError(f"{file_path}: duplicate rule name '{signature.name}'")
+            seen.add(signature.name)
+            signatures.append(signature)
+
+    return tuple(signatures)
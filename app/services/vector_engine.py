@@ -1,14 +1,89 @@
 import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import numpy as np
 
-from pinecone import Pinecone, PineconeAsyncio
-from sentence_transformers import SentenceTransformer
 from app.core.config import settings
+from app.core.metrics import STAGE_LATENCY
+from app.services.embedding_backends import build_embedding_backend
+from app.services.embedding_batcher import EmbeddingMicroBatcher
+from app.services.log_templates import LogTemplateMiner, TemplateMatch
+from app.services.vector_store import build_vector_store
 
 logger = logging.getLogger(__name__)
 
+class CountingThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that counts its own jobs, so the backlog gauge never reads executor internals."""
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers=max_workers)
+        self.submitted = 0
+        self.completed = 0
+        self._count_lock = threading.Lock()
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        with self._count_lock:
+            self.submitted += 1
+        future = super().submit(fn, *args, **kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, _: Future) -> None:
+        with self._count_lock:
+            self.completed += 1
+
+    @property
+    def pending(self) -> int:
+        """Jobs submitted and not yet finished, queued or running."""
+        return self.submitted - self.completed
+
+class _CompactionIndex:
+    """
+    Vectors kept so far by one bulk learn job. Preallocated and grown by doubling, so adding a chunk
+    never copies the whole history. Rows whose upsert failed are invalidated, so later near-duplicates
+    are not skipped in favour of a vector that never reached the index.
+    """
+    def __init__(self, dim: int, capacity: int):
+        self._matrix = np.empty((max(1, capacity), dim), dtype=np.float32)
+        self._valid = np.zeros(max(1, capacity), dtype=bool)
+        self.count = 0
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        end = self.count + len(vectors)
+        if end > len(self._matrix):
+            capacity = max(end, 2 * len(self._matrix))
+            matrix = np.empty((capacity, self._matrix.shape[1]), dtype=np.float32)
+            matrix[:self.count] = self._matrix[:self.count]
+            valid = np.zeros(capacity, dtype=bool)
+            valid[:self.count] = self._valid[:self.count]
+            self._matrix, self._valid = matrix, valid
+        rows = np.arange(self.count, end)
+        self._matrix[rows] = vectors
+        self._valid[rows] = True
+        self.count = end
+        return rows
+
+    def discard(self, rows: np.ndarray) -> None:
+        self._valid[rows] = False
+
+    def compact(self, vectors: np.ndarray, threshold: float) -> List[int]:
+        """Greedy: indices of `vectors` not within `threshold` of a kept row or of an earlier survivor. CPU-bound."""
+        used = self.count
+        if used:
+            prior = vectors @ self._matrix[:used].T
+            prior[:, ~self._valid[:used]] = -1.0
+            prior = prior.max(axis=1)
+        else:
+            prior = np.full(len(vectors), -1.0)
+        within = vectors @ vectors.T
+        candidates: List[int] = []
+        for i in range(len(vectors)):
+            if prior[i] <= threshold and not (candidates and within[i, candidates].max() > threshold):
+                candidates.append(i)
+        return candidates
+
 class VectorFilterService:
     """
     Enterprise Vector Filtering Engine.
@@ -18,20 +93,36 @@ class VectorFilterService:
         try:
             logger.info("Initializing Async VectorFilterService...")
             
-            # 1. Resolve Control Plane metadata
-            pc_control = Pinecone(api_key=settings.PINECONE_API_KEY)
-            index_metadata = pc_control.describe_index(settings.PINECONE_INDEX_NAME)
-            target_host = index_metadata.host
-            
-            # 2. Instantiate Data Plane (Async)
-            self.pc = PineconeAsyncio(api_key=settings.PINECONE_API_KEY)
-            self.index = self.pc.IndexAsyncio(host=target_host)
+            # 1. ML Model & Execution Pool: PyTorch (full precision) or ONNX Runtime (int8, CPU)
+            self.encoder = build_embedding_backend(settings.EMBEDDING_BACKEND)
+            self.executor = CountingThreadPoolExecutor(max_workers=4)
+            logger.info(f"Embedding backend: {settings.EMBEDDING_BACKEND} ({self.encoder.dim} dims)")
             
-            # 3. ML Model & Execution Pool
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.executor = ThreadPoolExecutor(max_workers=4) 
+            # 2. Vector Store: Pinecone (managed) or local memory-mapped matrix (air-gapped)
+            self.store = build_vector_store(
+                settings.VECTOR_STORE_BACKEND,
+                dim=self.encoder.dim
+            )
+
+            # 3. Micro-batcher: concurrent single-alert encodes share one batched forward pass
+            self.batcher = EmbeddingMicroBatcher(
+                encode_batch=self._encode_batch,
+                executor=self.executor,
+                window_ms=settings.EMBED_BATCH_WINDOW_MS,
+                max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+                max_concurrent_batches=settings.EMBED_MAX_CONCURRENT_BATCHES
+            ) if settings.EMBED_MICROBATCH_ENABLED else None
+
+            # 4. Template Miner: variable tokens are masked before embedding, known templates skip the transformer
+            self.templates = LogTemplateMiner(
+                similarity_threshold=settings.TEMPLATE_SIMILARITY_THRESHOLD,
+                prefix_tokens=settings.TEMPLATE_PREFIX_TOKENS,
+                max_clusters=settings.TEMPLATE_MAX_TEMPLATES,
+                shortcut_max_severity=settings.TEMPLATE_SHORTCUT_MAX_SEVERITY,
+                learned_path=settings.TEMPLATE_LEARNED_PATH
+            ) if settings.TEMPLATE_MINING_ENABLED else None
             
-            # 4. Dynamic Threshold Map: Higher severity requires higher mathematical identity
+            # 5. Dynamic Threshold Map: Higher severity requires higher mathematical identity
             self.threshold_map = {
                 "Critical": 0.99,
                 "High": 0.97,
@@ -45,63 +136,279 @@ class VectorFilterService:
             logger.error(f"CRITICAL: Failed to initialize Vector Engine: {str(e)}")
             raise
 
+    def _encode_batch(self, payloads: List[str]) -> List[List[float]]:
+        """Synchronous batched encode. Always executed inside the thread pool."""
+        return self.encoder.encode(payloads, batch_size=settings.EMBEDDING_BATCH_SIZE).tolist()
+
     async def _generate_embedding(self, payload: str) -> list[float]:
         """Offloads the CPU-heavy encoding to background thread pool."""
+        with STAGE_LATENCY.time(stage="vector_encode"):
+            if self.batcher is not None:
+                return await self.batcher.embed(payload)
+
+            loop = asyncio.get_running_loop()
+            vector = await loop.run_in_executor(
+                self.executor, 
+                lambda: self.encoder.encode([payload])[0].tolist()
+            )
+            return vector
+
+    async def _generate_embeddings(self, payloads: List[str]) -> List[List[float]]:
+        """Offloads a single batched encode for the whole payload list to the thread pool."""
         loop = asyncio.get_running_loop()
-        vector = await loop.run_in_executor(
-            self.executor, 
-            lambda: self.model.encode(payload).tolist()
-        )
-        return vector
+        with STAGE_LATENCY.time(stage="vector_encode_batch"):
+            vectors = await loop.run_in_executor(self.executor, self._encode_batch, payloads)
+        return vectors
 
-    async def is_known_false_positive(self, payload: str, severity: str) -> bool:
-        """
-        Asynchronously searches for matches using a risk-weighted threshold.
-        """
-        try:
-            # Determine threshold based on alert severity
-            current_threshold = self.threshold_map.get(severity, 0.95)
-            
-            vector = await self._generate_embedding(payload)
-            
-            # Server-Side Metadata Filtering
-            results = await self.index.query(
+    def _normalize(self, payload: str) -> Tuple[Optional[TemplateMatch], str]:
+        """Returns the template match (if mining is enabled) and the text that should be embedded."""
+        if self.templates is None:
+            return None, payload
+        match = self.templates.match(payload)
+        return match, match.masked
+
+    def _template_suppressed(self, match: Optional[TemplateMatch], severity: str) -> bool:
+        if match is not None and self.templates.is_known_false_positive(match, severity):
+            logger.info(f"TEMPLATE MATCH: {match.template_id} is a known false positive. Transformer skipped.")
+            return True
+        return False
+
+    async def _matches_false_positive(self, vector: List[float], severity: str) -> bool:
+        """Queries the index for the nearest false positive and applies the risk-weighted threshold."""
+        # Determine threshold based on alert severity
+        current_threshold = self.threshold_map.get(severity, 0.95)
+
+        # Metadata Filtering (server-side on Pinecone, row mask on the local store)
+        with STAGE_LATENCY.time(stage="vector_query"):
+            matches = await self.store.query(
                 vector=vector,
                 top_k=1,
-                include_metadata=False,
                 filter={
                     "resolution": {"$eq": "false_positive"}
                 }
             )
-            
-            if results.matches:
-                score = results.matches[0].score
-                if score > current_threshold:
-                    logger.info(f"DYNAMIC MATCH: Score {score:.4f} > {current_threshold} for {severity} alert.")
-                    return True
-                else:
-                    logger.info(f"SIMILARITY REJECTED: Score {score:.4f} below {current_threshold} for {severity}.")
-                    
-            return False
+
+        if matches:
+            score = matches[0].score
+            if score > current_threshold:
+                logger.info(f"DYNAMIC MATCH: Score {score:.4f} > {current_threshold} for {severity} alert.")
+                return True
+            else:
+                logger.info(f"SIMILARITY REJECTED: Score {score:.4f} below {current_threshold} for {severity}.")
+
+        return False
+
+    async def is_known_false_positive(self, payload: str, severity: str) -> bool:
+        """
+        Asynchronously searches for matches using a risk-weighted threshold.
+        """
+        is_fp, _ = await self.check_false_positive(payload, severity)
+        return is_fp
+
+    async def check_false_positive(self, payload: str, severity: str) -> Tuple[bool, Optional[List[float]]]:
+        """
+        Same decision as is_known_false_positive, but also hands back the embedding
+        so Stage 3 can reuse it for semantic caching. The vector is None if encoding failed.
+        """
+        match, text = self._normalize(payload)
+        if self._template_suppressed(match, severity):
+            return True, None
+
+        vector = None
+        try:
+            vector = await self._generate_embedding(text)
+            return await self._matches_false_positive(vector, severity), vector
         except Exception as e:
             logger.error(f"Vector search failed: {str(e)}")
-            return False 
+            return False, vector
+
+    async def batch_is_known_false_positive(self, payloads: List[str], severities: List[str]) -> List[bool]:
+        """
+        Batched variant of is_known_false_positive.
+        Results are returned in the same order as the input payloads.
+        """
+        flags, _ = await self.batch_check_false_positive(payloads, severities)
+        return flags
+
+    async def batch_check_false_positive(
+        self,
+        payloads: List[str],
+        severities: List[str]
+    ) -> Tuple[List[bool], Optional[List[List[float]]]]:
+        """
+        One vectorized encode for the whole batch, then concurrent index queries.
+        Returns per-payload decisions in input order plus the batch embeddings (None if encoding failed).
+        Template-suppressed payloads are never encoded and get a None embedding.
+        """
+        if not payloads:
+            return [], []
+
+        flags: List[bool] = [False] * len(payloads)
+        pending: List[int] = []
+        texts: List[str] = []
+        for i, payload in enumerate(payloads):
+            match, text = self._normalize(payload)
+            if self._template_suppressed(match, severities[i]):
+                flags[i] = True
+            else:
+                pending.append(i)
+                texts.append(text)
+
+        vectors: List[Optional[List[float]]] = [None] * len(payloads)
+        if not pending:
+            return flags, vectors
+
+        try:
+            encoded = await self._generate_embeddings(texts)
+        except Exception as e:
+            logger.error(f"Batch embedding failed: {str(e)}")
+            return flags, None
+
+        # Bound in-flight queries so a large batch cannot exhaust the Pinecone connection pool
+        semaphore = asyncio.Semaphore(settings.VECTOR_QUERY_CONCURRENCY)
+
+        async def _bounded_match(vector: List[float], severity: str) -> bool:
+            async with semaphore:
+                try:
+                    return await self._matches_false_positive(vector, severity)
+                except Exception as e:
+                    logger.error(f"Vector search failed: {str(e)}")
+                    return False
+
+        matched = await asyncio.gather(
+            *(_bounded_match(vector, severities[i]) for i, vector in zip(pending, encoded))
+        )
+        for i, vector, is_fp in zip(pending, encoded, matched):
+            vectors[i] = vector
+            flags[i] = is_fp
+        return flags, vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """Exposes encode executor depth, micro-batcher queue depth, batch size and wait time, template mining and store resilience counters."""
+        return {
+            "encode_jobs_pending": self.executor.pending,
+            "microbatching": self.batcher.stats() if self.batcher is not None else None,
+            "templates": self.templates.stats() if self.templates is not None else None,
+            "store": self.store.stats() if hasattr(self.store, "stats") else None
+        }
+
+    async def memorize_safe_behavior(self, alert_id: str, payload: str, severity: str) -> bool:
+        """Stores a known false positive with metadata. Lines already learned under their template at this severity are not re-stored."""
+        match, text = self._normalize(payload)
+        if match is not None and self.templates.has_learned(match, severity):
+            logger.info(f"SKIPPED: {alert_id} matches already-memorized template {match.template_id}.")
+            return True
+
+        metadata = {"resolution": "false_positive"}
+        if match is not None:
+            metadata["template_id"] = match.template_id
 
-    async def memorize_safe_behavior(self, alert_id: str, payload: str) -> bool:
-        """Stores a known false positive with metadata."""
         try:
-            vector = await self._generate_embedding(payload)
-            await self.index.upsert(
+            vector = await self._generate_embedding(text)
+            await self.store.upsert(
                 vectors=[{
                     "id": alert_id,
                     "values": vector,
-                    "metadata": {"resolution": "false_positive"}
+                    "metadata": metadata
                 }]
             )
+            if match is not None:
+                self.templates.learn_false_positive(match, severity)
+                await self.templates.flush_ledger()
             logger.info(f"SUCCESS: Memorized alert {alert_id} as false positive.")
             return True
         except Exception as e:
             logger.error(f"Failed to memorize payload for {alert_id}: {str(e)}")
             raise
 
-vector_service = VectorFilterService()
\ No newline at end of file
+    async def memorize_bulk(self, items: List[Tuple[str, str, str]], on_progress: Callable[[str, int], None]) -> None:
+        """
+        Bulk variant of memorize_safe_behavior for replaying closed false-positive tickets.
+        Encodes in large chunks and drops near-duplicates before they reach the index: lines already
+        learned under their template, vectors within LEARN_COMPACTION_THRESHOLD of one kept earlier in
+        this job, and vectors within it of an existing false positive. Survivors are upserted in sized
+        chunks with bounded concurrency while the next chunk encodes. Counters are reported through on_progress.
+        """
+        threshold = settings.LEARN_COMPACTION_THRESHOLD
+        upsert_slots = asyncio.Semaphore(settings.LEARN_UPSERT_CONCURRENCY)
+        kept = _CompactionIndex(self.encoder.dim, min(len(items), 4 * settings.LEARN_ENCODE_CHUNK_SIZE))
+        seen_texts = set()
+        uploads: List[asyncio.Task] = []
+
+        async def _upload(records: List[Dict[str, Any]], learned: List[Tuple[Optional[TemplateMatch], str]], rows: np.ndarray) -> None:
+            async with upsert_slots:
+                try:
+                    await self.store.upsert(vectors=records)
+                except Exception as e:
+                    logger.error(f"Bulk upsert of {len(records)} vectors failed: {str(e)}")
+                    kept.discard(rows)
+                    on_progress("failed", len(records))
+                    return
+            learned_any = False
+            for match, severity in learned:
+                if match is not None:
+                    self.templates.learn_false_positive(match, severity)
+                    learned_any = True
+            if learned_any:
+                await self.templates.flush_ledger()
+            on_progress("upserted", len(records))
+
+        try:
+            for start in range(0, len(items), settings.LEARN_ENCODE_CHUNK_SIZE):
+                ids: List[str] = []
+                texts: List[str] = []
+                matches: List[Optional[TemplateMatch]] = []
+                severities: List[str] = []
+                for alert_id, payload, severity in items[start:start + settings.LEARN_ENCODE_CHUNK_SIZE]:
+                    match, text = self._normalize(payload)
+                    if (match is not None and self.templates.has_learned(match, severity)) or text in seen_texts:
+                        on_progress("skipped_duplicate", 1)
+                        continue
+                    seen_texts.add(text)
+                    ids.append(alert_id)
+                    texts.append(text)
+                    matches.append(match)
+                    severities.append(severity)
+                if not texts:
+                    continue
+
+                vectors = np.asarray(await self._generate_embeddings(texts), dtype=np.float32)
+                on_progress("encoded", len(texts))
+
+                # Greedy compaction against everything kept so far in this job (including in-flight upserts).
+                # O(kept) per chunk, so it runs off the event loop to keep live triage responsive.
+                candidates = await asyncio.to_thread(kept.compact, vectors, threshold)
+                on_progress("skipped_duplicate", len(vectors) - len(candidates))
+
+                # Then against the false positives already in the index. A failed lookup counts as "not stored":
+                # re-upserting a near-duplicate is harmless, dropping a new false positive is not.
+                existing = await self.store.query_many(
+                    [vectors[i].tolist() for i in candidates],
+                    top_k=1,
+                    filter={"resolution": {"$eq": "false_positive"}},
+                    concurrency=settings.VECTOR_QUERY_CONCURRENCY
+                )
+                survivors = [i for i, found in zip(candidates, existing) if not found or found[0].score <= threshold]
+                on_progress("skipped_existing", len(candidates) - len(survivors))
+                if not survivors:
+                    continue
+                kept_rows = kept.add(vectors[survivors])
+
+                for offset in range(0, len(survivors), settings.LEARN_UPSERT_BATCH_SIZE):
+                    rows = survivors[offset:offset + settings.LEARN_UPSERT_BATCH_SIZE]
+                    batch_rows = kept_rows[offset:offset + settings.LEARN_UPSERT_BATCH_SIZE]
+                    records = []
+                    for i in rows:
+                        metadata = {"resolution": "false_positive"}
+                        if matches[i] is not None:
+                            metadata["template_id"] = matches[i].template_id
+                        records.append({"id": ids[i], "values": vectors[i].tolist(), "metadata": metadata})
+                    uploads.append(asyncio.create_task(_upload(records, [(matches[i], severities[i]) for i in rows], batch_rows)))
+
+            await asyncio.gather(*uploads)
+        finally:
+            # A failed encode or lookup (or a cancelled job) must not leave upserts running unowned
+            pending = [task for task in uploads if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
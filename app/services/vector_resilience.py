@@ -0,0 +1,377 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_store import VectorMatch, VectorStore
+
+logger = logging.getLogger(__name__)
+
+FALSE_POSITIVE_FILTER = {"resolution": {"$eq": "false_positive"}}
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open -> half_open after the cooldown,
+    letting a single probe through; the probe's outcome closes or re-opens it.
+    Only touched from the event loop, so it needs no lock.
+    """
+    def __init__(self, failure_threshold: int = 5, cooldown_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_s:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("Vector store circuit closed: primary index is healthy again.")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_abandoned(self) -> None:
+        """The caller went away before the call finished: says nothing about health, but frees the probe slot."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opens += 1
+            self._probe_in_flight = False
+            logger.warning(
+                f"Vector store circuit OPEN after {self.consecutive_failures} consecutive failures. "
+                f"Serving Stage 2 from the local snapshot for {self.cooldown_s:.0f}s."
+            )
+
+class FalsePositiveSnapshot:
+    """
+    Bounded, LRU-ordered copy of recently stored or recently matched false-positive vectors.
+    Exact cosine search over a preallocated matrix; evicted rows are reused. Optionally persisted
+    as .npz so a restart during a brownout does not start from an empty fallback.
+    """
+    # Below this many rows a search is cheaper than a thread hop
+    INLINE_SEARCH_ROWS = 10000
+
+    def __init__(self, dim: int, capacity: int = 50000, path: Optional[str] = None):
+        self.dim = dim
+        self.capacity = capacity
+        self.path = path
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._ids: List[Optional[str]] = [None] * capacity
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._used = 0
+        self._lock = threading.Lock()
+        # Bumped on every write; save() skips the disk when nothing changed since the last checkpoint
+        self._version = 0
+        self._saved_version = 0
+        if path and os.path.exists(path):
+            self._load(path)
+            self._saved_version = self._version
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._rows
+
+    @property
+    def full(self) -> bool:
+        return len(self._rows) >= self.capacity
+
+    def touch(self, vector_id: str) -> None:
+        """Marks a stored entry as recently matched without refetching its vector."""
+        with self._lock:
+            if vector_id in self._rows:
+                self._rows.move_to_end(vector_id)
+
+    def add(self, vector_id: str, values: List[float]) -> None:
+        row_values = np.asarray(values, dtype=np.float32)
+        row_values = row_values / max(float(np.linalg.norm(row_values)), 1e-12)
+        with self._lock:
+            row = self._rows.get(vector_id)
+            if row is not None:
+                self._rows.move_to_end(vector_id)
+            else:
+                if self._free:
+                    row = self._free.pop()
+                elif self._used < self.capacity:
+                    row = self._used
+                    self._used += 1
+                else:
+                    _, row = self._rows.popitem(last=False)
+                self._rows[vector_id] = row
+                self._ids[row] = vector_id
+                self._valid[row] = True
+            self._matrix[row] = row_values
+            self._version += 1
+
+    def search(self, vector: List[float], top_k: int = 1) -> List[VectorMatch]:
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            if not self._rows:
+                return []
+            used = self._used
+            scores = np.where(self._valid[:used], self._matrix[:used] @ query, -np.inf)
+            top = np.argpartition(-scores, min(top_k, used) - 1)[:top_k] if used > top_k else np.arange(used)
+            top = top[np.argsort(-scores[top])]
+            return [VectorMatch(id=self._ids[i], score=float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def save(self) -> None:
+        if not self.path or self._version == self._saved_version:
+            return
+        with self._lock:
+            version = self._version
+            ids = list(self._rows.keys())
+            rows = list(self._rows.values())
+            matrix = self._matrix[rows].copy()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        staging = self.path + ".tmp.npz"
+        np.savez(staging, matrix=matrix, ids=np.asarray(ids, dtype=str))
+        os.replace(staging, self.path)
+        self._saved_version = version
+        logger.info(f"False-positive snapshot saved: {len(ids)} vectors -> {self.path}")
+
+    def _load(self, path: str) -> None:
+        try:
+            with np.load(path) as data:
+                matrix, ids = data["matrix"], data["ids"]
+            if matrix.ndim != 2 or matrix.shape[1] != self.dim:
+                logger.warning(f"Ignoring false-positive snapshot {path}: dimension {matrix.shape} does not match {self.dim}.")
+                return
+            # Saved oldest-first, so re-adding restores the LRU order; only the newest `capacity` survive
+            for vector_id, values in zip(ids[-self.capacity:], matrix[-self.capacity:]):
+                self.add(str(vector_id), values)
+            logger.info(f"False-positive snapshot loaded: {len(self)} vectors from {path}")
+        except Exception as e:
+            logger.warning(f"Could not load false-positive snapshot {path}: {str(e)}")
+
+class ResilientVectorStore(VectorStore):
+    """
+    Stage 2 Resilience Layer around the primary index.
+    Every query runs under a strict deadline. If it has not answered by the recent p95, one hedged
+    duplicate is sent and the first answer wins. Timeouts and errors feed a circuit breaker. While it
+    is open, or when a single query fails, lookups are served from a local snapshot of recent
+    false-positive vectors, so a brownout neither stalls ingest nor pushes every alert to Stage 3.
+
+    The snapshot is fed by false-positive upserts. Lookups only pay for returning vector values while
+    the snapshot still has room, or on a sampled fraction once it is full; other hits just refresh
+    the LRU position of entries already held. It is checkpointed to disk on an interval.
+    """
+    HEDGE_MIN_SAMPLES = 20
+    P95_REFRESH_EVERY = 32
+
+    def __init__(
+        self,
+        primary: VectorStore,
+        snapshot: FalsePositiveSnapshot,
+        deadline_ms: float = 250.0,
+        hedge_enabled: bool = True,
+        hedge_min_delay_ms: float = 20.0,
+        breaker: Optional[CircuitBreaker] = None,
+        fetch_sample_rate: float = 0.05
+    ):
+        self.primary = primary
+        self.snapshot = snapshot
+        self.deadline_s = deadline_ms / 1000.0
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay_s = hedge_min_delay_ms / 1000.0
+        self.breaker = breaker or CircuitBreaker()
+        self.fetch_sample_rate = fetch_sample_rate
+        self._latencies: deque = deque(maxlen=1024)
+        self._since_refresh = 0
+        self._p95_s: Optional[float] = None
+
+        # Telemetry
+        self.queries = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallback_lookups = 0
+        self.fallback_hits = 0
+        self.value_fetches = 0
+
+    def _hedge_delay_s(self) -> Optional[float]:
+        if not self.hedge_enabled or self._p95_s is None:
+            return None
+        delay = max(self.hedge_min_delay_s, self._p95_s)
+        return delay if delay < self.deadline_s else None
+
+    def _record_latency(self, elapsed_s: float) -> None:
+        self._latencies.append(elapsed_s)
+        self._since_refresh += 1
+        if len(self._latencies) >= self.HEDGE_MIN_SAMPLES and self._since_refresh >= self.P95_REFRESH_EVERY:
+            self._since_refresh = 0
+            self._p95_s = float(np.percentile(self._latencies, 95))
+
+    async def _hedged_query(self, vector: List[float], top_k: int, filter: Optional[Dict[str, Any]], include_values: bool) -> List[VectorMatch]:
+        first = asyncio.create_task(self.primary.query(vector, top_k=top_k, filter=filter, include_values=include_values))
+        delay = self._hedge_delay_s()
+        tasks = {first}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedges += 1
+                    tasks.add(asyncio.create_task(
+                        self.primary.query(vector, top_k=top_k, filter=filter, include_values=include_values)
+                    ))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (first, *tasks):
+                if not task.done():
+                    task.cancel()
+
+    async def _fallback(self, vector: List[float], top_k: int, filter: Optional[Dict[str, Any]]) -> List[VectorMatch]:
+        self.fallback_lookups += 1
+        # The snapshot only holds false positives, so it can only answer that question
+        if filter is not None and filter != FALSE_POSITIVE_FILTER:
+            return []
+        if len(self.snapshot) < self.snapshot.INLINE_SEARCH_ROWS:
+            matches = self.snapshot.search(vector, top_k)
+        else:
+            matches = await asyncio.to_thread(self.snapshot.search, vector, top_k)
+        if matches:
+            self.fallback_hits += 1
+        return matches
+
+    async def query(
+        self,
+        vector: List[float],
+        top_k: int = 1,
+        filter: Optional[Dict[str, Any]] = None,
+        include_values: bool = False
+    ) -> List[VectorMatch]:
+        if not self.breaker.allow():
+            return await self._fallback(vector, top_k, filter)
+
+        self.queries += 1
+        # Values add payload to every response, so false-positive lookups only fetch them to fill the snapshot
+        is_fp_lookup = filter == FALSE_POSITIVE_FILTER
+        absorb = is_fp_lookup and not include_values and (
+            not self.snapshot.full or random.random() < self.fetch_sample_rate
+        )
+        if absorb:
+            self.value_fetches += 1
+        started = time.perf_counter()
+        try:
+            matches = await asyncio.wait_for(
+                self._hedged_query(vector, top_k, filter, include_values or absorb),
+                timeout=self.deadline_s
+            )
+        except asyncio.CancelledError:
+            # Client disconnect or stream abort: without this a cancelled half-open probe wedges the breaker
+            self.breaker.record_abandoned()
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.breaker.record_failure()
+            return await self._fallback(vector, top_k, filter)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Vector store query failed, serving from snapshot: {str(e)}")
+            self.breaker.record_failure()
+            return await self._fallback(vector, top_k, filter)
+
+        self.breaker.record_success()
+        self._record_latency(time.perf_counter() - started)
+        if is_fp_lookup:
+            for match in matches:
+                if match.values is not None:
+                    self.snapshot.add(match.id, match.values)
+                else:
+                    self.snapshot.touch(match.id)
+        return matches
+
+    async def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        # Mirrored first: a new false positive is suppressible locally even if the primary write fails
+        for record in vectors:
+            if (record.get("metadata") or {}).get("resolution") == "false_positive":
+                self.snapshot.add(record["id"], record["values"])
+        await self.primary.upsert(vectors)
+
+    async def checkpoint_periodically(self, interval_s: float) -> None:
+        """Background checkpoint, so a crash loses at most one interval of learned vectors."""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await asyncio.to_thread(self.snapshot.save)
+            except Exception as e:
+                logger.error(f"False-positive snapshot checkpoint failed: {str(e)}")
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.snapshot.save)
+        await self.primary.close()
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self._hedge_delay_s()
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_opens": self.breaker.opens,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "queries": self.queries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(delay * 1000.0, 2) if delay is not None else None,
+            "p95_ms": round(self._p95_s * 1000.0, 2) if self._p95_s is not None else None,
+            "fallback_lookups": self.fallback_lookups,
+            "fallback_hits": self.fallback_hits,
+            "value_fetches": self.value_fetches,
+            "snapshot_vectors": len(self.snapshot)
+        }
+
+def with_resilience(primary: VectorStore, dim: int) -> VectorStore:
+    """Wraps a remote index in the deadline / hedging / breaker / snapshot layer when enabled."""
+    if not settings.VECTOR_RESILIENCE_ENABLED:
+        return primary
+    return ResilientVectorStore(
+        primary,
+        FalsePositiveSnapshot(dim, capacity=settings.VECTOR_SNAPSHOT_MAX_VECTORS, path=settings.VECTOR_SNAPSHOT_PATH),
+        deadline_ms=settings.VECTOR_QUERY_DEADLINE_MS,
+        hedge_enabled=settings.VECTOR_HEDGE_ENABLED,
+        hedge_min_delay_ms=settings.VECTOR_HEDGE_MIN_DELAY_MS,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.VECTOR_BREAKER_FAILURE_THRESHOLD,
+            cooldown_s=settings.VECTOR_BREAKER_COOLDOWN_SECONDS
+        ),
+        fetch_sample_rate=settings.VECTOR_SNAPSHOT_FETCH_SAMPLE_RATE
+    )
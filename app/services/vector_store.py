@@ -0,0 +1,366 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class VectorMatch:
+    id: str
+    score: float
+    # Only populated when the caller asks for include_values and the backend supports it
+    values: Optional[List[float]] = None
+
+class VectorStore(ABC):
+    """
+    Stage 2 storage contract.
+    Backends return cosine-similarity matches so the risk-weighted threshold_map stays valid.
+    """
+    @abstractmethod
+    async def query(self, vector: List[float], top_k: int = 1, filter: Optional[Dict[str, Any]] = None, include_values: bool = False) -> List[VectorMatch]:
+        ...
+
+    @abstractmethod
+    async def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        ...
+
+    async def query_many(
+        self,
+        vectors: List[List[float]],
+        top_k: int = 1,
+        filter: Optional[Dict[str, Any]] = None,
+        concurrency: int = 32
+    ) -> List[List[VectorMatch]]:
+        """
+        One match list per vector. A lookup that fails yields no matches, so one bad round trip
+        degrades a single vector instead of the whole batch. Backends that can score a batch in one
+        pass override this; the default fans out bounded single queries.
+        """
+        slots = asyncio.Semaphore(concurrency)
+        failures: List[Exception] = []
+
+        async def _one(vector: List[float]) -> List[VectorMatch]:
+            async with slots:
+                try:
+                    return await self.query(vector, top_k=top_k, filter=filter)
+                except Exception as e:
+                    failures.append(e)
+                    return []
+
+        results = await asyncio.gather(*(_one(vector) for vector in vectors))
+        if failures:
+            logger.warning(f"{len(failures)}/{len(vectors)} batched vector lookups failed and were treated as no match: {str(failures[0])}")
+        return list(results)
+
+    async def close(self) -> None:
+        """Releases connections or flushes local state on shutdown. No-op by default."""
+
+class PineconeVectorStore(VectorStore):
+    """Managed backend: Pinecone serverless index over the async data plane."""
+    def __init__(self, api_key: str, index_name: str):
+        from pinecone import Pinecone, PineconeAsyncio
+
+        if not api_key or not index_name:
+            raise ValueError("PINECONE_API_KEY and PINECONE_INDEX_NAME are required for the pinecone backend.")
+
+        # 1. Resolve Control Plane metadata
+        pc_control = Pinecone(api_key=api_key)
+        index_metadata = pc_control.describe_index(index_name)
+        target_host = index_metadata.host
+
+        # 2. Instantiate Data Plane (Async)
+        self.pc = PineconeAsyncio(api_key=api_key)
+        self.index = self.pc.IndexAsyncio(host=target_host)
+
+    async def query(self, vector: List[float], top_k: int = 1, filter: Optional[Dict[str, Any]] = None, include_values: bool = False) -> List[VectorMatch]:
+        # Server-Side Metadata Filtering
+        results = await self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=False,
+            include_values=include_values,
+            filter=filter
+        )
+        return [
+            VectorMatch(id=match.id, score=match.score, values=list(match.values) if include_values and match.values else None)
+            for match in results.matches
+        ]
+
+    async def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        await self.index.upsert(vectors=vectors)
+
+class LocalVectorStore(VectorStore):
+    """
+    Air-gapped backend: memory-mapped float16/float32 matrix with exact top-k cosine search.
+
+    On-disk layout (append-only, crash tolerant):
+      vectors.bin     raw row-major unit vectors
+      records.jsonl   one {"row", "id", "metadata"} line per write; the last line for a row wins
+    """
+    VECTOR_FILE = "vectors.bin"
+    RECORD_FILE = "records.jsonl"
+
+    # Rows scored per matmul. Bounds the float32 upcast buffer when storing float16.
+    SCORE_CHUNK_ROWS = 65536
+    # Queries scored together by query_many: bounds the score block at SCORE_CHUNK_ROWS x this
+    QUERY_GROUP_SIZE = 64
+    # Below this corpus size a search is cheaper than a thread hop, so it runs inline.
+    INLINE_SEARCH_ROWS = 10000
+
+    def __init__(self, path: str, dim: int, dtype: str = "float32"):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported local vector dtype: {dtype}")
+
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._row_bytes = self.dim * self.dtype.itemsize
+        self._vector_path = os.path.join(path, self.VECTOR_FILE)
+        self._record_path = os.path.join(path, self.RECORD_FILE)
+
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+        self._mask_cache: Dict[str, np.ndarray] = {}
+        self._matrix = np.empty((0, dim), dtype=self.dtype)
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        logger.info(f"Local vector store online: {len(self._ids)} vectors ({dtype}) at {path}")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _load(self) -> None:
+        stored_rows = os.path.getsize(self._vector_path) // self._row_bytes if os.path.exists(self._vector_path) else 0
+
+        records: Dict[int, Dict[str, Any]] = {}
+        if os.path.exists(self._record_path):
+            with open(self._record_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn final line from a crash mid-write
+                        continue
+                    if record["row"] < stored_rows:
+                        records[record["row"]] = record
+
+        # Rows are appended densely, so the committed prefix ends at the first missing record
+        committed = 0
+        while committed in records:
+            committed += 1
+
+        for row in range(committed):
+            record = records[row]
+            self._ids.append(record["id"])
+            self._metadata.append(record.get("metadata") or {})
+            self._row_of[record["id"]] = row
+
+        if committed < stored_rows:
+            logger.warning(f"Local vector store discarding {stored_rows - committed} uncommitted rows.")
+            with open(self._vector_path, "r+b") as fh:
+                fh.truncate(committed * self._row_bytes)
+
+        self._remap()
+
+    def _remap(self) -> None:
+        rows = len(self._ids)
+        if rows:
+            self._matrix = np.memmap(self._vector_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        else:
+            self._matrix = np.empty((0, self.dim), dtype=self.dtype)
+        self._mask_cache.clear()
+
+    def _normalize(self, values: List[float]) -> np.ndarray:
+        vector = np.asarray(values, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dimensional vector, got shape {vector.shape}.")
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        return vector
+
+    @staticmethod
+    def _matches_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        """Evaluates the Pinecone metadata filter subset used by the triage engine ($eq, $ne, $in)."""
+        for key, condition in filter.items():
+            value = metadata.get(key)
+            if isinstance(condition, dict):
+                for op, operand in condition.items():
+                    if op == "$eq" and value != operand:
+                        return False
+                    elif op == "$ne" and value == operand:
+                        return False
+                    elif op == "$in" and value not in operand:
+                        return False
+                    elif op not in ("$eq", "$ne", "$in"):
+                        raise ValueError(f"Unsupported metadata filter operator: {op}")
+            elif value != condition:
+                return False
+        return True
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask per distinct filter, cached until the next write."""
+        cache_key = json.dumps(filter, sort_keys=True)
+        mask = self._mask_cache.get(cache_key)
+        if mask is None:
+            mask = np.fromiter(
+                (self._matches_filter(metadata, filter) for metadata in self._metadata),
+                dtype=bool,
+                count=len(self._metadata)
+            )
+            self._mask_cache[cache_key] = mask
+        return mask
+
+    def _search(self, vector: List[float], top_k: int, filter: Optional[Dict[str, Any]]) -> List[VectorMatch]:
+        query = self._normalize(vector)
+
+        # Snapshot under the lock; writers replace these objects rather than mutating them
+        with self._lock:
+            matrix = self._matrix
+            ids = self._ids
+            mask = self._filter_mask(filter) if filter else None
+
+        rows = matrix.shape[0]
+        if rows == 0:
+            return []
+
+        scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, self.SCORE_CHUNK_ROWS):
+            end = min(start + self.SCORE_CHUNK_ROWS, rows)
+            scores[start:end] = matrix[start:end].astype(np.float32, copy=False) @ query
+
+        if mask is not None:
+            scores[~mask] = -np.inf
+
+        k = min(top_k, rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [VectorMatch(id=ids[i], score=float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    async def query(self, vector: List[float], top_k: int = 1, filter: Optional[Dict[str, Any]] = None, include_values: bool = False) -> List[VectorMatch]:
+        # Already local: include_values is accepted for contract parity and ignored
+        if len(self._ids) < self.INLINE_SEARCH_ROWS:
+            return self._search(vector, top_k, filter)
+        return await asyncio.to_thread(self._search, vector, top_k, filter)
+
+    def _search_many(self, vectors: List[List[float]], top_k: int, filter: Optional[Dict[str, Any]]) -> List[List[VectorMatch]]:
+        """One pass over the matrix for the whole batch, keeping a running top-k per query."""
+        queries = np.vstack([self._normalize(vector) for vector in vectors]) if vectors else np.empty((0, self.dim), dtype=np.float32)
+
+        with self._lock:
+            matrix = self._matrix
+            ids = self._ids
+            mask = self._filter_mask(filter) if filter else None
+
+        rows = matrix.shape[0]
+        if rows == 0 or len(queries) == 0:
+            return [[] for _ in vectors]
+
+        k = min(top_k, rows)
+        results: List[List[VectorMatch]] = []
+        for q_start in range(0, len(queries), self.QUERY_GROUP_SIZE):
+            group = queries[q_start:q_start + self.QUERY_GROUP_SIZE]
+            best_scores = np.full((len(group), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(group), 0), dtype=np.int64)
+            for start in range(0, rows, self.SCORE_CHUNK_ROWS):
+                end = min(start + self.SCORE_CHUNK_ROWS, rows)
+                block = group @ matrix[start:end].astype(np.float32, copy=False).T
+                if mask is not None:
+                    block[:, ~mask[start:end]] = -np.inf
+                scores = np.hstack([best_scores, block])
+                row_ids = np.hstack([best_rows, np.broadcast_to(np.arange(start, end), block.shape)])
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(scores, top, axis=1)
+                best_rows = np.take_along_axis(row_ids, top, axis=1)
+            order = np.argsort(-best_scores, axis=1)
+            for scores, row_ids in zip(np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)):
+                results.append([VectorMatch(id=ids[i], score=float(score)) for i, score in zip(row_ids, scores) if np.isfinite(score)])
+        return results
+
+    async def query_many(
+        self,
+        vectors: List[List[float]],
+        top_k: int = 1,
+        filter: Optional[Dict[str, Any]] = None,
+        concurrency: int = 32
+    ) -> List[List[VectorMatch]]:
+        # Already local: one matrix pass replaces the fan-out, so concurrency does not apply
+        return await asyncio.to_thread(self._search_many, vectors, top_k, filter)
+
+    def _write(self, vectors: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            pending: List[Dict[str, Any]] = []
+            next_row = len(self._ids)
+
+            with open(self._vector_path, "ab") as fh:
+                pass  # Ensure the file exists before opening it for in-place writes
+
+            with open(self._vector_path, "r+b") as fh:
+                for item in vectors:
+                    row_bytes = self._normalize(item["values"]).astype(self.dtype).tobytes()
+                    row = self._row_of.get(item["id"])
+                    if row is None:
+                        row = next_row
+                        next_row += 1
+                    fh.seek(row * self._row_bytes)
+                    fh.write(row_bytes)
+                    pending.append({"row": row, "id": item["id"], "metadata": item.get("metadata") or {}})
+                    self._row_of[item["id"]] = row
+                fh.flush()
+                os.fsync(fh.fileno())
+
+            # Records are committed only after their vectors are durable
+            with open(self._record_path, "a", encoding="utf-8") as fh:
+                for record in pending:
+                    fh.write(json.dumps(record) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+
+            ids = list(self._ids)
+            metadata = list(self._metadata)
+            for record in pending:
+                if record["row"] < len(ids):
+                    ids[record["row"]] = record["id"]
+                    metadata[record["row"]] = record["metadata"]
+                else:
+                    ids.append(record["id"])
+                    metadata.append(record["metadata"])
+            self._ids = ids
+            self._metadata = metadata
+            self._remap()
+
+    async def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self._write, vectors)
+
+def build_vector_store(backend: str, dim: int) -> VectorStore:
+    """Resolves the configured Stage 2 backend."""
+    if backend == "local":
+        return LocalVectorStore(
+            path=settings.LOCAL_VECTOR_STORE_PATH,
+            dim=dim,
+            dtype=settings.LOCAL_VECTOR_STORE_DTYPE
+        )
+    if backend == "pinecone":
+        from app.services.vector_resilience import with_resilience
+
+        # Remote index: deadline, hedging, circuit breaker and local false-positive fallback
+        return with_resilience(
+            PineconeVectorStore(
+                api_key=settings.PINECONE_API_KEY,
+                index_name=settings.PINECONE_INDEX_NAME
+            ),
+            dim=dim
+        )
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
@@ -0,0 +1,139 @@
+"""
+Per-request decode and encode cost of the ingest codecs.
+
+Decode: the /alerts/ingest path (json.loads + SOCAlert validation, as FastAPI does for a body model),
+pydantic-core's direct JSON validation (the fast path's default), and the opt-in msgspec decoder when installed.
+Encode: FastAPI's default JSONResponse rendering (jsonable_encoder + json.dumps) against encode_verdict.
+Before timing, every decoder must accept and reject the same bodies as SOCAlert, including edge cases
+(epoch and date-only timestamps, nulls, wrong types, extra fields, malformed JSON).
+
+    python -m benchmarks.bench_codec --alerts 2000 --repeat 5
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+def _best_ns_per_op(fn: Callable[[Any], Any], items: List[Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for item in items:
+            fn(item)
+        best = min(best, (time.perf_counter_ns() - started) / len(items))
+    return best
+
+def _report(title: str, results: Dict[str, float]) -> None:
+    baseline = next(iter(results.values()))
+    print(f"\n{title}")
+    print(f"  {'path':<44} {'us/op':>9} {'speedup':>8}")
+    for name, ns in results.items():
+        print(f"  {name:<44} {ns / 1000.0:>9.2f} {baseline / ns:>7.2f}x")
+
+_DROP = object()
+
+def edge_case_bodies(alert: Dict[str, Any]) -> List[bytes]:
+    """Variants of one valid alert that a struct decoder and Pydantic's lax mode can disagree on."""
+    def variant(**changes: Any) -> bytes:
+        body = dict(alert, **changes)
+        return json.dumps({k: v for k, v in body.items() if v is not _DROP}).encode("utf-8")
+
+    return [
+        variant(timestamp=_DROP), variant(timestamp=1760000000), variant(timestamp=1760000000.5),
+        variant(timestamp="1760000000"), variant(timestamp="2026-10-17"), variant(timestamp="2026-10-17T08:00:00"),
+        variant(timestamp="2026-10-17 08:00:00+02:00"), variant(timestamp="2026-10-17T08:00:00.123456Z"),
+        variant(timestamp=None), variant(timestamp="yesterday"), variant(timestamp=True),
+        variant(hmac_signature=None), variant(hmac_signature=_DROP), variant(hmac_signature=7),
+        variant(severity=3), variant(severity=None), variant(alert_id=_DROP), variant(raw_payload=""),
+        variant(threat_indicators=[]), variant(threat_indicators=["a", 1]), variant(threat_indicators="a"),
+        variant(asset={}), variant(asset=None), variant(asset={"hostname": None, "ip_address": 10}),
+        variant(identity={"username": "svc", "domain": "corp"}), variant(extra_field={"nested": [1, 2]}),
+        b"", b"null", b"[]", b"{", json.dumps(alert).encode("utf-8")[:-1],
+    ]
+
+def _decode_or_none(decode: Callable[[bytes], Any], body: bytes) -> Optional[Dict[str, Any]]:
+    from app.models.codec import AlertDecodeError
+    try:
+        return decode(body).model_dump(exclude={"timestamp"} if b'"timestamp"' not in body else None)
+    except AlertDecodeError:
+        return None
+
+def _errors(decode: Callable[[bytes], Any], body: bytes) -> List[Dict[str, Any]]:
+    from app.models.codec import AlertDecodeError
+    try:
+        decode(body)
+    except AlertDecodeError as e:
+        return e.errors
+    return []
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+    from fastapi.encoders import jsonable_encoder
+
+    from app.core.config import settings
+    from app.models import codec
+    from app.models.codec import AlertDecodeError, active_codec, encode_verdict
+    from app.models.schemas import SOCAlert
+    from benchmarks.corpus import generate_corpus
+
+    corpus = generate_corpus(args.alerts, settings.HMAC_SECRET_KEY, seed=args.seed)
+    bodies = [json.dumps(alert).encode("utf-8") for alert in corpus]
+
+    decoders: Dict[str, Callable[[bytes], SOCAlert]] = {"pydantic-core": codec._decode_pydantic}
+    if codec.msgspec is not None:
+        decoders["msgspec"] = codec._decode_msgspec
+    else:
+        print("msgspec not installed: only the pydantic-core decoder is checked and timed")
+
+    def reference(body: bytes) -> SOCAlert:
+        try:
+            return SOCAlert.model_validate(json.loads(body))
+        except (ValueError, TypeError) as e:
+            raise AlertDecodeError([{"loc": ["body"], "msg": str(e), "type": "value_error"}])
+
+    # Parity first: a faster decoder that disagrees is not a faster decoder.
+    # timestamp defaults to "now" when the SIEM omits it, so it is only compared when supplied.
+    parity = bodies[:200] + [edge for alert in corpus[:20] for edge in edge_case_bodies(alert)]
+    for name, decode in decoders.items():
+        for body in parity:
+            assert _decode_or_none(decode, body) == _decode_or_none(reference, body), f"{name} decode diverged from SOCAlert on {body[:120]!r}"
+        for body in parity:
+            if _decode_or_none(reference, body) is None:
+                try:
+                    decode(body)
+                except AlertDecodeError as e:
+                    assert e.errors == _errors(codec._decode_pydantic, body), f"{name} 422 body diverged on {body[:120]!r}"
+    print(f"parity: {len(parity)} bodies (incl. edge cases), decoders {'/'.join(decoders)} == SOCAlert")
+
+    verdicts = [
+        {"alert_id": alert["alert_id"], "action": "SUPPRESS",
+         "reason": "Matches >95% confidence with historical false positive in Vector DB", "latency_ms": 3.217}
+        for alert in corpus
+    ]
+    for verdict in verdicts[:200]:
+        assert json.loads(encode_verdict(verdict)) == verdict, "fast encode diverged"
+
+    print(f"alerts={len(bodies)}  mean body={sum(map(len, bodies)) / len(bodies):.0f} B  fast codec={active_codec()}")
+
+    _report("decode (request body -> SOCAlert)", {
+        "pydantic: json.loads + model_validate (route)": _best_ns_per_op(lambda b: SOCAlert.model_validate(json.loads(b)), bodies, args.repeat),
+        **{f"fast path: {name}": _best_ns_per_op(decode, bodies, args.repeat) for name, decode in decoders.items()},
+    })
+
+    _report("encode (verdict -> response bytes)", {
+        "fastapi: jsonable_encoder + json.dumps": _best_ns_per_op(
+            lambda v: json.dumps(jsonable_encoder(v), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8"),
+            verdicts, args.repeat
+        ),
+        f"fast path: encode_verdict ({active_codec().split('/')[1]})": _best_ns_per_op(encode_verdict, verdicts, args.repeat),
+    })
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+End-to-end load test of POST /alerts/ingest with Pinecone and OpenRouter replaced by local stand-ins.
+
+Each concurrency level replays the same synthetic corpus against cold caches and reports
+throughput plus p50/p95/p99 for every pipeline stage (from the stage timers feeding /metrics)
+and for the full request. The transformer is real, so Stage 2 encode numbers are representative.
+
+    python -m benchmarks.bench_pipeline --alerts 2000 --concurrency 1 8 32 128 \\
+        --pinecone-latency-ms 15 --llm-latency-ms 800
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+import numpy as np
+
+def _configure_environment(args: argparse.Namespace, workdir: str) -> None:
+    """Settings are read at import time, so the stand-ins must be wired in before the app is imported."""
+    os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}/v1"
+    # The fake Pinecone index is swapped in after boot; the local store only keeps boot offline
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+    os.environ["LOCAL_VECTOR_STORE_PATH"] = os.path.join(workdir, "vector_store")
+    os.environ["INTENT_FINDINGS_PATH"] = os.path.join(workdir, "intent_findings.jsonl")
+
+def _percentiles_ms(samples: List[float]) -> str:
+    if not samples:
+        return f"{'-':>9} {'-':>9} {'-':>9}"
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return f"{p50:>9.2f} {p95:>9.2f} {p99:>9.2f}"
+
+async def _run_level(client: Any, corpus: List[Dict[str, Any]], concurrency: int, stage_samples: Dict[str, List[float]]) -> None:
+    stage_samples.clear()
+    request_samples: List[float] = []
+    statuses: Counter = Counter()
+    actions: Counter = Counter()
+    cursor = iter(corpus)
+
+    async def _worker() -> None:
+        for alert in cursor:
+            started = time.perf_counter()
+            response = await client.post("/api/v1/alerts/ingest", json=alert)
+            request_samples.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                actions[response.json()["action"]] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(f"\nconcurrency={concurrency}  alerts={len(corpus)}  elapsed={elapsed:.2f}s  throughput={len(corpus) / elapsed:.1f} alerts/s")
+    print(f"  status={dict(statuses)}  actions={dict(actions)}")
+    print(f"  {'stage':<22} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in sorted(stage_samples):
+        print(f"  {stage:<22} {len(stage_samples[stage]):>7} {_percentiles_ms(stage_samples[stage])}")
+    print(f"  {'request':<22} {len(request_samples):>7} {_percentiles_ms(request_samples)}")
+
+async def _benchmark(args: argparse.Namespace) -> None:
+    import httpx
+
+    from app.main import app
+    from app.api.dependencies import get_intent_pool, get_llm_service, get_verdict_cache, get_vector_service
+    from app.core.config import settings
+    from app.core.metrics import STAGE_LATENCY
+    from app.services.llm_cache import LLMDecisionCache
+    from benchmarks.corpus import benign_seeds, generate_corpus
+    from app.services.vector_resilience import with_resilience
+    from benchmarks.fakes import FakePineconeStore
+
+    vector_service = get_vector_service()
+    # Benchmark vectors must never land in the production fallback snapshot
+    settings.VECTOR_SNAPSHOT_PATH = None
+    # Wrapped exactly as build_vector_store wraps the real pinecone backend
+    vector_service.store = with_resilience(
+        FakePineconeStore(
+            dim=vector_service.encoder.dim,
+            latency_ms=args.pinecone_latency_ms,
+            jitter_ms=args.pinecone_jitter_ms,
+            seed=args.seed
+        ),
+        dim=vector_service.encoder.dim
+    )
+
+    # Capture raw samples alongside the histogram so percentiles are exact rather than bucketed
+    stage_samples: Dict[str, List[float]] = defaultdict(list)
+    observe = STAGE_LATENCY.observe
+
+    def _recording_observe(value: float, **labels: str) -> None:
+        stage_samples[labels.get("stage", "")].append(value)
+        observe(value, **labels)
+
+    STAGE_LATENCY.observe = _recording_observe
+
+    corpus = generate_corpus(
+        args.alerts, settings.HMAC_SECRET_KEY,
+        duplicate_ratio=args.duplicate_ratio,
+        attack_ratio=args.attack_ratio,
+        novel_ratio=args.novel_ratio,
+        forged_ratio=args.forged_ratio,
+        seed=args.seed
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for seed_alert in benign_seeds(settings.HMAC_SECRET_KEY, args.seed):
+            response = await client.post("/api/v1/alerts/learn", json=seed_alert)
+            response.raise_for_status()
+
+        for concurrency in args.concurrency:
+            # Every level starts cold so duplicate hits are comparable across levels
+            get_verdict_cache().invalidate()
+            if get_llm_service().cache is not None:
+                get_llm_service().cache = LLMDecisionCache(
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                    similarity_threshold=settings.LLM_CACHE_SIMILARITY_THRESHOLD
+                )
+            await _run_level(client, corpus, concurrency, stage_samples)
+
+    await get_intent_pool().stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3)
+    parser.add_argument("--attack-ratio", type=float, default=0.1)
+    parser.add_argument("--novel-ratio", type=float, default=0.2)
+    parser.add_argument("--forged-ratio", type=float, default=0.0)
+    parser.add_argument("--pinecone-latency-ms", type=float, default=15.0)
+    parser.add_argument("--pinecone-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--llm-escalate-ratio", type=float, default=0.5)
+    parser.add_argument("--mock-port", type=int, default=18080)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="axon-bench-") as workdir:
+        _configure_environment(args, workdir)
+
+        from benchmarks.fakes import MockOpenRouterServer
+
+        server = MockOpenRouterServer(
+            port=args.mock_port,
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            escalate_ratio=args.llm_escalate_ratio,
+            seed=args.seed
+        )
+        server.start()
+        try:
+            asyncio.run(_benchmark(args))
+        finally:
+            server.stop()
+        print(f"\nmock OpenRouter served {server.requests} completions")
+
+if __name__ == "__main__":
+    main()
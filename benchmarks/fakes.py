@@ -0,0 +1,128 @@
+"""
+In-process stand-ins for the two network dependencies, so the pipeline can be measured offline.
+
+  FakePineconeStore     PineconeVectorStore over an exact in-memory index with injected latency
+  MockOpenRouterServer  OpenAI-compatible /v1/chat/completions on localhost with injected latency
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI
+
+from app.services.vector_store import PineconeVectorStore
+
+def _delay_s(latency_ms: float, jitter_ms: float, rng: random.Random) -> float:
+    return max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000.0
+
+class FakePineconeIndex:
+    """Mimics the slice of the Pinecone async data plane that PineconeVectorStore calls."""
+    def __init__(self, dim: int, latency_ms: float = 15.0, jitter_ms: float = 5.0, seed: int = 7):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+
+    async def query(self, vector: List[float], top_k: int = 1, include_metadata: bool = False, include_values: bool = False, filter: Optional[Dict[str, Any]] = None) -> SimpleNamespace:
+        await asyncio.sleep(_delay_s(self.latency_ms, self.jitter_ms, self._rng))
+        if not self._ids:
+            return SimpleNamespace(matches=[])
+
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(np.linalg.norm(query), 1e-12)
+        scores = self._matrix @ query
+        if filter:
+            mask = np.array([
+                all(metadata.get(field) == condition.get("$eq") for field, condition in filter.items())
+                for metadata in self._metadata
+            ])
+            scores = np.where(mask, scores, -np.inf)
+
+        order = np.argsort(-scores)[:top_k]
+        return SimpleNamespace(matches=[
+            SimpleNamespace(id=self._ids[i], score=float(scores[i]), values=self._matrix[i].tolist() if include_values else None)
+            for i in order if np.isfinite(scores[i])
+        ])
+
+    async def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        await asyncio.sleep(_delay_s(self.latency_ms, self.jitter_ms, self._rng))
+        rows = np.asarray([record["values"] for record in vectors], dtype=np.float32)
+        rows /= np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+        self._matrix = np.vstack([self._matrix, rows])
+        self._ids.extend(record["id"] for record in vectors)
+        self._metadata.extend(record.get("metadata", {}) for record in vectors)
+
+class FakePineconeStore(PineconeVectorStore):
+    """Skips the control-plane handshake; queries go through the real PineconeVectorStore adapter."""
+    def __init__(self, dim: int, latency_ms: float = 15.0, jitter_ms: float = 5.0, seed: int = 7):
+        self.index = FakePineconeIndex(dim, latency_ms, jitter_ms, seed)
+
+def build_mock_openrouter(latency_ms: float = 800.0, jitter_ms: float = 200.0, escalate_ratio: float = 0.5, seed: int = 7) -> FastAPI:
+    """Answers every completion with a well-formed TriageDecision after a simulated model delay."""
+    app = FastAPI(title="Mock OpenRouter")
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]) -> Dict[str, Any]:
+        app.state.requests += 1
+        await asyncio.sleep(_delay_s(latency_ms, jitter_ms, rng))
+        escalate = rng.random() < escalate_ratio
+        decision = {
+            "confidence_score": rng.randint(91, 100) if escalate else rng.randint(5, 60),
+            "recommended_action": "ESCALATE" if escalate else "SUPPRESS",
+            "reasoning": "Synthetic verdict from the benchmark mock.",
+            "latency_ms": 0.0
+        }
+        return {
+            "id": f"chatcmpl-bench-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(decision)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    return app
+
+class MockOpenRouterServer:
+    """Runs the mock on its own thread and event loop so it never competes with the pipeline under test."""
+    def __init__(self, port: int = 18080, **mock_options: Any):
+        import uvicorn
+
+        self.port = port
+        self.app = build_mock_openrouter(**mock_options)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="mock-openrouter", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def requests(self) -> int:
+        return self.app.state.requests
+
+    def start(self, timeout_s: float = 10.0) -> None:
+        self._thread.start()
+        deadline = time.monotonic() + timeout_s
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Mock OpenRouter did not start on port {self.port}")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5.0)
@@ -0,0 +1,146 @@
+"""
+ONNX/int8 embedding backend tooling.
+
+  export   Exports the SentenceTransformer encoder to ONNX, applies dynamic int8 weight quantization
+           and writes model.onnx, model_int8.onnx and tokenizer.json into ONNX_MODEL_DIR.
+  parity   Encodes a synthetic alert corpus with both backends and checks that pairwise cosine
+           scores agree within tolerance. It also reports threshold_map decision flips, encode
+           throughput and RSS growth. Exits non-zero if parity fails.
+
+    python -m benchmarks.onnx_embedding export
+    python -m benchmarks.onnx_embedding parity --texts 500 --tolerance 0.01
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def export(model_name: str, model_dir: str, opset: int) -> None:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(model_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    sample = tokenizer(["export probe"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+
+    int8_path = os.path.join(model_dir, "model_int8.onnx")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    tokenizer.backend_tokenizer.save(os.path.join(model_dir, "tokenizer.json"))
+
+    for path in (fp32_path, int8_path):
+        print(f"wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+def _corpus_texts(count: int, seed: int) -> List[str]:
+    from app.services.log_templates import mask_variables
+    from benchmarks.corpus import generate_corpus
+
+    corpus = generate_corpus(count, settings.HMAC_SECRET_KEY, duplicate_ratio=0.0, attack_ratio=0.2, novel_ratio=0.4, seed=seed)
+    # Stage 2 embeds template-normalized text, so parity is measured on the same inputs
+    return [mask_variables(alert["raw_payload"]) for alert in corpus]
+
+def _timed_encode(backend, texts: List[str], batch_size: int) -> Dict[str, Any]:
+    backend.encode(texts[:batch_size], batch_size=batch_size)
+    started = time.perf_counter()
+    vectors = backend.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    return {"vectors": vectors, "texts_per_s": len(texts) / elapsed}
+
+def parity(count: int, tolerance: float, batch_size: int, seed: int) -> bool:
+    from app.services.embedding_backends import OnnxEmbeddingBackend, TorchEmbeddingBackend
+
+    texts = _corpus_texts(count, seed)
+
+    rss_before = _rss_mb()
+    onnx_backend = OnnxEmbeddingBackend(
+        settings.ONNX_MODEL_DIR, settings.ONNX_MODEL_FILE, settings.EMBEDDING_MAX_SEQ_LENGTH, settings.ONNX_INTRA_OP_THREADS
+    )
+    onnx_run = _timed_encode(onnx_backend, texts, batch_size)
+    rss_onnx = _rss_mb()
+
+    torch_backend = TorchEmbeddingBackend(settings.EMBEDDING_MODEL_NAME)
+    torch_run = _timed_encode(torch_backend, texts, batch_size)
+    rss_torch = _rss_mb()
+
+    reference, candidate = torch_run["vectors"], onnx_run["vectors"]
+
+    # Same text, across backends: how far each vector moved
+    self_cosine = np.sum(reference * candidate, axis=1)
+
+    # Pairwise scores are what threshold_map is applied to
+    reference_scores = reference @ reference.T
+    candidate_scores = candidate @ candidate.T
+    upper = np.triu_indices(len(texts), k=1)
+    deltas = np.abs(reference_scores[upper] - candidate_scores[upper])
+
+    # Stored vectors may come from one backend and queries from the other during a migration
+    cross_deltas = np.abs(reference_scores[upper] - (reference @ candidate.T)[upper])
+
+    print(f"texts={len(texts)}  model={settings.ONNX_MODEL_FILE}  tolerance={tolerance}")
+    print(f"self cosine (torch vs onnx)     min={self_cosine.min():.5f}  mean={self_cosine.mean():.5f}")
+    print(f"pairwise |delta| onnx vs torch  max={deltas.max():.5f}  p99={np.percentile(deltas, 99):.5f}  mean={deltas.mean():.5f}")
+    print(f"pairwise |delta| mixed stores   max={cross_deltas.max():.5f}  p99={np.percentile(cross_deltas, 99):.5f}")
+
+    # Mirrors VectorFilterService.threshold_map. Flips are informational: borderline pairs may legitimately cross.
+    for severity, threshold in (("Critical", 0.99), ("High", 0.97), ("Medium", 0.95), ("Low", 0.92), ("Info", 0.90)):
+        flips = int(np.sum((reference_scores[upper] > threshold) != (candidate_scores[upper] > threshold)))
+        print(f"  {severity:<8} tau={threshold}  decision flips={flips}")
+
+    print(f"encode throughput  torch={torch_run['texts_per_s']:.1f}/s  onnx={onnx_run['texts_per_s']:.1f}/s")
+    print(f"peak RSS growth    onnx={rss_onnx - rss_before:.0f} MB  torch={rss_torch - rss_onnx:.0f} MB (after onnx)")
+
+    passed = bool(deltas.max() <= tolerance)
+    print("PARITY OK" if passed else "PARITY FAILED")
+    return passed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export")
+    export_cmd.add_argument("--model-name", default=settings.EMBEDDING_MODEL_NAME)
+    export_cmd.add_argument("--model-dir", default=settings.ONNX_MODEL_DIR)
+    export_cmd.add_argument("--opset", type=int, default=17)
+
+    parity_cmd = commands.add_parser("parity")
+    parity_cmd.add_argument("--texts", type=int, default=500)
+    parity_cmd.add_argument("--tolerance", type=float, default=0.01)
+    parity_cmd.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parity_cmd.add_argument("--seed", type=int, default=7)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args.model_name, args.model_dir, args.opset)
+    elif not parity(args.texts, args.tolerance, args.batch_size, args.seed):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()